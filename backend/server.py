@@ -1,13 +1,21 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, Query, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from gridfs.errors import NoFile
+from pymongo.errors import OperationFailure
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, UpdateOne, DeleteMany, ReturnDocument
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from collections import OrderedDict, deque
 import uuid
 from datetime import datetime, timezone, timedelta
 from passlib.context import CryptContext
@@ -15,9 +23,31 @@ import jwt
 import aiohttp
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import asyncio
+import contextvars
 import subprocess
+import time
 import json
+import fnmatch
+import gzip
+import secrets
+import hashlib
+import base64
+import math
+import re
+import zlib
 import bleach
+import orjson
+
+# Response encoders from requirements.txt; an install without them still
+# serves gzip, which is always available.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # Allowlist for sanitizing admin-authored dashboard notes. Must stay in sync
 # with NOTES_SANITIZE_CONFIG in frontend/src/pages/Dashboard.js and Settings.js.
@@ -35,6 +65,10 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Raw playlist bodies live in GridFS, stored once per SHA-256 digest (the
+# file name) and referenced from m3u_playlists.content_digest.
+playlist_bodies = AsyncIOMotorGridFSBucket(db, bucket_name="playlist_bodies")
+
 # Security
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
@@ -50,37 +84,114 @@ api_router = APIRouter(prefix="/api")
 # Initialize scheduler
 scheduler = AsyncIOScheduler()
 
+# Shared outbound HTTP client for playlist refreshes, stream probes and
+# player API calls: one keep-alive connection pool and DNS cache for the
+# life of the process instead of a new session per call.
+HTTP_POOL_LIMIT = int(os.environ.get('HTTP_POOL_LIMIT', '100'))
+HTTP_POOL_LIMIT_PER_HOST = int(os.environ.get('HTTP_POOL_LIMIT_PER_HOST', '10'))
+HTTP_DNS_CACHE_TTL = int(os.environ.get('HTTP_DNS_CACHE_TTL', '300'))
+HTTP_KEEPALIVE_TIMEOUT = float(os.environ.get('HTTP_KEEPALIVE_TIMEOUT', '30'))
+http_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Return the shared outbound session, creating it on first use.
+
+    The session is shared by every tenant, so it keeps no cookies: one
+    tenant's provider session must never ride along on another's requests.
+    """
+    global http_session
+    if http_session is None or http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        )
+        http_session = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+    return http_session
+
+
+async def close_http_session():
+    """Close the shared outbound session and its pooled connections."""
+    global http_session
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+    http_session = None
+
+
+def http_pool_stats() -> dict:
+    """Snapshot of the shared connection pool.
+
+    aiohttp exposes no public pool counters, so idle and in-use counts come
+    from its internal bookkeeping; anything missing or shaped differently in
+    another aiohttp release reads as empty rather than failing.
+    """
+    if http_session is None or http_session.closed:
+        return {"open": False, "limit": HTTP_POOL_LIMIT, "limit_per_host": HTTP_POOL_LIMIT_PER_HOST}
+    connector = http_session.connector
+    
+    def count(conns) -> int:
+        try:
+            return len(conns)
+        except TypeError:
+            return 0
+    
+    def host_counts(pool) -> Dict[str, int]:
+        try:
+            return {f"{getattr(key, 'host', key)}:{getattr(key, 'port', '')}": count(conns) for key, conns in pool.items()}
+        except (AttributeError, TypeError):
+            return {}
+    
+    idle = host_counts(getattr(connector, "_conns", None))
+    in_use = host_counts(getattr(connector, "_acquired_per_host", None))
+    return {
+        "open": True,
+        "limit": getattr(connector, "limit", HTTP_POOL_LIMIT),
+        "limit_per_host": getattr(connector, "limit_per_host", HTTP_POOL_LIMIT_PER_HOST),
+        "in_use": count(getattr(connector, "_acquired", ())),
+        "idle": sum(idle.values()),
+        "hosts": {
+            host: {"idle": idle.get(host, 0), "in_use": in_use.get(host, 0)}
+            for host in {**idle, **in_use}
+        },
+    }
+
 # Background task to refresh M3U playlists
 async def refresh_m3u_playlists():
     """Fetch M3U content from URLs and update database"""
     logger.info("Starting M3U playlist refresh...")
     try:
-        playlists = await db.m3u_playlists.find({}).to_list(1000)
+        playlists = await db.m3u_playlists.find(
+            {},
+            {"_id": 0, "id": 1, "name": 1, "url": 1, "tenant_id": 1, "content_digest": 1}
+        ).to_list(None)
         
-        async with aiohttp.ClientSession() as session:
-            for playlist in playlists:
-                try:
-                    # Fetch content from URL
-                    async with session.get(playlist['url'], timeout=aiohttp.ClientTimeout(total=30)) as response:
-                        if response.status == 200:
-                            content = await response.text()
-                            
-                            # Update playlist content and timestamp
-                            await db.m3u_playlists.update_one(
-                                {"id": playlist['id']},
-                                {
-                                    "$set": {
-                                        "content": content,
-                                        "updated_at": datetime.now(timezone.utc).isoformat(),
-                                        "last_refresh": datetime.now(timezone.utc).isoformat()
-                                    }
+        session = get_http_session()
+        for playlist in playlists:
+            try:
+                # Fetch content from URL
+                async with session.get(playlist['url'], timeout=aiohttp.ClientTimeout(total=30)) as response:
+                    if response.status == 200:
+                        content = await response.text()
+                        
+                        # Store the new content, then update timestamps
+                        await ingest_playlist_content(playlist, content)
+                        await db.m3u_playlists.update_one(
+                            {"id": playlist['id']},
+                            {
+                                "$set": {
+                                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                                    "last_refresh": datetime.now(timezone.utc).isoformat()
                                 }
-                            )
-                            logger.info(f"Refreshed playlist: {playlist['name']}")
-                        else:
-                            logger.warning(f"Failed to refresh {playlist['name']}: HTTP {response.status}")
-                except Exception as e:
-                    logger.error(f"Error refreshing playlist {playlist['name']}: {str(e)}")
+                            }
+                        )
+                        await bump_data_version(playlist['tenant_id'])
+                        logger.info(f"Refreshed playlist: {playlist['name']}")
+                    else:
+                        logger.warning(f"Failed to refresh {playlist['name']}: HTTP {response.status}")
+            except Exception as e:
+                logger.error(f"Error refreshing playlist {playlist['name']}: {str(e)}")
         
         logger.info("M3U playlist refresh completed")
     except Exception as e:
@@ -155,6 +266,861 @@ def filter_channels_by_category(channels: List[dict], category: str) -> List[dic
     return [c for c in channels if c.get('group') == category]
 
 
+# Bump whenever ingest starts deriving new data from playlist content, so the
+# startup backfill re-ingests playlists processed by an older version.
+INGEST_VERSION = 6
+
+
+def summarize_playlist_channels(channels: List[dict]) -> dict:
+    """Derive the statistics stored on a playlist document at ingest time.
+
+    `category_stats` follows `group_channels_by_category`, so the browse
+    endpoints can return it without touching the raw content, but each entry
+    also carries the source `group`: None for the groupless bucket. That
+    keeps a real group named "Uncategorized" separate from channels that
+    have no group at all.
+    """
+    counts: dict = {}
+    for channel in channels:
+        group = channel.get('group') or None
+        counts[group] = counts.get(group, 0) + 1
+    category_stats = [
+        {"name": group if group is not None else "Uncategorized", "group": group, "channel_count": count}
+        for group, count in counts.items()
+    ]
+    category_stats.sort(key=lambda c: (c['name'], c['group'] is not None))
+    return {
+        "category_stats": category_stats,
+        "channel_count": len(channels),
+        "category_count": len(category_stats),
+    }
+
+
+# Channel fields copied from the parsed playlist; a change in any of them
+# turns a refresh into an update of the stored channel document.
+CHANNEL_SYNC_FIELDS = ("name", "url", "group", "category", "logo", "playlist_name", "monitored")
+
+
+def build_channel_documents(playlist: dict, channels: List[dict]) -> List[dict]:
+    """Turn parsed channels into documents for the `channels` collection.
+
+    Channel ids are derived from the playlist id and stream URL (plus an
+    occurrence counter for URLs listed more than once), so the same channel
+    keeps its id across refreshes. `category` is the browse bucket: the
+    channel's group, or "Uncategorized" when it has none.
+    """
+    docs = []
+    seen_urls: dict = {}
+    for channel in channels:
+        url = channel.get('url', '')
+        occurrence = seen_urls.get(url, 0)
+        seen_urls[url] = occurrence + 1
+        key = f"{playlist['id']}|{url}|{occurrence}"
+        docs.append({
+            "id": hashlib.sha1(key.encode('utf-8')).hexdigest(),
+            "tenant_id": playlist.get('tenant_id'),
+            "playlist_id": playlist['id'],
+            "playlist_name": playlist.get('name'),
+            "name": channel.get('name', 'Unknown'),
+            "url": url,
+            "group": channel.get('group'),
+            "category": channel.get('group') or "Uncategorized",
+            "logo": channel.get('logo'),
+        })
+    return docs
+
+
+def diff_channel_documents(existing: List[dict], incoming: List[dict]) -> dict:
+    """Compare stored channel documents against freshly built ones.
+
+    Returns {"added": [new], "removed": [old], "updated": [(old, new)]},
+    where an update is a channel whose id survived but whose
+    CHANNEL_SYNC_FIELDS changed.
+    """
+    existing_by_id = {doc['id']: doc for doc in existing}
+    incoming_ids = set()
+    added, updated = [], []
+    for doc in incoming:
+        incoming_ids.add(doc['id'])
+        old = existing_by_id.get(doc['id'])
+        if old is None:
+            added.append(doc)
+        elif any(old.get(f) != doc.get(f) for f in CHANNEL_SYNC_FIELDS):
+            updated.append((old, doc))
+    removed = [doc for doc in existing if doc['id'] not in incoming_ids]
+    return {"added": added, "removed": removed, "updated": updated}
+
+
+async def next_sequence(name: str, count: int = 1) -> int:
+    """Atomically reserve `count` numbers from a named counter.
+
+    Returns the first reserved number; the block is
+    [first, first + count). Counters start at 1.
+    """
+    counter = await db.counters.find_one_and_update(
+        {"_id": name},
+        {"$inc": {"value": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter['value'] - count + 1
+
+
+# Feeds polled by sequence number (event feed, change log) reserve numbers
+# and insert the entries using them under one lock per counter. Entries
+# then become visible in sequence order, so a poller can never advance past
+# a gap that is filled in later. The backend is a single process, so an
+# in-process lock is enough.
+_sequence_locks: Dict[str, asyncio.Lock] = {}
+
+
+def sequence_lock(name: str) -> asyncio.Lock:
+    """Lock serializing reserve-and-insert for the counter `name`."""
+    lock = _sequence_locks.get(name)
+    if lock is None:
+        lock = _sequence_locks[name] = asyncio.Lock()
+    return lock
+
+
+# In-process mirror of the per-tenant counters in tenant_state
+# (`channels_version`, `data_version`). The backend runs as a single uvicorn
+# process, so once loaded this is authoritative and version checks are
+# answered without a database round trip.
+_tenant_versions: Dict[str, Dict[str, int]] = {}
+
+# tenant_state key whose data_version moves with every tenant's; it scopes
+# the super admin's cross-tenant listings.
+ALL_TENANTS_SCOPE = "*"
+
+
+async def bump_tenant_version(tenant_id: str, field: str):
+    """Increment one of a tenant's version counters."""
+    state = await db.tenant_state.find_one_and_update(
+        {"tenant_id": tenant_id},
+        {"$inc": {field: 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    _tenant_versions.setdefault(tenant_id, {})[field] = state[field]
+
+
+async def get_tenant_version(tenant_id: str, field: str) -> int:
+    """Return one of a tenant's version counters (0 if never bumped)."""
+    versions = _tenant_versions.setdefault(tenant_id, {})
+    if field not in versions:
+        state = await db.tenant_state.find_one({"tenant_id": tenant_id}, {"_id": 0, field: 1})
+        versions[field] = (state or {}).get(field, 0)
+    return versions[field]
+
+
+async def bump_data_version(tenant_id: Optional[str]):
+    """Record that a tenant's catalog (playlists, categories, monitoring) changed."""
+    if not tenant_id:
+        return
+    await bump_tenant_version(tenant_id, "data_version")
+    await bump_tenant_version(ALL_TENANTS_SCOPE, "data_version")
+
+
+async def bump_channels_version(tenant_id: Optional[str]):
+    """Record that a tenant's stored channels changed."""
+    if not tenant_id:
+        return
+    await bump_tenant_version(tenant_id, "channels_version")
+    await bump_data_version(tenant_id)
+
+
+async def get_channels_version(tenant_id: str) -> int:
+    """Return the tenant's current channel version."""
+    return await get_tenant_version(tenant_id, "channels_version")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches a strong ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def catalog_etag(scope: str, version: int) -> str:
+    """Strong ETag for a catalog response at a given data version."""
+    return '"' + hashlib.sha1(f"{scope}:{version}".encode('utf-8')).hexdigest()[:24] + '"'
+
+
+def encode_page_cursor(object_id: ObjectId) -> str:
+    """Opaque pagination cursor for the last row of a page."""
+    return base64.urlsafe_b64encode(object_id.binary).decode('ascii').rstrip("=")
+
+
+def decode_page_cursor(cursor: str) -> ObjectId:
+    """Inverse of encode_page_cursor; rejects anything else with a 400."""
+    try:
+        return ObjectId(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (InvalidId, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def find_page(
+    collection,
+    query: dict,
+    projection: dict,
+    limit: Optional[int],
+    cursor: Optional[str],
+    response: Response,
+) -> List[dict]:
+    """Keyset-paginate a find over `_id`.
+
+    Without a limit every matching document is returned. With one, a page
+    of at most `limit` rows follows `cursor`, and the `X-Next-Cursor`
+    response header is set when more rows remain.
+    """
+    if cursor:
+        query = {**query, "_id": {"$gt": decode_page_cursor(cursor)}}
+    # _id is needed for the cursor; it is stripped from the returned rows
+    projection = {key: value for key, value in projection.items() if key != "_id"} or None
+    find = collection.find(query, projection).sort("_id", ASCENDING)
+    if limit is None:
+        docs = await find.to_list(None)
+    else:
+        docs = await find.limit(limit + 1).to_list(limit + 1)
+        if len(docs) > limit:
+            docs = docs[:limit]
+            response.headers["X-Next-Cursor"] = encode_page_cursor(docs[-1]['_id'])
+    for doc in docs:
+        doc.pop('_id', None)
+    return docs
+
+
+def fields_projection(fields: Optional[str], model) -> Optional[dict]:
+    """Translate a `fields=a,b` parameter into a Mongo inclusion projection.
+
+    Only fields declared on `model` may be requested, so columns a list
+    endpoint never returns (passwords, raw playlist content) stay out.
+    Returns None when no selection was made; a selection that names no
+    field at all (`fields=,`) is rejected rather than read as "everything".
+    """
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    if not requested:
+        raise HTTPException(status_code=400, detail="No fields selected")
+    unknown = sorted(set(requested) - set(model.model_fields))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return {"_id": 0, **{field: 1 for field in requested}}
+
+
+def selected_fields_response(docs: List[dict], response: Response) -> ORJSONResponse:
+    """Return rows trimmed by `fields=` as-is, keeping headers set on `response`."""
+    return ORJSONResponse(docs, headers=dict(response.headers))
+
+
+async def catalog_not_modified(request: Request, response: Response, scope: str) -> Optional[Response]:
+    """Tag a catalog response with the scope's data version.
+
+    Returns a 304 response when the client already holds this version, so
+    handlers can bail out before touching the database; otherwise sets the
+    ETag on `response` and returns None.
+    """
+    etag = catalog_etag(scope, await get_tenant_version(scope, "data_version"))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def monitored_channel_events(diff: dict) -> List[tuple]:
+    """Derive monitored-category appearances/disappearances from a channel diff.
+
+    Returns (event_type, channel_doc) pairs where event_type is "appeared"
+    or "disappeared". A channel that stays put but moves into or out of a
+    monitored category counts as appearing or disappearing.
+    """
+    events = []
+    for doc in diff['added']:
+        if doc.get('monitored'):
+            events.append(("appeared", doc))
+    for old, new in diff['updated']:
+        if new.get('monitored') and not old.get('monitored'):
+            events.append(("appeared", new))
+        elif old.get('monitored') and not new.get('monitored'):
+            events.append(("disappeared", old))
+    for doc in diff['removed']:
+        if doc.get('monitored'):
+            events.append(("disappeared", doc))
+    return events
+
+
+async def record_channel_events(tenant_id: Optional[str], events: List[tuple]):
+    """Append monitored-channel events to the tenant's event feed."""
+    if not tenant_id or not events:
+        return
+    counter = f"channel_events:{tenant_id}"
+    now = datetime.now(timezone.utc).isoformat()
+    async with sequence_lock(counter):
+        first_seq = await next_sequence(counter, len(events))
+        await db.channel_events.insert_many([
+            {
+                "id": str(uuid.uuid4()),
+                "tenant_id": tenant_id,
+                "seq": first_seq + offset,
+                "type": event_type,
+                "channel_id": doc['id'],
+                "name": doc.get('name'),
+                "url": doc.get('url'),
+                "group": doc.get('group'),
+                "logo": doc.get('logo'),
+                "playlist_id": doc.get('playlist_id'),
+                "playlist_name": doc.get('playlist_name'),
+                "occurred_at": now,
+            }
+            for offset, (event_type, doc) in enumerate(events)
+        ])
+
+
+# Channel change log retention. Entries expire through a TTL index; clients
+# whose position falls behind the oldest kept entry must resync.
+CHANNEL_CHANGES_RETENTION_DAYS = int(os.environ.get('CHANNEL_CHANGES_RETENTION_DAYS', '7'))
+
+
+def build_channel_change_entries(
+    tenant_id: str,
+    first_seq: int,
+    upserts: List[dict],
+    deleted_ids: List[str],
+    occurred_at: datetime,
+) -> List[dict]:
+    """Turn stored channel docs and deleted ids into numbered change log entries."""
+    entries = [
+        {
+            "tenant_id": tenant_id,
+            "op": "upsert",
+            "channel_id": doc['id'],
+            "channel": channel_record(doc),
+            "monitored": bool(doc.get('monitored')),
+        }
+        for doc in upserts
+    ] + [
+        {"tenant_id": tenant_id, "op": "delete", "channel_id": channel_id, "channel": None, "monitored": None}
+        for channel_id in deleted_ids
+    ]
+    for offset, entry in enumerate(entries):
+        entry["seq"] = first_seq + offset
+        # A BSON date (not an ISO string) so the TTL index can expire it
+        entry["occurred_at"] = occurred_at
+    return entries
+
+
+async def record_channel_changes(tenant_id: Optional[str], upserts: List[dict], deleted_ids: List[str] = ()):
+    """Append channel upserts (stored docs) and deletions to the tenant's change log."""
+    count = len(upserts) + len(deleted_ids)
+    if not tenant_id or not count:
+        return
+    counter = f"channel_changes:{tenant_id}"
+    async with sequence_lock(counter):
+        first_seq = await next_sequence(counter, count)
+        await db.channel_changes.insert_many(
+            build_channel_change_entries(tenant_id, first_seq, upserts, list(deleted_ids), datetime.now(timezone.utc))
+        )
+
+
+async def reset_channel_changes(tenant_id: str):
+    """Drop a tenant's change log and move its head, forcing clients to resync.
+
+    Used when the channel store is rebuilt wholesale (restores), where the
+    individual deletions are not recorded.
+    """
+    counter = f"channel_changes:{tenant_id}"
+    async with sequence_lock(counter):
+        await db.channel_changes.delete_many({"tenant_id": tenant_id})
+        await next_sequence(counter)
+
+
+def change_log_resync_required(since: int, head: int, oldest_seq: Optional[int]) -> bool:
+    """Whether a client at `since` has missed changes the log no longer holds."""
+    if since > head:
+        return True
+    floor = oldest_seq if oldest_seq is not None else head + 1
+    return since < floor - 1
+
+
+MONITOR_MATCH_TYPES = ("exact", "glob", "regex")
+MONITOR_TARGETS = ("category", "channel_name")
+
+
+# Regex constructs that break once a tenant's rules are merged into one
+# alternation: global flags must lead the whole expression, and group names
+# and numbers are shared across every rule. A rule's own leading flags are
+# rewritten into a scoped group first, so they still apply to that rule.
+MONITOR_REGEX_LEADING_FLAGS = re.compile(r'\(\?([aiLmsux]+)\)')
+MONITOR_REGEX_UNSUPPORTED = [
+    (re.compile(r'\(\?[aiLmsux]+\)'), "inline flags such as (?i) are only supported at the start of a pattern"),
+    (re.compile(r'\(\?P[<=]'), "named groups are not supported"),
+    (re.compile(r'(?<!\\)(?:\\\\)*\\[1-9]'), "backreferences are not supported"),
+]
+
+
+def monitor_rule_regex(match_type: str, pattern: str, strict: bool = True) -> str:
+    """Translate a glob or regex monitoring rule into regex source.
+
+    Globs must match the whole value and ignore case; regexes use search
+    semantics, can anchor themselves and are case-sensitive unless they
+    start with (?i). Raises re.error for an invalid regex, or (when
+    `strict`) for one that cannot be merged with other rules.
+    """
+    if match_type == "glob":
+        return "(?i:^" + fnmatch.translate(pattern) + ")"
+    leading = MONITOR_REGEX_LEADING_FLAGS.match(pattern)
+    if leading:
+        pattern = f"(?{leading.group(1)}:{pattern[leading.end():]})"
+    if strict:
+        for construct, message in MONITOR_REGEX_UNSUPPORTED:
+            if construct.search(pattern):
+                raise re.error(message)
+    re.compile(pattern)
+    return pattern
+
+
+class ChannelMatcher:
+    """A tenant's monitoring rules compiled for per-channel evaluation.
+
+    Exact rules become set lookups; all glob/regex rules for a target are
+    merged into one alternation (each rule keeping its own case
+    sensitivity), so matching a channel
+    costs two set lookups and at most two regex searches however many
+    rules the tenant has.
+    """
+
+    def __init__(self, rules: List[dict]):
+        exact: Dict[str, set] = {target: set() for target in MONITOR_TARGETS}
+        patterns: Dict[str, List[str]] = {target: [] for target in MONITOR_TARGETS}
+        for rule in rules:
+            match_type = rule.get('match_type') or "exact"
+            target = rule.get('target') or "category"
+            if match_type == "exact":
+                exact[target].add(rule['category'])
+            else:
+                try:
+                    patterns[target].append(monitor_rule_regex(match_type, rule['category'], strict=False))
+                except re.error:
+                    # Rules are validated on create; skip anything stored
+                    # before validation existed rather than failing ingest.
+                    continue
+        self.exact_categories = exact["category"]
+        self.exact_names = exact["channel_name"]
+        self.category_regexes = self._combine(patterns["category"])
+        self.name_regexes = self._combine(patterns["channel_name"])
+
+    @staticmethod
+    def combined_regex(patterns: List[str]):
+        """Merge regex sources into one alternation (raises re.error)."""
+        return re.compile("|".join(f"(?:{p})" for p in patterns))
+
+    @classmethod
+    def _combine(cls, patterns: List[str]) -> list:
+        if not patterns:
+            return []
+        try:
+            return [cls.combined_regex(patterns)]
+        except re.error:
+            # A stored rule predates merge validation; match rule by rule
+            # rather than failing ingest for the whole tenant.
+            return [re.compile(p) for p in patterns]
+
+    def matches(self, channel: dict) -> bool:
+        group = channel.get('group')
+        name = channel.get('name')
+        if group in self.exact_categories or name in self.exact_names:
+            return True
+        if group and any(regex.search(group) for regex in self.category_regexes):
+            return True
+        if name and any(regex.search(name) for regex in self.name_regexes):
+            return True
+        return False
+
+
+# Compiled matchers per tenant; dropped whenever the tenant's rules change.
+_channel_matchers: Dict[str, ChannelMatcher] = {}
+
+
+async def get_channel_matcher(tenant_id: Optional[str]) -> ChannelMatcher:
+    """Return the compiled monitoring matcher for a tenant."""
+    if not tenant_id:
+        return ChannelMatcher([])
+    matcher = _channel_matchers.get(tenant_id)
+    if matcher is None:
+        rules = await db.monitored_categories.find(
+            {"tenant_id": tenant_id},
+            {"_id": 0, "category": 1, "match_type": 1, "target": 1}
+        ).to_list(None)
+        matcher = ChannelMatcher(rules)
+        _channel_matchers[tenant_id] = matcher
+    return matcher
+
+
+async def resync_monitored_flags(tenant_id: str, query: dict):
+    """Re-evaluate `monitored` for the tenant's channels selected by `query`.
+
+    Called after a monitoring rule changes. Callers narrow `query` to the
+    channels the change could flip, and only flipped channels are written.
+    Flipped channels appear in or disappear from the event feed just as
+    they would on a playlist refresh.
+    """
+    _channel_matchers.pop(tenant_id, None)
+    matcher = await get_channel_matcher(tenant_id)
+    ops = []
+    flips = []
+    cursor = db.channels.find({"tenant_id": tenant_id, **query}, {"_id": 0})
+    async for channel in cursor:
+        monitored = matcher.matches(channel)
+        if monitored != bool(channel.get('monitored')):
+            ops.append(UpdateOne({"id": channel['id']}, {"$set": {"monitored": monitored}}))
+            flips.append((channel, {**channel, "monitored": monitored}))
+    if ops:
+        await db.channels.bulk_write(ops, ordered=False)
+        await bump_channels_version(tenant_id)
+        await record_channel_changes(tenant_id, [new for _, new in flips])
+        await record_channel_events(
+            tenant_id, monitored_channel_events({"added": [], "updated": flips, "removed": []})
+        )
+
+
+async def sync_playlist_channels(playlist: dict, channels: List[dict]) -> dict:
+    """Bring the `channels` collection in line with a playlist's parsed content.
+
+    Only the difference is written, so probe state stored on unchanged
+    channels survives a refresh. Each channel's `monitored` flag is
+    evaluated here against the tenant's monitoring rules, which keeps
+    the Events view current without re-scanning playlists, and monitored
+    channels coming or going are appended to the event feed. Returns the
+    diff.
+    """
+    existing = await db.channels.find(
+        {"playlist_id": playlist['id']},
+        {"_id": 0, "id": 1, "playlist_id": 1, "probe_status": 1, "resolution": 1, **{f: 1 for f in CHANNEL_SYNC_FIELDS}},
+    ).to_list(None)
+    incoming = build_channel_documents(playlist, channels)
+    matcher = await get_channel_matcher(playlist.get('tenant_id'))
+    for doc in incoming:
+        doc['monitored'] = matcher.matches(doc)
+    diff = diff_channel_documents(existing, incoming)
+
+    ops = []
+    for doc in diff['added']:
+        # An upsert, so a channel another ingest of this playlist already
+        # inserted is left alone rather than failing the unique id index
+        ops.append(UpdateOne(
+            {"id": doc['id']},
+            {"$setOnInsert": {**doc, "probe_status": "unprobed", "resolution": None, "last_probed_at": None}},
+            upsert=True,
+        ))
+    for _, doc in diff['updated']:
+        ops.append(UpdateOne({"id": doc['id']}, {"$set": {f: doc.get(f) for f in CHANNEL_SYNC_FIELDS}}))
+    if diff['removed']:
+        ops.append(DeleteMany({"id": {"$in": [doc['id'] for doc in diff['removed']]}}))
+    if ops:
+        await db.channels.bulk_write(ops, ordered=False)
+        await bump_channels_version(playlist.get('tenant_id'))
+        await record_channel_changes(
+            playlist.get('tenant_id'),
+            [{**doc, "probe_status": "unprobed"} for doc in diff['added']]
+            + [{**old, **new} for old, new in diff['updated']],
+            [doc['id'] for doc in diff['removed']],
+        )
+    await record_channel_events(playlist.get('tenant_id'), monitored_channel_events(diff))
+    return diff
+
+
+# Storing a body and writing the reference to it must not interleave with a
+# release of the same digest, or the release can delete a body an ingest is
+# about to point at. A fixed set of striped locks keeps that per digest
+# without growing with every playlist revision.
+_playlist_body_locks = [asyncio.Lock() for _ in range(64)]
+
+
+def playlist_body_lock(digest: str) -> asyncio.Lock:
+    """Lock serializing store-and-reference against release for `digest`."""
+    return _playlist_body_locks[hash(digest) % len(_playlist_body_locks)]
+
+
+async def store_playlist_body(body: bytes, digest: str):
+    """Save a playlist body to GridFS unless an identical one is stored.
+
+    Callers hold playlist_body_lock(digest) until the playlist document
+    referencing the body is written.
+    """
+    existing = await db["playlist_bodies.files"].find_one({"filename": digest}, {"_id": 1})
+    if existing is None:
+        await playlist_bodies.upload_from_stream(digest, body, metadata={"size": len(body)})
+
+
+async def release_playlist_body(digest: Optional[str]):
+    """Delete a stored playlist body once no playlist references it."""
+    if not digest:
+        return
+    async with playlist_body_lock(digest):
+        if await db.m3u_playlists.find_one({"content_digest": digest}, {"_id": 1}):
+            return
+        async for grid_file in db["playlist_bodies.files"].find({"filename": digest}, {"_id": 1}):
+            await playlist_bodies.delete(grid_file['_id'])
+
+
+async def load_playlist_content(playlist: dict) -> str:
+    """Return a playlist's raw content as text.
+
+    Reads the GridFS body referenced by `content_digest`; playlists the
+    backfill has not migrated yet still carry an inline `content` field.
+    """
+    if playlist.get('content') is not None:
+        return playlist['content']
+    if not playlist.get('content_digest'):
+        return ""
+    try:
+        grid_out = await playlist_bodies.open_download_stream_by_name(playlist['content_digest'])
+    except NoFile:
+        logger.warning(f"Playlist body {playlist['content_digest']} missing from GridFS")
+        return ""
+    return (await grid_out.read()).decode('utf-8')
+
+
+_ingest_locks: Dict[str, asyncio.Lock] = {}
+
+
+def ingest_lock(playlist_id: str) -> asyncio.Lock:
+    """Lock serializing ingests of one playlist."""
+    lock = _ingest_locks.get(playlist_id)
+    if lock is None:
+        lock = _ingest_locks[playlist_id] = asyncio.Lock()
+    return lock
+
+
+async def ingest_playlist_content(playlist: dict, content: Optional[str]) -> dict:
+    """Store a playlist body, parse it once, and persist everything derived.
+
+    Called whenever a playlist's content changes (create, update, scheduled
+    refresh). `playlist` must carry id, name and tenant_id, plus the
+    previous content_digest if it has one so a replaced body can be
+    released. Returns the derived fields that were written.
+
+    Ingests of the same playlist run one at a time, so a refresh, the
+    backfill and an on-demand ingest never diff against the same channel
+    snapshot and record its events twice.
+    """
+    async with ingest_lock(playlist['id']):
+        body = (content or "").encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()
+        channels = parse_m3u_content(content or "")
+        await sync_playlist_channels(playlist, channels)
+        derived = summarize_playlist_channels(channels)
+        derived['content_size'] = len(body)
+        derived['content_digest'] = digest
+        derived['ingest_version'] = INGEST_VERSION
+        async with playlist_body_lock(digest):
+            await store_playlist_body(body, digest)
+            await db.m3u_playlists.update_one(
+                {"id": playlist['id']},
+                {"$set": derived, "$unset": {"content": ""}}
+            )
+        if playlist.get('content_digest') != digest:
+            await release_playlist_body(playlist.get('content_digest'))
+        await bump_data_version(playlist.get('tenant_id'))
+        return derived
+
+
+async def get_playlist_category_stats(playlist: dict) -> List[dict]:
+    """Return a playlist's precomputed category stats, ingesting on demand.
+
+    Stats written by an older INGEST_VERSION are served as they are until
+    the startup backfill refreshes them. Playlists stored before ingest-time
+    stats existed have none at all; for those we ingest once here so later
+    reads are a plain document lookup.
+    """
+    if playlist.get('category_stats') is not None:
+        return playlist['category_stats']
+    doc = await db.m3u_playlists.find_one(
+        {"id": playlist['id']},
+        {"_id": 0, "id": 1, "name": 1, "tenant_id": 1, "content": 1, "content_digest": 1},
+    )
+    if not doc:
+        return []
+    derived = await ingest_playlist_content(doc, await load_playlist_content(doc))
+    return derived['category_stats']
+
+
+async def backfill_playlist_ingest():
+    """Ingest every playlist whose derived data predates INGEST_VERSION."""
+    try:
+        cursor = db.m3u_playlists.find(
+            {"ingest_version": {"$ne": INGEST_VERSION}},
+            {"_id": 0, "id": 1, "name": 1, "tenant_id": 1, "content": 1, "content_digest": 1},
+        )
+        count = 0
+        async for playlist in cursor:
+            await ingest_playlist_content(playlist, await load_playlist_content(playlist))
+            count += 1
+        if count:
+            logger.info(f"Backfilled ingest data for {count} playlists")
+    except Exception as e:
+        logger.error(f"Error in backfill_playlist_ingest: {str(e)}")
+
+
+async def ensure_ttl_index(collection, field: str, name: str, expire_seconds: int):
+    """Create a TTL index on `field`, or update its expiry if it already exists."""
+    try:
+        await collection.create_index([(field, ASCENDING)], name=name, expireAfterSeconds=expire_seconds)
+    except OperationFailure:
+        # Retention changed since the index was built; update it in place
+        await db.command({
+            "collMod": collection.name,
+            "index": {"name": name, "expireAfterSeconds": expire_seconds},
+        })
+
+
+async def ensure_indexes():
+    """Create the indexes the channel store queries rely on."""
+    await db.channels.create_index([("id", ASCENDING)], unique=True)
+    await db.channels.create_index([("playlist_id", ASCENDING), ("category", ASCENDING)])
+    await db.channels.create_index([("tenant_id", ASCENDING), ("url", ASCENDING)])
+    await db.channels.create_index([("tenant_id", ASCENDING), ("category", ASCENDING)])
+    await db.channels.create_index([("tenant_id", ASCENDING), ("probe_status", ASCENDING)])
+    await db.channels.create_index([("tenant_id", ASCENDING), ("resolution", ASCENDING)])
+    await db.channels.create_index([("tenant_id", ASCENDING), ("monitored", ASCENDING)])
+    await db.channels.create_index([("tenant_id", ASCENDING), ("group", ASCENDING)])
+    await db.channel_events.create_index([("tenant_id", ASCENDING), ("seq", ASCENDING)], unique=True)
+    await db.channel_changes.create_index([("tenant_id", ASCENDING), ("seq", ASCENDING)], unique=True)
+    await ensure_ttl_index(
+        db.channel_changes, "occurred_at", "channel_changes_ttl", CHANNEL_CHANGES_RETENTION_DAYS * 86400
+    )
+    await db.m3u_playlists.create_index([("content_digest", ASCENDING)])
+    await db.tenant_state.create_index([("tenant_id", ASCENDING)], unique=True)
+    await db.lineups.create_index([("token", ASCENDING)], unique=True)
+    await db.lineups.create_index([("tenant_id", ASCENDING)])
+    # Keyset pagination walks _id within a tenant
+    await db.users.create_index([("tenant_id", ASCENDING), ("_id", ASCENDING)])
+    await db.m3u_playlists.create_index([("tenant_id", ASCENDING), ("_id", ASCENDING)])
+    await db.monitored_categories.create_index([("tenant_id", ASCENDING), ("_id", ASCENDING)])
+    await ensure_probe_samples_collection()
+
+
+# Browse facets: query parameter name -> field in the `channels` collection.
+CHANNEL_FACETS = {
+    "playlist": "playlist_id",
+    "category": "category",
+    "probe_status": "probe_status",
+    "resolution": "resolution",
+}
+
+
+def build_channel_facet_pipeline(base_match: dict, filters: dict, skip: int, limit: int) -> List[dict]:
+    """Build the aggregation behind faceted channel browsing.
+
+    `filters` maps facet names (keys of CHANNEL_FACETS) to lists of accepted
+    values. Each facet is counted with every *other* filter applied, so the
+    counts show how many channels picking that value would yield. A
+    resolution of "unknown" matches channels that have never reported one.
+    """
+    def clause(facet: str, values: List[str]) -> dict:
+        field = CHANNEL_FACETS[facet]
+        if facet == "resolution":
+            values = [None if v == "unknown" else v for v in values]
+        return {field: {"$in": values}}
+
+    def match_except(excluded: Optional[str]) -> dict:
+        clauses = [clause(f, v) for f, v in filters.items() if v and f != excluded]
+        return {"$and": clauses} if clauses else {}
+
+    facet_stages = {
+        "channels": [
+            {"$match": match_except(None)},
+            {"$sort": {"playlist_name": 1, "category": 1, "name": 1}},
+            {"$skip": skip},
+            {"$limit": limit},
+            {"$project": {"_id": 0}},
+        ],
+        "total": [
+            {"$match": match_except(None)},
+            {"$count": "count"},
+        ],
+    }
+    for facet, field in CHANNEL_FACETS.items():
+        group = {"_id": f"${field}", "count": {"$sum": 1}}
+        if facet == "playlist":
+            group["label"] = {"$first": "$playlist_name"}
+        facet_stages[facet] = [
+            {"$match": match_except(facet)},
+            {"$group": group},
+            {"$sort": {"count": -1, "_id": 1}},
+        ]
+    return [{"$match": base_match}, {"$facet": facet_stages}]
+
+
+def format_m3u_entry(channel: dict) -> str:
+    """Render one stored channel as an #EXTINF entry plus its stream URL.
+
+    Uses the same attribute layout as the browser-side exports did. Double
+    quotes inside attribute values would end the attribute early, so they
+    are replaced with single quotes.
+    """
+    name = channel.get('name') or "Unknown"
+    attr_name = name.replace('"', "'")
+    logo = (channel.get('logo') or "").replace('"', "'")
+    group = (channel.get('group') or "").replace('"', "'")
+    return (
+        f'#EXTINF:-1 tvg-id="{attr_name}" tvg-name="{attr_name}" tvg-logo="{logo}" group-title="{group}",{name}\n'
+        f"{channel.get('url', '')}\n"
+    )
+
+
+def build_channel_export_query(
+    base_query: dict,
+    playlist_ids: Optional[List[str]] = None,
+    categories: Optional[List[str]] = None,
+    monitored_only: bool = False,
+    ids: Optional[List[str]] = None,
+) -> dict:
+    """Build the channel store query for an M3U export.
+
+    Filters combine with AND; an empty or missing list leaves that
+    dimension unfiltered. Categories match the browse bucket, so
+    "Uncategorized" selects groupless channels.
+    """
+    query = dict(base_query)
+    if playlist_ids:
+        query["playlist_id"] = {"$in": playlist_ids}
+    if categories:
+        query["category"] = {"$in": categories}
+    if monitored_only:
+        query["monitored"] = True
+    if ids:
+        query["id"] = {"$in": ids}
+    return query
+
+
+EXPORT_BATCH_SIZE = 1000
+
+
+async def stream_m3u_export(query: dict):
+    """Yield an #EXTM3U document for the channels matching `query`.
+
+    Reads the channel store through a cursor and emits one chunk per batch,
+    so memory use is bounded by the batch size rather than the export size.
+    """
+    yield b"#EXTM3U\n"
+    cursor = db.channels.find(
+        query,
+        {"_id": 0, "name": 1, "url": 1, "group": 1, "logo": 1}
+    ).batch_size(EXPORT_BATCH_SIZE)
+    batch = []
+    async for channel in cursor:
+        batch.append(format_m3u_entry(channel))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield "".join(batch).encode('utf-8')
+            batch = []
+    if batch:
+        yield "".join(batch).encode('utf-8')
+
+
 async def probe_stream(url: str) -> dict:
     """Check if a stream is online and extract metadata"""
     result = {
@@ -172,39 +1138,143 @@ async def probe_stream(url: str) -> dict:
     
     try:
         start_time = datetime.now()
-        async with aiohttp.ClientSession() as session:
-            # First, try to fetch the stream
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=10), allow_redirects=True) as response:
-                end_time = datetime.now()
-                result["response_time"] = (end_time - start_time).total_seconds()
+        session = get_http_session()
+        # First, try to fetch the stream
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10), allow_redirects=True) as response:
+            end_time = datetime.now()
+            result["response_time"] = (end_time - start_time).total_seconds()
+            
+            if response.status in [200, 206, 302, 301]:
+                result["online"] = True
                 
-                if response.status in [200, 206, 302, 301]:
-                    result["online"] = True
-                    
-                    # Check if it's an M3U8/HLS stream
-                    content_type = response.headers.get('Content-Type', '')
-                    if 'mpegurl' in content_type or 'x-mpegURL' in content_type or url.endswith('.m3u8') or url.endswith('.m3u'):
-                        result["stream_type"] = "HLS"
-                        
-                        # Parse M3U8 manifest
-                        try:
-                            manifest_content = await response.text()
-                            result = parse_m3u8_manifest(manifest_content, result)
-                        except Exception as e:
-                            logger.error(f"Error parsing M3U8 manifest: {str(e)}")
+                # Check if it's an M3U8/HLS stream
+                content_type = response.headers.get('Content-Type', '')
+                if 'mpegurl' in content_type or 'x-mpegURL' in content_type or url.endswith('.m3u8') or url.endswith('.m3u'):
+                    result["stream_type"] = "HLS"
                     
-                    elif 'video' in content_type or 'audio' in content_type:
-                        result["stream_type"] = content_type
-                        
-                        # Try to get content length for bitrate estimation
-                        content_length = response.headers.get('Content-Length')
-                        if content_length:
-                            size_mb = int(content_length) / (1024 * 1024)
-                            result["bitrate"] = f"~{size_mb:.1f} MB total"
-                    
-                else:
-                    result["error"] = f"HTTP {response.status}"
+                    # Parse M3U8 manifest
+                    try:
+                        manifest_content = await response.text()
+                        result = parse_m3u8_manifest(manifest_content, result)
+                    except Exception as e:
+                        logger.error(f"Error parsing M3U8 manifest: {str(e)}")
+                
+                elif 'video' in content_type or 'audio' in content_type:
+                    result["stream_type"] = content_type
                     
+                    # Try to get content length for bitrate estimation
+                    content_length = response.headers.get('Content-Length')
+                    if content_length:
+                        size_mb = int(content_length) / (1024 * 1024)
+                        result["bitrate"] = f"~{size_mb:.1f} MB total"
+                
+            else:
+                result["error"] = f"HTTP {response.status}"
+                
+    except asyncio.TimeoutError:
+        result["error"] = "Timeout"
+    except Exception as e:
+        result["error"] = str(e)
+    
+    return result
+
+# Fast probe: a ranged GET that reads at most this many bytes, enough to
+# identify the container and the top of an HLS master playlist.
+PROBE_FAST_MAX_BYTES = int(os.environ.get('PROBE_FAST_MAX_BYTES', '8192'))
+TS_PACKET_SIZE = 188
+
+
+def detect_container(head: bytes) -> Optional[str]:
+    """Identify a stream's container from its first bytes.
+
+    Returns "hls", "mpegts", "mp4", "flv", "matroska" or None.
+    """
+    text_head = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if text_head.startswith(b"#EXTM3U"):
+        return "hls"
+    if head[:1] == b"\x47" and (len(head) <= TS_PACKET_SIZE or head[TS_PACKET_SIZE:TS_PACKET_SIZE + 1] == b"\x47"):
+        return "mpegts"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head.startswith(b"FLV"):
+        return "flv"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "matroska"
+    return None
+
+
+def is_media_content_type(content_type: str) -> bool:
+    """Whether a Content-Type header names audio/video or a streaming manifest."""
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    return media_type.startswith(('video/', 'audio/')) or 'mpegurl' in media_type or media_type == 'application/dash+xml'
+
+
+async def probe_stream_fast(url: str) -> dict:
+    """Check liveness with a ranged GET capped at PROBE_FAST_MAX_BYTES.
+
+    The container is sniffed from the first bytes and the connection is
+    closed as soon as they arrive, so a live MPEG-TS stream costs a few
+    kilobytes rather than a 10 second download. HLS master playlists that
+    fit in the read are parsed for variants. A response that is neither a
+    recognized container nor a media Content-Type counts as offline.
+    """
+    result = {
+        "url": url,
+        "online": False,
+        "response_time": None,
+        "error": None,
+        "bitrate": None,
+        "resolution": None,
+        "audio_codec": None,
+        "video_codec": None,
+        "stream_type": None,
+        "variants": [],
+        "container": None,
+        "bytes_read": 0,
+    }
+    
+    try:
+        start_time = datetime.now()
+        session = get_http_session()
+        response = await session.get(
+            url,
+            headers={"Range": f"bytes=0-{PROBE_FAST_MAX_BYTES - 1}"},
+            timeout=aiohttp.ClientTimeout(total=10, sock_read=5),
+            allow_redirects=True,
+        )
+        try:
+            result["response_time"] = (datetime.now() - start_time).total_seconds()
+            if response.status not in (200, 206):
+                result["error"] = f"HTTP {response.status}"
+                return result
+            
+            head = b""
+            while len(head) < PROBE_FAST_MAX_BYTES:
+                chunk = await response.content.read(PROBE_FAST_MAX_BYTES - len(head))
+                if not chunk:
+                    break
+                head += chunk
+            result["bytes_read"] = len(head)
+            result["container"] = detect_container(head)
+            content_type = response.headers.get('Content-Type', '')
+            if result["container"] is None and not is_media_content_type(content_type):
+                # An HTML error or login page is not a live stream
+                result["error"] = f"Unrecognized stream content ({content_type or 'no Content-Type'})"
+                return result
+            result["online"] = True
+            
+            if result["container"] == "hls":
+                result["stream_type"] = "HLS"
+                # Only parse complete lines; the read may stop mid-line
+                text = head.decode('utf-8', errors='replace')
+                if len(head) >= PROBE_FAST_MAX_BYTES:
+                    text = text[:text.rfind("\n") + 1]
+                result = parse_m3u8_manifest(text, result)
+            else:
+                result["stream_type"] = result["container"] or response.headers.get('Content-Type')
+        finally:
+            # Drop the connection rather than draining a live stream into the pool
+            response.close()
     except asyncio.TimeoutError:
         result["error"] = "Timeout"
     except Exception as e:
@@ -291,6 +1361,230 @@ def parse_m3u8_manifest(content: str, result: dict) -> dict:
     
     return result
 
+# Deep HLS probe: follow the highest-bandwidth variant to its media playlist
+# and download up to HLS_PROBE_SEGMENTS of its newest segments, each capped
+# at HLS_PROBE_MAX_SEGMENT_BYTES, to measure whether the provider can
+# actually deliver the bandwidth the master playlist advertises.
+HLS_PROBE_SEGMENTS = int(os.environ.get('HLS_PROBE_SEGMENTS', '2'))
+HLS_PROBE_MAX_SEGMENT_BYTES = int(os.environ.get('HLS_PROBE_MAX_SEGMENT_BYTES', str(4 * 1024 * 1024)))
+HLS_PROBE_MAX_PLAYLIST_BYTES = 1024 * 1024
+HLS_PROBE_TIMEOUT_SECONDS = float(os.environ.get('HLS_PROBE_TIMEOUT_SECONDS', '30'))
+# Segment downloads shorter than this are timed against this floor and
+# flagged unreliable; a small segment can arrive in one buffered read.
+HLS_PROBE_MIN_SAMPLE_SECONDS = 0.05
+
+
+def parse_hls_attributes(line: str) -> dict:
+    """Attribute list of an HLS tag line (`#TAG:KEY=value,KEY="a,b"`) as a dict."""
+    attributes = {}
+    for match in re.finditer(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)', line.split(':', 1)[-1]):
+        attributes[match.group(1)] = match.group(2).strip('"')
+    return attributes
+
+
+def parse_master_variants(content: str, base_url: str) -> List[dict]:
+    """Variants of an HLS master playlist with absolute URLs and numeric bandwidth."""
+    variants = []
+    pending = None
+    for line in content.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-STREAM-INF:'):
+            attributes = parse_hls_attributes(line)
+            try:
+                bandwidth = int(attributes.get('BANDWIDTH', ''))
+            except ValueError:
+                bandwidth = None
+            pending = {"bandwidth": bandwidth, "resolution": attributes.get('RESOLUTION')}
+        elif line and not line.startswith('#') and pending is not None:
+            variants.append({**pending, "url": urljoin(base_url, line)})
+            pending = None
+    return variants
+
+
+def parse_media_playlist(content: str, base_url: str) -> dict:
+    """Parse an HLS media playlist into its segments.
+
+    Returns target_duration, media_sequence, endlist (False for live
+    playlists) and segments, each with an absolute `url` and its `duration`
+    in seconds.
+    """
+    playlist = {"target_duration": None, "media_sequence": 0, "endlist": False, "segments": []}
+    duration = None
+    for line in content.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-TARGETDURATION:'):
+            try:
+                playlist["target_duration"] = float(line.split(':', 1)[1])
+            except ValueError:
+                pass
+        elif line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            try:
+                playlist["media_sequence"] = int(line.split(':', 1)[1])
+            except ValueError:
+                pass
+        elif line.startswith('#EXTINF:'):
+            try:
+                duration = float(line.split(':', 1)[1].split(',', 1)[0])
+            except ValueError:
+                duration = None
+        elif line.startswith('#EXT-X-ENDLIST'):
+            playlist["endlist"] = True
+        elif line and not line.startswith('#'):
+            playlist["segments"].append({"url": urljoin(base_url, line), "duration": duration})
+            duration = None
+    return playlist
+
+
+async def fetch_hls_playlist(session: aiohttp.ClientSession, url: str) -> tuple:
+    """GET a playlist, returning (final URL after redirects, text)."""
+    async with session.get(url, timeout=aiohttp.ClientTimeout(total=10), allow_redirects=True) as response:
+        if response.status != 200:
+            raise ValueError(f"HTTP {response.status} for playlist")
+        body = await response.content.read(HLS_PROBE_MAX_PLAYLIST_BYTES)
+        return str(response.url), body.decode('utf-8', errors='replace')
+
+
+async def measure_segment(session: aiohttp.ClientSession, segment: dict) -> dict:
+    """Download one segment up to HLS_PROBE_MAX_SEGMENT_BYTES, timing the transfer."""
+    measurement = {
+        "duration": segment["duration"],
+        "bytes": 0,
+        "complete": False,
+        "ttfb": None,
+        "download_seconds": None,
+        "throughput_kbps": None,
+        "reliable": False,
+    }
+    started = time.monotonic()
+    async with session.get(
+        segment["url"], timeout=aiohttp.ClientTimeout(total=30, sock_read=10), allow_redirects=True
+    ) as response:
+        if response.status not in (200, 206):
+            raise ValueError(f"HTTP {response.status} for segment")
+        first_byte_at = None
+        while measurement["bytes"] < HLS_PROBE_MAX_SEGMENT_BYTES:
+            chunk = await response.content.read(min(65536, HLS_PROBE_MAX_SEGMENT_BYTES - measurement["bytes"]))
+            if not chunk:
+                measurement["complete"] = True
+                break
+            if first_byte_at is None:
+                first_byte_at = time.monotonic()
+            measurement["bytes"] += len(chunk)
+        finished = time.monotonic()
+        if not measurement["complete"]:
+            # Drop the connection rather than draining the rest of the segment
+            response.close()
+    
+    if first_byte_at is not None:
+        measurement["ttfb"] = round(first_byte_at - started, 3)
+    elapsed = finished - started
+    measurement["download_seconds"] = round(elapsed, 3)
+    if measurement["bytes"]:
+        # Timed from the request, as a player experiences it
+        measurement["throughput_kbps"] = round(
+            measurement["bytes"] * 8 / max(elapsed, HLS_PROBE_MIN_SAMPLE_SECONDS) / 1000
+        )
+        measurement["reliable"] = elapsed >= HLS_PROBE_MIN_SAMPLE_SECONDS
+    return measurement
+
+
+async def probe_stream_hls(url: str) -> dict:
+    """Deep-probe an HLS stream by downloading real segments.
+
+    A master playlist is resolved to its highest-bandwidth variant; the
+    newest segments of a live media playlist (the first of a VOD one) are
+    then downloaded. `bandwidth_ratio` is measured throughput over the
+    declared BANDWIDTH, and `buffering_risk` is set when the provider
+    cannot keep up with either it or real time. The whole probe is bounded
+    by HLS_PROBE_TIMEOUT_SECONDS; segments measured before the deadline
+    are kept.
+    """
+    result = {
+        "url": url,
+        "online": False,
+        "response_time": None,
+        "error": None,
+        "bitrate": None,
+        "resolution": None,
+        "variant_url": None,
+        "declared_bandwidth": None,
+        "target_duration": None,
+        "segments": [],
+        "ttfb": None,
+        "throughput_kbps": None,
+        "throughput_reliable": None,
+        "bandwidth_ratio": None,
+        "buffering_risk": None,
+    }
+    
+    try:
+        await asyncio.wait_for(run_hls_probe(url, result), timeout=HLS_PROBE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        result["error"] = f"Timeout ({HLS_PROBE_TIMEOUT_SECONDS:g}s)"
+    except Exception as e:
+        result["error"] = str(e)
+    
+    return summarize_hls_segments(result)
+
+
+async def run_hls_probe(url: str, result: dict):
+    """Body of probe_stream_hls; fills `result` in place so a timeout keeps partial measurements."""
+    session = get_http_session()
+    started = time.monotonic()
+    playlist_url, content = await fetch_hls_playlist(session, url)
+    result["response_time"] = round(time.monotonic() - started, 3)
+    if not content.lstrip('\ufeff \t\r\n').startswith('#EXTM3U'):
+        result["error"] = "Not an HLS playlist"
+        return
+    
+    variants = parse_master_variants(content, playlist_url)
+    if variants:
+        variant = max(variants, key=lambda v: v["bandwidth"] or 0)
+        result["variant_url"] = variant["url"]
+        result["declared_bandwidth"] = variant["bandwidth"]
+        result["resolution"] = variant["resolution"]
+        if variant["bandwidth"]:
+            result["bitrate"] = f"{variant['bandwidth'] / 1000:.0f} kbps"
+        playlist_url, content = await fetch_hls_playlist(session, variant["url"])
+    
+    media = parse_media_playlist(content, playlist_url)
+    result["target_duration"] = media["target_duration"]
+    if not media["segments"]:
+        result["error"] = "Media playlist has no segments"
+        return
+    result["online"] = True
+    
+    # Live edge for live streams, the start for VOD
+    segments = media["segments"][:HLS_PROBE_SEGMENTS] if media["endlist"] else media["segments"][-HLS_PROBE_SEGMENTS:]
+    for segment in segments:
+        result["segments"].append(await measure_segment(session, segment))
+
+
+def summarize_hls_segments(result: dict) -> dict:
+    """Fill a deep HLS probe's throughput verdict from its segment measurements.
+
+    Reliable samples are preferred; when every download was too short to
+    time, the floored (lower-bound) figures are used and
+    `throughput_reliable` is False.
+    """
+    measured = [m for m in result["segments"] if m["throughput_kbps"]]
+    if not measured:
+        return result
+    reliable = [m for m in measured if m["reliable"]]
+    samples = reliable or measured
+    result["throughput_reliable"] = bool(reliable)
+    result["ttfb"] = round(sum(m["ttfb"] for m in samples) / len(samples), 3)
+    result["throughput_kbps"] = min(m["throughput_kbps"] for m in samples)
+    if result["declared_bandwidth"]:
+        result["bandwidth_ratio"] = round(result["throughput_kbps"] * 1000 / result["declared_bandwidth"], 2)
+    slower_than_realtime = any(
+        m["complete"] and m["duration"] and m["download_seconds"] > m["duration"] for m in samples
+    )
+    result["buffering_risk"] = slower_than_realtime or (
+        result["bandwidth_ratio"] is not None and result["bandwidth_ratio"] < 1
+    )
+    return result
+
 async def fetch_player_api_data(player_api_url: str) -> dict:
     """Fetch data from player API URL"""
     result = {
@@ -301,48 +1595,250 @@ async def fetch_player_api_data(player_api_url: str) -> dict:
     }
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(player_api_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    # Check if data is nested under user_info (common format)
-                    user_info = data.get("user_info", data)
-                    
-                    # Extract max connections
-                    max_conn = user_info.get("max_connections") or user_info.get("maxConnections") or user_info.get("max_cons")
-                    if max_conn:
-                        result["max_connections"] = int(max_conn) if isinstance(max_conn, str) else max_conn
-                    
-                    # Extract active connections
-                    active_conn = user_info.get("active_cons") or user_info.get("active_connections") or user_info.get("activeConnections")
-                    if active_conn:
-                        result["active_connections"] = int(active_conn) if isinstance(active_conn, str) else active_conn
-                    
-                    # Extract expiration date
-                    exp_date = user_info.get("exp_date") or user_info.get("expiration_date") or user_info.get("expires")
-                    if exp_date:
-                        # If it's a Unix timestamp (string or int)
-                        try:
-                            timestamp = int(exp_date) if isinstance(exp_date, str) else exp_date
-                            exp_dt = datetime.fromtimestamp(timestamp, tz=timezone.utc)
-                            # Format as MM/DD/YYYY
-                            result["expiration_date"] = exp_dt.strftime("%m/%d/%Y")
-                        except (ValueError, TypeError):
-                            # If it's already a formatted string, use it
-                            result["expiration_date"] = str(exp_date)
-                else:
-                    result["error"] = f"HTTP {response.status}"
+        session = get_http_session()
+        async with session.get(player_api_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+            if response.status == 200:
+                data = await response.json()
+                
+                # Check if data is nested under user_info (common format)
+                user_info = data.get("user_info", data)
+                
+                # Extract max connections
+                max_conn = user_info.get("max_connections") or user_info.get("maxConnections") or user_info.get("max_cons")
+                if max_conn:
+                    result["max_connections"] = int(max_conn) if isinstance(max_conn, str) else max_conn
+                
+                # Extract active connections
+                active_conn = user_info.get("active_cons") or user_info.get("active_connections") or user_info.get("activeConnections")
+                if active_conn:
+                    result["active_connections"] = int(active_conn) if isinstance(active_conn, str) else active_conn
+                
+                # Extract expiration date
+                exp_date = user_info.get("exp_date") or user_info.get("expiration_date") or user_info.get("expires")
+                if exp_date:
+                    # If it's a Unix timestamp (string or int)
+                    try:
+                        timestamp = int(exp_date) if isinstance(exp_date, str) else exp_date
+                        exp_dt = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+                        # Format as MM/DD/YYYY
+                        result["expiration_date"] = exp_dt.strftime("%m/%d/%Y")
+                    except (ValueError, TypeError):
+                        # If it's already a formatted string, use it
+                        result["expiration_date"] = str(exp_date)
+            else:
+                result["error"] = f"HTTP {response.status}"
     except Exception as e:
         result["error"] = str(e)
         logger.error(f"Error fetching player API data: {str(e)}")
     
     return result
 
-async def probe_stream_ffmpeg(url: str) -> dict:
+FFPROBE_MAX_CONCURRENCY = int(os.environ.get('FFPROBE_MAX_CONCURRENCY', '8'))
+FFPROBE_MAX_PER_TENANT = int(os.environ.get('FFPROBE_MAX_PER_TENANT', '3'))
+FFPROBE_TIMEOUT_SECONDS = float(os.environ.get('FFPROBE_TIMEOUT_SECONDS', '15'))
+
+# Tenant a probe runs on behalf of. Set by the probe endpoints so the ffprobe
+# supervisor can apply per-tenant limits; probes inherit it through the
+# task context.
+probe_tenant: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("probe_tenant", default=None)
+
+
+class ProbeSupervisor:
+    """Runs ffprobe processes under a global and a per-tenant cap.
+
+    Work beyond the caps waits in per-tenant queues that are served
+    round-robin, so one tenant's bulk check cannot starve another's single
+    probe. A process that outlives its timeout is killed and reaped.
+    """
+
+    def __init__(self, max_concurrency: int, max_per_tenant: int):
+        self.max_concurrency = max_concurrency
+        self.max_per_tenant = max_per_tenant
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._running: Dict[str, int] = {}
+        self._total_running = 0
+        self._completed = 0
+        self._timed_out = 0
+        self._failed = 0
+        self._run_seconds = deque(maxlen=500)
+        self._wait_seconds = deque(maxlen=500)
+
+    def _can_start(self, tenant: str) -> bool:
+        return (
+            self._total_running < self.max_concurrency
+            and self._running.get(tenant, 0) < self.max_per_tenant
+        )
+
+    def _start(self, tenant: str):
+        self._total_running += 1
+        self._running[tenant] = self._running.get(tenant, 0) + 1
+
+    def _dispatch(self):
+        """Admit queued work round-robin across tenants while capacity lasts."""
+        progressed = True
+        while progressed and self._total_running < self.max_concurrency:
+            progressed = False
+            for tenant in list(self._queues):
+                waiters = self._queues[tenant]
+                while waiters and waiters[0].done():
+                    waiters.popleft()  # cancelled while queued
+                if not waiters:
+                    del self._queues[tenant]
+                    continue
+                if self._can_start(tenant):
+                    self._start(tenant)
+                    waiters.popleft().set_result(None)
+                    self._queues.move_to_end(tenant)
+                    progressed = True
+                    break
+
+    async def _acquire(self, tenant: str):
+        if tenant not in self._queues and self._can_start(tenant):
+            self._start(tenant)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(tenant, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as we were cancelled; hand the slot on
+                self._release(tenant)
+            raise
+
+    def _release(self, tenant: str):
+        self._total_running -= 1
+        self._running[tenant] -= 1
+        if not self._running[tenant]:
+            del self._running[tenant]
+        self._dispatch()
+
+    async def run(self, cmd: List[str], timeout: float, tenant: Optional[str] = None) -> tuple:
+        """Run `cmd` once admitted; returns (returncode, stdout, stderr).
+
+        Raises asyncio.TimeoutError after killing the process if it runs
+        longer than `timeout` seconds.
+        """
+        tenant = tenant or "*"
+        queued_at = time.monotonic()
+        await self._acquire(tenant)
+        started_at = time.monotonic()
+        self._wait_seconds.append(started_at - queued_at)
+        process = None
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+            self._completed += 1
+            return process.returncode, stdout, stderr
+        except asyncio.TimeoutError:
+            self._timed_out += 1
+            raise
+        except BaseException:
+            self._failed += 1
+            raise
+        finally:
+            if process is not None and process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+            self._run_seconds.append(time.monotonic() - started_at)
+            self._release(tenant)
+
+    def stats(self) -> dict:
+        """Current load, queue depth per tenant and recent timings."""
+        def percentiles(samples):
+            if not samples:
+                return {"p50": None, "p95": None, "max": None}
+            ordered = sorted(samples)
+            return {
+                "p50": round(ordered[len(ordered) // 2], 3),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+                "max": round(ordered[-1], 3),
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_per_tenant": self.max_per_tenant,
+            "running": self._total_running,
+            "running_per_tenant": dict(self._running),
+            "queued": sum(len(q) for q in self._queues.values()),
+            "queued_per_tenant": {tenant: len(q) for tenant, q in self._queues.items()},
+            "completed": self._completed,
+            "timed_out": self._timed_out,
+            "failed": self._failed,
+            "run_seconds": percentiles(self._run_seconds),
+            "wait_seconds": percentiles(self._wait_seconds),
+        }
+
+
+probe_supervisor = ProbeSupervisor(FFPROBE_MAX_CONCURRENCY, FFPROBE_MAX_PER_TENANT)
+
+
+# ffprobe profiles. "fast" caps how much of the stream is read and asks only
+# for the fields we display, so a status check returns in well under a
+# second; "deep" analyses more of the stream and samples packets for
+# FFPROBE_DEEP_SAMPLE_SECONDS to measure the actual frame rate and bitrate.
+FFPROBE_DEEP_SAMPLE_SECONDS = int(os.environ.get('FFPROBE_DEEP_SAMPLE_SECONDS', '5'))
+FFPROBE_PROFILES = {
+    "fast": [
+        '-probesize', '500000',
+        '-analyzeduration', '500000',  # microseconds
+        '-timeout', '5000000',
+        '-show_entries',
+        'format=format_name,format_long_name,duration,bit_rate'
+        ':stream=codec_type,codec_name,codec_long_name,width,height,r_frame_rate,sample_rate,channels',
+    ],
+    "deep": [
+        '-probesize', '10000000',
+        '-analyzeduration', '10000000',
+        '-timeout', '10000000',
+        '-read_intervals', f'%+{FFPROBE_DEEP_SAMPLE_SECONDS}',
+        '-show_format',
+        '-show_streams',
+        '-show_entries', 'packet=stream_index,size,pts_time',
+    ],
+}
+
+
+def build_ffprobe_command(url: str, profile: str = "fast") -> List[str]:
+    """ffprobe argument list for `url` using one of FFPROBE_PROFILES."""
+    return ['ffprobe', '-v', 'quiet', '-print_format', 'json', *FFPROBE_PROFILES[profile], url]
+
+
+def measure_packet_rates(data: dict) -> tuple:
+    """Measured (fps, bitrate in bps) from the packets sampled by a deep probe.
+
+    Either value is None when the sample is too short to measure.
+    """
+    packets = [p for p in data.get('packets', []) if p.get('pts_time') not in (None, 'N/A')]
+    if len(packets) < 2:
+        return None, None
+    times = [float(p['pts_time']) for p in packets]
+    span = max(times) - min(times)
+    bitrate = None
+    if span > 0:
+        bitrate = sum(int(p.get('size') or 0) for p in packets) * 8 / span
+    
+    fps = None
+    video = {s.get('index') for s in data.get('streams', []) if s.get('codec_type') == 'video'}
+    if video:
+        video_index = min(video)
+        video_times = [t for p, t in zip(packets, times) if p.get('stream_index') == video_index]
+        if len(video_times) > 1 and max(video_times) > min(video_times):
+            fps = (len(video_times) - 1) / (max(video_times) - min(video_times))
+    return fps, bitrate
+
+
+async def probe_stream_ffmpeg(url: str, profile: str = "fast") -> dict:
     """Use FFmpeg/ffprobe to get detailed stream information"""
     result = {
         "url": url,
+        "profile": profile,
         "online": False,
         "status": "unknown",
         "format": None,
@@ -354,34 +1850,31 @@ async def probe_stream_ffmpeg(url: str) -> dict:
         "audio_codec": None,
         "audio_sample_rate": None,
         "audio_channels": None,
+        "measured_fps": None,
+        "measured_bitrate": None,
         "error": None,
         "raw_data": {}
     }
     
     try:
         # Run ffprobe with JSON output
-        cmd = [
-            'ffprobe',
-            '-v', 'quiet',
-            '-print_format', 'json',
-            '-show_format',
-            '-show_streams',
-            '-timeout', '10000000',  # 10 seconds timeout in microseconds
-            url
-        ]
+        cmd = build_ffprobe_command(url, profile)
         
-        # Run ffprobe
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+        # Run ffprobe under the supervisor's concurrency caps
+        returncode, stdout, stderr = await probe_supervisor.run(
+            cmd, timeout=FFPROBE_TIMEOUT_SECONDS, tenant=probe_tenant.get()
         )
         
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=15)
-        
-        if process.returncode == 0:
+        if returncode == 0:
             # Parse JSON output
             data = json.loads(stdout.decode('utf-8'))
+            if 'packets' in data:
+                fps, bitrate = measure_packet_rates(data)
+                if fps:
+                    result["measured_fps"] = f"{fps:.2f} fps"
+                if bitrate:
+                    result["measured_bitrate"] = f"{bitrate / 1000:.0f} kbps"
+                del data['packets']  # only needed for the measurement
             result["raw_data"] = data
             result["online"] = True
             result["status"] = "online"
@@ -448,7 +1941,7 @@ async def probe_stream_ffmpeg(url: str) -> dict:
             
     except asyncio.TimeoutError:
         result["status"] = "timeout"
-        result["error"] = "Stream connection timeout (15s)"
+        result["error"] = f"Stream connection timeout ({FFPROBE_TIMEOUT_SECONDS:g}s)"
     except Exception as e:
         result["status"] = "error"
         result["error"] = f"Error: {str(e)}"
@@ -506,12 +1999,12 @@ class TenantUpdate(BaseModel):
     name: Optional[str] = None
     expiration_date: Optional[str] = None
 
-class M3UPlaylist(BaseModel):
+class M3UPlaylistSummary(BaseModel):
+    """A playlist without its raw content, as returned by list endpoints."""
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     url: str
-    content: Optional[str] = None
     player_api: Optional[str] = None
     tenant_id: str
     created_by: str
@@ -523,6 +2016,14 @@ class M3UPlaylist(BaseModel):
     active_connections: Optional[int] = None
     expiration_date: Optional[str] = None
     api_last_checked: Optional[datetime] = None
+    # Derived from content at ingest time
+    channel_count: Optional[int] = None
+    category_count: Optional[int] = None
+    content_size: Optional[int] = None  # bytes (UTF-8)
+    content_digest: Optional[str] = None  # SHA-256 hex
+
+class M3UPlaylist(M3UPlaylistSummary):
+    content: Optional[str] = None
 
 class M3UPlaylistCreate(BaseModel):
     name: str
@@ -543,6 +2044,106 @@ class Channel(BaseModel):
     logo: Optional[str] = None
     playlist_name: str
     playlist_id: str
+    # Populated for channels served from the channel store
+    id: Optional[str] = None
+    probe_status: Optional[str] = None
+    resolution: Optional[str] = None
+
+# Channel-heavy endpoints keep `response_model` for the OpenAPI schema but
+# return rows shaped like Channel straight from the store through orjson,
+# skipping per-row pydantic validation and serialization.
+CHANNEL_FIELDS = tuple(Channel.model_fields)
+CHANNEL_PROJECTION = {"_id": 0, **{field: 1 for field in CHANNEL_FIELDS}}
+
+
+def channel_record(doc: dict) -> dict:
+    """Shape a stored channel like a serialized Channel (missing optionals as null)."""
+    return {field: doc.get(field) for field in CHANNEL_FIELDS}
+
+
+def channel_list_response(docs: List[dict], response: Optional[Response] = None) -> ORJSONResponse:
+    """Encode stored channel rows as a JSON list, keeping headers set on `response`."""
+    return ORJSONResponse(
+        [channel_record(doc) for doc in docs],
+        headers=dict(response.headers) if response is not None else None,
+    )
+
+# `format=` values for unbounded channel lists. "json" buffers a single
+# array (the default, unchanged for existing clients); "ndjson" and
+# "json-stream" (one chunked JSON array) are fed from a database cursor, so
+# time to first byte and memory no longer grow with the result size.
+CHANNEL_LIST_FORMAT_PATTERN = "^(json|ndjson|json-stream)$"
+
+
+async def encode_channel_stream(docs, list_format: str):
+    """Yield stored channel rows as NDJSON lines or one JSON array, a batch per chunk."""
+    if list_format == "json-stream":
+        yield b"["
+    first = True
+    batch = []
+    async for doc in docs:
+        batch.append(orjson.dumps(channel_record(doc)))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield encode_channel_batch(batch, list_format, first)
+            first = False
+            batch = []
+    if batch:
+        yield encode_channel_batch(batch, list_format, first)
+    if list_format == "json-stream":
+        yield b"]"
+
+
+def encode_channel_batch(batch: List[bytes], list_format: str, first: bool) -> bytes:
+    """Join encoded rows for one chunk of a channel stream."""
+    if list_format == "ndjson":
+        return b"\n".join(batch) + b"\n"
+    return (b"" if first else b",") + b",".join(batch)
+
+
+async def channel_query_response(query: dict, list_format: str, response: Optional[Response] = None):
+    """Answer a channel-list query in the requested `format=`."""
+    cursor = db.channels.find(query, CHANNEL_PROJECTION)
+    if list_format == "json":
+        return channel_list_response(await cursor.to_list(None), response)
+    return StreamingResponse(
+        encode_channel_stream(cursor.batch_size(EXPORT_BATCH_SIZE), list_format),
+        media_type="application/x-ndjson" if list_format == "ndjson" else "application/json",
+        headers=dict(response.headers) if response is not None else None,
+    )
+
+class ChannelFacetValue(BaseModel):
+    value: Optional[str] = None
+    label: Optional[str] = None
+    count: int
+
+class ChannelExportRequest(BaseModel):
+    """Which stored channels to include in an M3U export. Filters combine with AND."""
+    playlist_ids: Optional[List[str]] = None
+    categories: Optional[List[str]] = None
+    monitored_only: bool = False
+    ids: Optional[List[str]] = None
+
+class Lineup(BaseModel):
+    """A tokenized, unauthenticated M3U URL for IPTV player apps."""
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    token: str = Field(default_factory=lambda: secrets.token_urlsafe(32))
+    name: str
+    tenant_id: str
+    playlist_ids: Optional[List[str]] = None
+    categories: Optional[List[str]] = None
+    monitored_only: bool = False
+    ids: Optional[List[str]] = None
+    created_by: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class LineupCreate(ChannelExportRequest):
+    name: str
+
+class ChannelBrowseResult(BaseModel):
+    channels: List[Channel]
+    total: int
+    facets: Dict[str, List[ChannelFacetValue]]
 
 class StreamProbeResult(BaseModel):
     url: str
@@ -555,9 +2156,94 @@ class StreamProbeResult(BaseModel):
     video_codec: Optional[str] = None
     stream_type: Optional[str] = None
     variants: Optional[List[dict]] = None
+    # Set by the fast probe mode
+    container: Optional[str] = None
+    bytes_read: Optional[int] = None
+
+class ChannelProbeBatchRequest(BaseModel):
+    """Channels to probe in one batch: explicit ids, or a category/playlist."""
+    ids: Optional[List[str]] = None
+    category: Optional[str] = None
+    playlist_id: Optional[str] = None
+    method: str = "http"  # http, fast, ffmpeg or hls
+    profile: str = "fast"  # ffprobe profile when method is ffmpeg: fast or deep
+    concurrency: Optional[int] = None
+    force: bool = False  # bypass cached probe results
+
+class ProbeSample(BaseModel):
+    """One health check outcome from the `probe_samples` time series."""
+    model_config = ConfigDict(extra="ignore")
+    ts: datetime
+    status: str  # online or offline
+    response_time: Optional[float] = None
+    resolution: Optional[str] = None
+
+class ChannelProbeState(BaseModel):
+    """Last known probe outcome of a stored channel."""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    probe_status: Optional[str] = None
+    resolution: Optional[str] = None
+    last_probed_at: Optional[str] = None
+    response_time: Optional[float] = None
+
+class ChannelHealthHistory(BaseModel):
+    channel_id: str
+    url: str
+    probe_status: Optional[str] = None
+    last_probed_at: Optional[str] = None
+    checks: int
+    up_ratio: Optional[float] = None
+    samples: List[ProbeSample]
+
+class ProbeMetricPoint(BaseModel):
+    """A raw sample or a rollup bucket; response times are in seconds."""
+    model_config = ConfigDict(extra="ignore")
+    bucket: datetime
+    count: int
+    up_ratio: float
+    min: Optional[float] = None
+    avg: Optional[float] = None
+    max: Optional[float] = None
+    p95: Optional[float] = None
+
+class ProbeMetrics(BaseModel):
+    channel_id: str
+    tier: str  # raw, 5m or 1h
+    bucket_seconds: int
+    start: datetime
+    end: datetime
+    points: List[ProbeMetricPoint]
+
+class HLSSegmentMeasurement(BaseModel):
+    duration: Optional[float] = None  # EXTINF seconds
+    bytes: int
+    complete: bool  # False when cut off at HLS_PROBE_MAX_SEGMENT_BYTES
+    ttfb: Optional[float] = None
+    download_seconds: Optional[float] = None
+    throughput_kbps: Optional[int] = None
+    reliable: bool = False  # False when the download was too short to time
+
+class HLSProbeResult(BaseModel):
+    url: str
+    online: bool
+    response_time: Optional[float] = None
+    error: Optional[str] = None
+    bitrate: Optional[str] = None
+    resolution: Optional[str] = None
+    variant_url: Optional[str] = None
+    declared_bandwidth: Optional[int] = None  # bits per second
+    target_duration: Optional[float] = None
+    segments: List[HLSSegmentMeasurement] = []
+    ttfb: Optional[float] = None
+    throughput_kbps: Optional[int] = None
+    throughput_reliable: Optional[bool] = None
+    bandwidth_ratio: Optional[float] = None
+    buffering_risk: Optional[bool] = None
 
 class FFmpegProbeResult(BaseModel):
     url: str
+    profile: Optional[str] = None
     online: bool
     status: str
     format: Optional[str] = None
@@ -569,19 +2255,64 @@ class FFmpegProbeResult(BaseModel):
     audio_codec: Optional[str] = None
     audio_sample_rate: Optional[str] = None
     audio_channels: Optional[str] = None
+    # Measured over a packet sample by the deep profile
+    measured_fps: Optional[str] = None
+    measured_bitrate: Optional[str] = None
     error: Optional[str] = None
     raw_data: Optional[dict] = None
 
+class ChannelEvent(BaseModel):
+    """A monitored channel appearing in or disappearing from a playlist."""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    seq: int
+    type: str  # appeared or disappeared
+    channel_id: str
+    name: Optional[str] = None
+    url: Optional[str] = None
+    group: Optional[str] = None
+    logo: Optional[str] = None
+    playlist_id: Optional[str] = None
+    playlist_name: Optional[str] = None
+    occurred_at: datetime
+
+class ChannelEventFeed(BaseModel):
+    events: List[ChannelEvent]
+    next_since: int
+    has_more: bool
+
+class ChannelChange(BaseModel):
+    """One entry in a tenant's channel change log."""
+    model_config = ConfigDict(extra="ignore")
+    seq: int
+    op: str  # upsert or delete
+    channel_id: str
+    channel: Optional[Channel] = None  # current state, for upserts
+    monitored: Optional[bool] = None
+    occurred_at: datetime
+
+class ChannelChangeFeed(BaseModel):
+    changes: List[ChannelChange]
+    next_since: int
+    has_more: bool
+    # The log no longer covers `since`; reload the full catalog, then
+    # continue from `next_since`
+    resync_required: bool = False
+
 class MonitoredCategory(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     tenant_id: str
-    category: str
+    category: str  # category name, or the pattern for glob/regex rules
+    match_type: str = "exact"  # exact, glob or regex
+    target: str = "category"  # category or channel_name
     created_by: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class MonitoredCategoryCreate(BaseModel):
     category: str
+    match_type: str = "exact"
+    target: str = "category"
 
 class ThemeUpdate(BaseModel):
     theme: str
@@ -1052,11 +2783,20 @@ async def create_tenant(tenant_data: TenantCreate, current_user: User = Depends(
     return Tenant(**tenant_doc)
 
 @api_router.get("/tenants", response_model=List[Tenant])
-async def get_tenants(current_user: User = Depends(get_current_user)):
+async def get_tenants(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+):
     if current_user.role != "super_admin":
         raise HTTPException(status_code=403, detail="Only super admins can view all tenants")
     
-    tenants = await db.tenants.find({}, {"_id": 0}).to_list(1000)
+    projection = fields_projection(fields, Tenant)
+    tenants = await find_page(db.tenants, {}, projection or {"_id": 0}, limit, cursor, response)
+    if projection:
+        return selected_fields_response(tenants, response)
     for tenant in tenants:
         if tenant.get('created_at') and isinstance(tenant['created_at'], str):
             tenant['created_at'] = datetime.fromisoformat(tenant['created_at'])
@@ -1086,6 +2826,8 @@ async def update_tenant(tenant_id: str, tenant_data: TenantUpdate, current_user:
     
     if update_fields:
         await db.tenants.update_one({"id": tenant_id}, {"$set": update_fields})
+        # Rendered lineups capture the tenant's expiration date
+        invalidate_tenant_lineups(tenant_id)
     
     updated_tenant = await db.tenants.find_one({"id": tenant_id}, {"_id": 0})
     if updated_tenant.get('created_at') and isinstance(updated_tenant['created_at'], str):
@@ -1152,9 +2894,17 @@ async def create_user(user_data: UserCreate, current_user: User = Depends(get_cu
     return user
 
 @api_router.get("/users", response_model=List[User])
-async def get_users(current_user: User = Depends(get_current_user), tenant_id: Optional[str] = None):
+async def get_users(
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    tenant_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
     if current_user.role == "user":
         raise HTTPException(status_code=403, detail="Access denied")
+    projection = fields_projection(fields, User)
     
     query = {}
     if current_user.role == "tenant_owner":
@@ -1163,7 +2913,9 @@ async def get_users(current_user: User = Depends(get_current_user), tenant_id: O
         # Allow filtering by tenant_id for super admins
         query = {"tenant_id": tenant_id}
     
-    users = await db.users.find(query, {"_id": 0, "password": 0}).to_list(1000)
+    users = await find_page(db.users, query, projection or {"_id": 0, "password": 0}, limit, cursor, response)
+    if projection:
+        return selected_fields_response(users, response)
     
     for user in users:
         if isinstance(user['created_at'], str):
@@ -1220,7 +2972,11 @@ async def update_user(user_id: str, user_data: UserUpdate, current_user: User =
     return User(**updated_doc)
 
 # M3U Playlist routes
-@api_router.post("/m3u", response_model=M3UPlaylist)
+# Projection for playlist listings: the raw content is only served by
+# GET /m3u/{playlist_id}/content, and the category stats by /categories.
+PLAYLIST_SUMMARY_PROJECTION = {"_id": 0, "content": 0, "category_stats": 0}
+
+@api_router.post("/m3u", response_model=M3UPlaylistSummary)
 async def create_m3u(playlist_data: M3UPlaylistCreate, current_user: User = Depends(get_current_user)):
     if current_user.role == "user":
         raise HTTPException(status_code=403, detail="Only admins and tenant owners can create playlists")
@@ -1240,6 +2996,8 @@ async def create_m3u(playlist_data: M3UPlaylistCreate, current_user: User = Depe
     playlist_doc = playlist.model_dump()
     playlist_doc['created_at'] = playlist_doc['created_at'].isoformat()
     playlist_doc['updated_at'] = playlist_doc['updated_at'].isoformat()
+    # The body goes to GridFS during ingest, never into the document
+    content = playlist_doc.pop('content', None)
     
     # Fetch player API data if URL provided
     if playlist_data.player_api:
@@ -1250,9 +3008,10 @@ async def create_m3u(playlist_data: M3UPlaylistCreate, current_user: User = Depe
         playlist_doc['api_last_checked'] = datetime.now(timezone.utc).isoformat()
     
     await db.m3u_playlists.insert_one(playlist_doc)
+    await ingest_playlist_content(playlist_doc, content)
     
     # Return the updated playlist with API data
-    updated_doc = await db.m3u_playlists.find_one({"id": playlist.id}, {"_id": 0})
+    updated_doc = await db.m3u_playlists.find_one({"id": playlist.id}, PLAYLIST_SUMMARY_PROJECTION)
     
     if isinstance(updated_doc['created_at'], str):
         updated_doc['created_at'] = datetime.fromisoformat(updated_doc['created_at'])
@@ -1261,168 +3020,1178 @@ async def create_m3u(playlist_data: M3UPlaylistCreate, current_user: User = Depe
     if updated_doc.get('api_last_checked') and isinstance(updated_doc['api_last_checked'], str):
         updated_doc['api_last_checked'] = datetime.fromisoformat(updated_doc['api_last_checked'])
     
-    return M3UPlaylist(**updated_doc)
+    return M3UPlaylistSummary(**updated_doc)
+
+@api_router.get("/m3u", response_model=List[M3UPlaylistSummary])
+async def get_m3u_playlists(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+):
+    projection = fields_projection(fields, M3UPlaylistSummary)
+    
+    # Super admins can see all playlists, regular users see their tenant's playlists
+    if current_user.role == "super_admin":
+        query, scope = {}, ALL_TENANTS_SCOPE
+    else:
+        if not current_user.tenant_id:
+            raise HTTPException(status_code=400, detail="User must belong to a tenant")
+        query, scope = {"tenant_id": current_user.tenant_id}, current_user.tenant_id
+    
+    not_modified = await catalog_not_modified(request, response, scope)
+    if not_modified:
+        return not_modified
+    
+    playlists = await find_page(
+        db.m3u_playlists, query, projection or PLAYLIST_SUMMARY_PROJECTION, limit, cursor, response
+    )
+    if projection:
+        return selected_fields_response(playlists, response)
+    
+    for playlist in playlists:
+        if isinstance(playlist['created_at'], str):
+            playlist['created_at'] = datetime.fromisoformat(playlist['created_at'])
+        if isinstance(playlist['updated_at'], str):
+            playlist['updated_at'] = datetime.fromisoformat(playlist['updated_at'])
+        if playlist.get('last_refresh') and isinstance(playlist['last_refresh'], str):
+            playlist['last_refresh'] = datetime.fromisoformat(playlist['last_refresh'])
+        if playlist.get('api_last_checked') and isinstance(playlist['api_last_checked'], str):
+            playlist['api_last_checked'] = datetime.fromisoformat(playlist['api_last_checked'])
+    
+    return playlists
+
+@api_router.put("/m3u/{playlist_id}", response_model=M3UPlaylistSummary)
+async def update_m3u(playlist_id: str, playlist_data: M3UPlaylistUpdate, current_user: User = Depends(get_current_user)):
+    if current_user.role == "user":
+        raise HTTPException(status_code=403, detail="Only admins and tenant owners can update playlists")
+    
+    playlist_doc = await db.m3u_playlists.find_one({"id": playlist_id}, PLAYLIST_SUMMARY_PROJECTION)
+    if not playlist_doc:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    
+    if playlist_doc['tenant_id'] != current_user.tenant_id:
+        raise HTTPException(status_code=403, detail="Can only update playlists in your tenant")
+    
+    update_data = {k: v for k, v in playlist_data.model_dump().items() if v is not None}
+    update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
+    content = update_data.pop('content', None)
+    
+    await db.m3u_playlists.update_one({"id": playlist_id}, {"$set": update_data})
+    if content is not None:
+        await ingest_playlist_content({**playlist_doc, **update_data}, content)
+    elif 'name' in update_data:
+        await db.channels.update_many(
+            {"playlist_id": playlist_id},
+            {"$set": {"playlist_name": update_data['name']}}
+        )
+        await bump_channels_version(playlist_doc['tenant_id'])
+        renamed = await db.channels.find({"playlist_id": playlist_id}, {"_id": 0}).to_list(None)
+        await record_channel_changes(playlist_doc['tenant_id'], renamed)
+    await bump_data_version(playlist_doc['tenant_id'])
+    
+    updated_doc = await db.m3u_playlists.find_one({"id": playlist_id}, PLAYLIST_SUMMARY_PROJECTION)
+    
+    if isinstance(updated_doc['created_at'], str):
+        updated_doc['created_at'] = datetime.fromisoformat(updated_doc['created_at'])
+    if isinstance(updated_doc['updated_at'], str):
+        updated_doc['updated_at'] = datetime.fromisoformat(updated_doc['updated_at'])
+    if updated_doc.get('last_refresh') and isinstance(updated_doc['last_refresh'], str):
+        updated_doc['last_refresh'] = datetime.fromisoformat(updated_doc['last_refresh'])
+    
+    return M3UPlaylistSummary(**updated_doc)
+
+@api_router.delete("/m3u/{playlist_id}")
+async def delete_m3u(playlist_id: str, current_user: User = Depends(get_current_user)):
+    if current_user.role == "user":
+        raise HTTPException(status_code=403, detail="Only admins and tenant owners can delete playlists")
+    
+    playlist_doc = await db.m3u_playlists.find_one({"id": playlist_id}, PLAYLIST_SUMMARY_PROJECTION)
+    if not playlist_doc:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    
+    if playlist_doc['tenant_id'] != current_user.tenant_id:
+        raise HTTPException(status_code=403, detail="Can only delete playlists in your tenant")
+    
+    await db.m3u_playlists.delete_one({"id": playlist_id})
+    gone = await db.channels.find(
+        {"playlist_id": playlist_id, "monitored": True},
+        {"_id": 0}
+    ).to_list(None)
+    removed_ids = await db.channels.distinct("id", {"playlist_id": playlist_id})
+    await db.channels.delete_many({"playlist_id": playlist_id})
+    await bump_channels_version(playlist_doc['tenant_id'])
+    await record_channel_changes(playlist_doc['tenant_id'], [], removed_ids)
+    await record_channel_events(playlist_doc['tenant_id'], [("disappeared", doc) for doc in gone])
+    await release_playlist_body(playlist_doc.get('content_digest'))
+    return {"message": "Playlist deleted successfully"}
+
+@api_router.post("/m3u/refresh")
+async def trigger_refresh(current_user: User = Depends(get_current_user)):
+    """Manually trigger M3U playlist refresh"""
+    if current_user.role not in ["super_admin", "tenant_owner"]:
+        raise HTTPException(status_code=403, detail="Only admins and tenant owners can refresh playlists")
+    
+    asyncio.create_task(refresh_m3u_playlists())
+    return {"message": "Playlist refresh triggered"}
+
+@api_router.get("/m3u/refresh/status")
+async def get_refresh_status(current_user: User = Depends(get_current_user)):
+    """Get the status of the refresh job"""
+    job = scheduler.get_job('refresh_m3u_playlists')
+    if job:
+        return {
+            "next_run": job.next_run_time.isoformat() if job.next_run_time else None,
+            "interval": "1 hour"
+        }
+    return {"message": "Refresh job not scheduled"}
+
+@api_router.get("/channels/search", response_model=List[Channel])
+async def search_channels(q: str, current_user: User = Depends(get_current_user)):
+    """Search for channels across all playlists in user's tenant (or all tenants for super admin)"""
+    
+    # Build query filter
+    if current_user.role == "super_admin":
+        # Super admin can search across all tenants
+        query_filter = {}
+    else:
+        # Regular users search within their tenant
+        if not current_user.tenant_id:
+            raise HTTPException(status_code=400, detail="User must belong to a tenant")
+        query_filter = {"tenant_id": current_user.tenant_id}
+    
+    # Case-insensitive substring match against the channel store
+    query_filter["name"] = {"$regex": re.escape(q), "$options": "i"}
+    channels = await db.channels.find(query_filter, CHANNEL_PROJECTION).limit(100).to_list(100)  # Limit to 100 results
+    
+    return channel_list_response(channels)
+
+async def record_probe_result(current_user: User, url: str, online: bool, resolution: Optional[str]):
+    """Store the outcome of a probe on every stored channel with that URL.
+
+    Scoped to the caller's tenant; super admins without a tenant update the
+    URL across all tenants.
+    """
+    await store_probe_result(current_user.tenant_id, url, online, resolution)
+
+async def store_probe_result(
+    tenant_id: Optional[str],
+    url: str,
+    online: bool,
+    resolution: Optional[str],
+    response_time: Optional[float] = None
+):
+    """Store a probe outcome on the tenant's channels with that URL (all tenants when None).
+
+    The resolution and response time are only overwritten when the probe
+    reported one.
+    """
+    query = {"url": url}
+    if tenant_id:
+        query["tenant_id"] = tenant_id
+    update = {"probe_status": "online" if online else "offline"}
+    if resolution:
+        update["resolution"] = resolution
+    
+    # Only a changed status or resolution moves the tenants' data version
+    changed = {**query, "$or": [{field: {"$ne": value}} for field, value in update.items()]}
+    changed_docs = await db.channels.find(changed, {"_id": 0}).to_list(None)
+    if changed_docs:
+        await db.channels.update_many({"id": {"$in": [doc['id'] for doc in changed_docs]}}, {"$set": update})
+    probed = {"last_probed_at": datetime.now(timezone.utc).isoformat()}
+    if response_time is not None:
+        probed["response_time"] = response_time
+    await db.channels.update_many(query, {"$set": probed})
+    for tenant_id in {doc['tenant_id'] for doc in changed_docs}:
+        await bump_data_version(tenant_id)
+        await record_channel_changes(
+            tenant_id,
+            [{**doc, **update} for doc in changed_docs if doc['tenant_id'] == tenant_id],
+        )
+
+@api_router.post("/channels/probe", response_model=StreamProbeResult)
+async def probe_channel(
+    url: str,
+    force: bool = False,
+    mode: str = Query("full", pattern="^(full|fast)$"),
+    current_user: User = Depends(get_current_user),
+):
+    """Probe a stream URL to check if it's online (cached briefly; force=true re-probes).
+
+    `mode=fast` reads only the first few kilobytes to sniff the container.
+    """
+    result = await cached_probe("fast" if mode == "fast" else "http", url, force)
+    await record_probe_result(current_user, url, result["online"], result.get("resolution"))
+    return StreamProbeResult(**result)
+
+@api_router.post("/channels/probe-ffmpeg", response_model=FFmpegProbeResult)
+async def probe_channel_ffmpeg(
+    url: str,
+    force: bool = False,
+    profile: str = Query("fast", pattern="^(fast|deep)$"),
+    current_user: User = Depends(get_current_user)
+):
+    """Probe a stream URL using FFmpeg/ffprobe for detailed information (cached briefly; force=true re-probes).
+
+    `profile=fast` (the default) reads as little of the stream as possible;
+    `deep` also measures frame rate and bitrate.
+    """
+    probe_tenant.set(current_user.tenant_id)
+    result = await cached_probe("ffmpeg", url, force, profile)
+    await record_probe_result(current_user, url, result["online"], result.get("video_resolution"))
+    return FFmpegProbeResult(**result)
+
+@api_router.post("/channels/probe-hls", response_model=HLSProbeResult)
+async def probe_channel_hls(url: str, force: bool = False, current_user: User = Depends(get_current_user)):
+    """Deep-probe an HLS stream: download real segments and compare throughput with the declared bandwidth (cached briefly; force=true re-probes)"""
+    result = await cached_probe("hls", url, force)
+    await record_probe_result(current_user, url, result["online"], result.get("resolution"))
+    return HLSProbeResult(**result)
+
+# Batch probing. Each distinct URL is probed once, at most
+# PROBE_BATCH_MAX_CONCURRENCY at a time per batch.
+PROBE_BATCH_MAX_CONCURRENCY = int(os.environ.get('PROBE_BATCH_MAX_CONCURRENCY', '8'))
+PROBE_BATCH_MAX_CHANNELS = int(os.environ.get('PROBE_BATCH_MAX_CHANNELS', '2000'))
+PROBE_METHODS = {
+    "http": probe_stream,
+    "fast": probe_stream_fast,
+    "ffmpeg": probe_stream_ffmpeg,
+    "hls": probe_stream_hls,
+}
+
+# Probe results are cached per (method, normalized URL) and concurrent probes
+# of the same URL share one in-flight probe, so several users opening the
+# same channel cost the provider a single connection.
+PROBE_CACHE_TTL_SECONDS = int(os.environ.get('PROBE_CACHE_TTL_SECONDS', '60'))
+PROBE_CACHE_MAX_ENTRIES = int(os.environ.get('PROBE_CACHE_MAX_ENTRIES', '5000'))
+_probe_cache: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (expires_at, result)
+_probe_inflight: Dict[tuple, asyncio.Task] = {}
+
+
+def normalize_probe_url(url: str) -> str:
+    """Canonical form of a stream URL for cache keys.
+
+    Scheme and host are case-insensitive and default ports are dropped;
+    the path and query (which often carry credentials) are kept verbatim.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        # Malformed port; key on the URL as given and let the probe fail
+        return url.strip()
+    if port and (scheme, port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+    if parts.username or parts.password:
+        host = f"{parts.username or ''}:{parts.password or ''}@{host}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+async def cached_probe(method: str, url: str, force: bool = False, profile: Optional[str] = None) -> dict:
+    """Probe a URL through the result cache, joining any identical probe in flight.
+
+    `force` skips a cached result (but still shares a probe already
+    running, which is fresh by definition). `profile` selects the ffprobe
+    profile for the ffmpeg method.
+    """
+    key = (method, profile, normalize_probe_url(url))
+    if not force:
+        cached = _probe_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return dict(cached[1])
+    task = _probe_inflight.get(key)
+    if task is None:
+        probe = PROBE_METHODS[method](url, profile) if profile else PROBE_METHODS[method](url)
+        task = asyncio.create_task(probe)
+        _probe_inflight[key] = task
+
+        def store(done: asyncio.Task):
+            _probe_inflight.pop(key, None)
+            if not done.cancelled() and done.exception() is None:
+                _probe_cache[key] = (time.monotonic() + PROBE_CACHE_TTL_SECONDS, done.result())
+                _probe_cache.move_to_end(key)
+                while len(_probe_cache) > PROBE_CACHE_MAX_ENTRIES:
+                    _probe_cache.popitem(last=False)
+
+        task.add_done_callback(store)
+    # Shielded so one waiter disconnecting does not cancel the others' probe
+    return dict(await asyncio.shield(task))
+
+
+def summarize_probe_result(method: str, result: dict) -> dict:
+    """Reduce a probe_stream / probe_stream_ffmpeg result to the batch line fields."""
+    return {
+        "online": result["online"],
+        "resolution": result.get("video_resolution") if method == "ffmpeg" else result.get("resolution"),
+        "bitrate": result.get("measured_bitrate") or result.get("bitrate"),
+        "video_codec": result.get("video_codec"),
+        "response_time": result.get("response_time"),
+        "error": result.get("error"),
+    }
+
+
+async def run_probe_batch(
+    current_user: User,
+    channels: List[dict],
+    method: str,
+    concurrency: int,
+    force: bool = False,
+    profile: Optional[str] = None
+):
+    """Probe channels concurrently, yielding an NDJSON line per URL as it completes.
+
+    Channels sharing a URL are reported together from a single probe. The
+    last line is a summary. Probes still running when the client goes away
+    are cancelled.
+    """
+    started = datetime.now(timezone.utc)
+    probe_tenant.set(current_user.tenant_id)
+    by_url: Dict[str, List[dict]] = {}
+    for channel in channels:
+        by_url.setdefault(channel['url'], []).append(channel)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def probe(url: str):
+        async with semaphore:
+            return url, await cached_probe(method, url, force, profile)
+
+    tasks = [asyncio.create_task(probe(url)) for url in by_url]
+    online = 0
+    try:
+        for finished in asyncio.as_completed(tasks):
+            url, result = await finished
+            summary = summarize_probe_result(method, result)
+            await record_probe_result(current_user, url, summary["online"], summary["resolution"])
+            online += summary["online"]
+            yield orjson.dumps({
+                "type": "result",
+                "url": url,
+                "channels": [{"id": c['id'], "name": c.get('name')} for c in by_url[url]],
+                **summary,
+            }) + b"\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+    yield orjson.dumps({
+        "type": "summary",
+        "channels": len(channels),
+        "urls": len(by_url),
+        "online": online,
+        "offline": len(by_url) - online,
+        "elapsed": (datetime.now(timezone.utc) - started).total_seconds(),
+    }) + b"\n"
+
+
+@api_router.post("/channels/probe/batch")
+async def probe_channel_batch(batch: ChannelProbeBatchRequest, current_user: User = Depends(get_current_user)):
+    """Probe many stored channels in one request, streaming results as NDJSON.
+
+    Select channels by `ids`, or by `category` and/or `playlist_id`.
+    Results arrive one line per URL in completion order, followed by a
+    summary line; each outcome is also recorded on the stored channels.
+    """
+    if batch.method not in PROBE_METHODS:
+        raise HTTPException(status_code=400, detail="Method must be 'http', 'fast', 'ffmpeg' or 'hls'")
+    if batch.profile not in FFPROBE_PROFILES:
+        raise HTTPException(status_code=400, detail="Profile must be 'fast' or 'deep'")
+    if not batch.ids and not batch.category and not batch.playlist_id:
+        raise HTTPException(status_code=400, detail="Provide ids, a category or a playlist_id")
+    
+    query = {}
+    if current_user.role != "super_admin":
+        if not current_user.tenant_id:
+            raise HTTPException(status_code=400, detail="User must belong to a tenant")
+        query["tenant_id"] = current_user.tenant_id
+    if batch.ids:
+        query["id"] = {"$in": batch.ids}
+    if batch.category:
+        query["category"] = batch.category
+    if batch.playlist_id:
+        query["playlist_id"] = batch.playlist_id
+    
+    channels = await db.channels.find(
+        query,
+        {"_id": 0, "id": 1, "name": 1, "url": 1}
+    ).limit(PROBE_BATCH_MAX_CHANNELS + 1).to_list(PROBE_BATCH_MAX_CHANNELS + 1)
+    if len(channels) > PROBE_BATCH_MAX_CHANNELS:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {PROBE_BATCH_MAX_CHANNELS} channels")
+    
+    concurrency = min(batch.concurrency or PROBE_BATCH_MAX_CONCURRENCY, PROBE_BATCH_MAX_CONCURRENCY)
+    return StreamingResponse(
+        run_probe_batch(
+            current_user, channels, batch.method, max(concurrency, 1), batch.force,
+            batch.profile if batch.method == "ffmpeg" else None
+        ),
+        media_type="application/x-ndjson",
+    )
+
+# Background health checks. Every HEALTH_CHECK_INTERVAL_MINUTES the channels
+# in monitored categories are probed, each URL once however many tenants
+# carry it. Probes are grouped by provider host so no provider sees more than
+# HEALTH_CHECK_PROVIDER_CONCURRENCY connections from us, spaced
+# HEALTH_CHECK_PROVIDER_DELAY_SECONDS apart. Outcomes are written to the
+# channels and appended to the `probe_samples` time series.
+HEALTH_CHECK_INTERVAL_MINUTES = int(os.environ.get('HEALTH_CHECK_INTERVAL_MINUTES', '5'))  # 0 disables
+HEALTH_CHECK_METHOD = os.environ.get('HEALTH_CHECK_METHOD', 'http')
+HEALTH_CHECK_PROVIDER_CONCURRENCY = int(os.environ.get('HEALTH_CHECK_PROVIDER_CONCURRENCY', '2'))
+HEALTH_CHECK_PROVIDER_DELAY_SECONDS = float(os.environ.get('HEALTH_CHECK_PROVIDER_DELAY_SECONDS', '0.5'))
+PROBE_HISTORY_RETENTION_DAYS = int(os.environ.get('PROBE_HISTORY_RETENTION_DAYS', '14'))
+
+
+def provider_key(url: str) -> str:
+    """Host (and non-default port) a stream URL is served from."""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        # Malformed or out-of-range port; group by host alone
+        return host
+    if port and (parts.scheme.lower(), port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+    return host
+
+
+async def check_provider_channels(urls: Dict[str, set]) -> List[dict]:
+    """Probe one provider's URLs within its rate limit; returns the samples to store.
+
+    `urls` maps each URL to the tenants whose monitored channels use it.
+    """
+    semaphore = asyncio.Semaphore(max(HEALTH_CHECK_PROVIDER_CONCURRENCY, 1))
+
+    async def check(url: str, tenant_ids: set) -> List[dict]:
+        try:
+            async with semaphore:
+                probe_tenant.set(min(tenant_ids))
+                result = await cached_probe(HEALTH_CHECK_METHOD, url, force=True)
+                await asyncio.sleep(HEALTH_CHECK_PROVIDER_DELAY_SECONDS)
+            summary = summarize_probe_result(HEALTH_CHECK_METHOD, result)
+            checked_at = datetime.now(timezone.utc)
+            samples = []
+            for tenant_id in tenant_ids:
+                await store_probe_result(
+                    tenant_id, url, summary["online"], summary["resolution"], summary["response_time"]
+                )
+                samples.append({
+                    "ts": checked_at,
+                    "meta": {"tenant_id": tenant_id, "url": url},
+                    "status": "online" if summary["online"] else "offline",
+                    "response_time": summary["response_time"],
+                    "resolution": summary["resolution"],
+                })
+            return samples
+        except Exception as e:
+            logger.error(f"Health check failed for {url}: {str(e)}")
+            return []
+
+    batches = await asyncio.gather(*(check(url, tenant_ids) for url, tenant_ids in urls.items()))
+    return [sample for batch in batches for sample in batch]
+
+
+async def run_health_checks():
+    """Probe every channel in a monitored category and record the outcome."""
+    try:
+        providers: Dict[str, Dict[str, set]] = {}
+        async for doc in db.channels.find({"monitored": True}, {"_id": 0, "tenant_id": 1, "url": 1}):
+            providers.setdefault(provider_key(doc['url']), {}).setdefault(doc['url'], set()).add(doc['tenant_id'])
+        if not providers:
+            return
+        
+        started = time.monotonic()
+        batches = await asyncio.gather(*(check_provider_channels(urls) for urls in providers.values()))
+        samples = [sample for batch in batches for sample in batch]
+        if samples:
+            await db.probe_samples.insert_many(samples, ordered=False)
+            await db.probe_rollup_state.update_many(
+                {}, {"$min": {"dirty_from": min(sample['ts'] for sample in samples)}}
+            )
+        logger.info(
+            f"Health check probed {sum(len(urls) for urls in providers.values())} URLs "
+            f"across {len(providers)} providers in {time.monotonic() - started:.1f}s"
+        )
+    except Exception as e:
+        logger.error(f"Error in run_health_checks: {str(e)}")
+
+
+async def ensure_probe_samples_collection():
+    """Create `probe_samples` as a time-series collection with TTL retention.
+
+    Time-series collections need MongoDB 5.0+; older servers get a regular
+    collection with a TTL index on `ts` instead. Samples store `ts` as a BSON
+    date (not an ISO string) because both kinds of expiry require one.
+    """
+    expire = PROBE_HISTORY_RETENTION_DAYS * 86400
+    if not await db.list_collection_names(filter={"name": "probe_samples"}):
+        try:
+            await db.create_collection(
+                "probe_samples",
+                timeseries={"timeField": "ts", "metaField": "meta", "granularity": "minutes"},
+                expireAfterSeconds=expire,
+            )
+        except OperationFailure as e:
+            logger.info(f"Time-series collections unavailable, using a TTL index for probe_samples: {str(e)}")
+    
+    info = await (await db.list_collections(filter={"name": "probe_samples"})).to_list(1)
+    if info and "timeseries" in info[0].get("options", {}):
+        if info[0]["options"].get("expireAfterSeconds") != expire:
+            await db.command({"collMod": "probe_samples", "expireAfterSeconds": expire})
+    else:
+        await ensure_ttl_index(db.probe_samples, "ts", "probe_samples_ttl", expire)
+    await db.probe_samples.create_index([("meta.tenant_id", ASCENDING), ("meta.url", ASCENDING), ("ts", ASCENDING)])
+    
+    for tier in PROBE_ROLLUP_TIERS:
+        collection = db[f"probe_rollups_{tier['name']}"]
+        await collection.create_index(
+            [("tenant_id", ASCENDING), ("url", ASCENDING), ("bucket", ASCENDING)], unique=True
+        )
+        await ensure_ttl_index(collection, "bucket", f"probe_rollups_{tier['name']}_ttl", tier['retention_days'] * 86400)
+
+
+# Probe metric rollups. Raw samples are summarised into 5 minute and 1 hour
+# buckets (response time min/avg/max/p95 and the share of checks that were
+# up), each tier in its own collection with its own retention. Both tiers are
+# computed from raw samples so percentiles stay exact. Health checks write
+# their samples when a run ends, stamped with each probe's time, so a long
+# run can land samples in buckets already rolled up; each insert lowers the
+# tiers' `dirty_from` mark and the next rollup recomputes from there.
+PROBE_ROLLUP_TIERS = [
+    {"name": "5m", "seconds": 300,
+     "retention_days": int(os.environ.get('PROBE_ROLLUP_5M_RETENTION_DAYS', '30'))},
+    {"name": "1h", "seconds": 3600,
+     "retention_days": int(os.environ.get('PROBE_ROLLUP_1H_RETENTION_DAYS', '365'))},
+]
+PROBE_ROLLUP_CHUNK_SECONDS = 6 * 3600  # raw window read per pass while catching up
+PROBE_ROLLUP_WRITE_BATCH = 1000
+PROBE_METRICS_MAX_POINTS = int(os.environ.get('PROBE_METRICS_MAX_POINTS', '300'))
+
+
+def bucket_start(ts: datetime, seconds: int) -> datetime:
+    """Start of the `seconds`-wide UTC bucket containing `ts` (naive values are UTC)."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return datetime.fromtimestamp(int(ts.timestamp()) // seconds * seconds, tz=timezone.utc)
+
+
+def rollup_pipeline(start: datetime, end: datetime, seconds: int) -> List[dict]:
+    """Aggregation grouping raw samples in [start, end) per (tenant, URL, bucket).
+
+    The database does the grouping, so a pass holds one group's response
+    times at a time rather than every sample in the window.
+    """
+    ts_ms = {"$toLong": "$ts"}
+    return [
+        {"$match": {"ts": {"$gte": start, "$lt": end}}},
+        {"$group": {
+            "_id": {
+                "tenant_id": "$meta.tenant_id",
+                "url": "$meta.url",
+                "bucket": {"$toDate": {"$subtract": [ts_ms, {"$mod": [ts_ms, seconds * 1000]}]}},
+            },
+            "count": {"$sum": 1},
+            "up": {"$sum": {"$cond": [{"$eq": ["$status", "online"]}, 1, 0]}},
+            "times": {"$push": "$response_time"},
+        }},
+    ]
+
+
+def summarize_rollup_group(group: dict) -> dict:
+    """Turn one `rollup_pipeline` group into a rollup doc."""
+    times = sorted(t for t in group['times'] if t is not None)
+    return {
+        **group['_id'],
+        "count": group['count'],
+        "up": group['up'],
+        "up_ratio": group['up'] / group['count'],
+        "min": times[0] if times else None,
+        "avg": sum(times) / len(times) if times else None,
+        "max": times[-1] if times else None,
+        "p95": times[math.ceil(0.95 * len(times)) - 1] if times else None,
+    }
+
+
+def rollup_start(state: dict, seconds: int) -> datetime:
+    """Where a tier's next rollup pass begins.
+
+    Where the last pass ended, or earlier when samples have been inserted
+    since for older buckets (`dirty_from`).
+    """
+    start = bucket_start(state['through'], seconds)
+    if state.get('dirty_from') is not None:
+        start = min(start, bucket_start(state['dirty_from'], seconds))
+    return start
+
+
+async def run_probe_rollups():
+    """Bring every rollup tier up to the last closed bucket."""
+    try:
+        now = datetime.now(timezone.utc)
+        for tier in PROBE_ROLLUP_TIERS:
+            seconds = tier['seconds']
+            collection = db[f"probe_rollups_{tier['name']}"]
+            # Take the late-sample mark as this pass starts; samples inserted
+            # from here on set a fresh one for the next pass
+            state = await db.probe_rollup_state.find_one_and_update(
+                {"tier": tier['name']}, {"$unset": {"dirty_from": ""}}
+            )
+            if state:
+                start = rollup_start(state, seconds)
+            else:
+                oldest = await db.probe_samples.find_one({}, {"ts": 1}, sort=[("ts", ASCENDING)])
+                if not oldest:
+                    continue
+                start = bucket_start(oldest['ts'], seconds)
+            end = bucket_start(now, seconds)
+            
+            written = 0
+            try:
+                while start < end:
+                    chunk_end = min(start + timedelta(seconds=PROBE_ROLLUP_CHUNK_SECONDS), end)
+                    ops = []
+                    async for group in db.probe_samples.aggregate(rollup_pipeline(start, chunk_end, seconds)):
+                        rollup = summarize_rollup_group(group)
+                        ops.append(UpdateOne(
+                            {"tenant_id": rollup['tenant_id'], "url": rollup['url'], "bucket": rollup['bucket']},
+                            {"$set": rollup},
+                            upsert=True,
+                        ))
+                        if len(ops) >= PROBE_ROLLUP_WRITE_BATCH:
+                            await collection.bulk_write(ops, ordered=False)
+                            written += len(ops)
+                            ops = []
+                    if ops:
+                        await collection.bulk_write(ops, ordered=False)
+                        written += len(ops)
+                    start = chunk_end
+            except Exception:
+                if state and state.get('dirty_from') is not None:
+                    await db.probe_rollup_state.update_one(
+                        {"tier": tier['name']}, {"$min": {"dirty_from": state['dirty_from']}}
+                    )
+                raise
+            
+            await db.probe_rollup_state.update_one(
+                {"tier": tier['name']}, {"$set": {"through": end}}, upsert=True
+            )
+            if written:
+                logger.info(f"Wrote {written} {tier['name']} probe rollups")
+    except Exception as e:
+        logger.error(f"Error in run_probe_rollups: {str(e)}")
+
+
+def select_metrics_tier(start: datetime, end: datetime, now: datetime) -> dict:
+    """Finest tier that still holds `start` and keeps the range under PROBE_METRICS_MAX_POINTS.
+
+    Falls back to the coarsest tier. The raw tier is sized by the health
+    check interval.
+    """
+    tiers = [
+        {"name": "raw", "seconds": max(HEALTH_CHECK_INTERVAL_MINUTES, 1) * 60,
+         "retention_days": PROBE_HISTORY_RETENTION_DAYS},
+        *PROBE_ROLLUP_TIERS,
+    ]
+    span = (end - start).total_seconds()
+    for tier in tiers:
+        if start >= now - timedelta(days=tier['retention_days']) and span / tier['seconds'] <= PROBE_METRICS_MAX_POINTS:
+            return tier
+    return tiers[-1]
+
+
+@api_router.get("/channels/{channel_id}/metrics", response_model=ProbeMetrics)
+async def get_channel_metrics(
+    channel_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Probe metrics for a stored channel between `start` and `end` (default: the last 24 hours).
+
+    Points come from raw samples or the 5m/1h rollups, whichever is the
+    finest tier that covers the range within PROBE_METRICS_MAX_POINTS.
+    """
+    now = datetime.now(timezone.utc)
+    end = end or now
+    start = start or end - timedelta(hours=24)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    query = {"id": channel_id}
+    if current_user.role != "super_admin":
+        query["tenant_id"] = current_user.tenant_id
+    channel = await db.channels.find_one(query, {"_id": 0, "id": 1, "tenant_id": 1, "url": 1})
+    if not channel:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    
+    tier = select_metrics_tier(start, end, now)
+    if tier['name'] == "raw":
+        samples = await db.probe_samples.find(
+            {"meta.tenant_id": channel['tenant_id'], "meta.url": channel['url'], "ts": {"$gte": start, "$lt": end}},
+            {"_id": 0}
+        ).sort("ts", ASCENDING).to_list(None)
+        points = [
+            {
+                "bucket": sample['ts'],
+                "count": 1,
+                "up_ratio": 1.0 if sample['status'] == "online" else 0.0,
+                "min": sample.get('response_time'),
+                "avg": sample.get('response_time'),
+                "max": sample.get('response_time'),
+                "p95": sample.get('response_time'),
+            }
+            for sample in samples
+        ]
+    else:
+        points = await db[f"probe_rollups_{tier['name']}"].find(
+            {
+                "tenant_id": channel['tenant_id'],
+                "url": channel['url'],
+                "bucket": {"$gte": bucket_start(start, tier['seconds']), "$lt": end},
+            },
+            {"_id": 0}
+        ).sort("bucket", ASCENDING).to_list(None)
+    
+    return ProbeMetrics(
+        channel_id=channel['id'],
+        tier=tier['name'],
+        bucket_seconds=tier['seconds'],
+        start=start,
+        end=end,
+        points=points,
+    )
+
+
+PROBE_STATE_MAX_IDS = 1000
+
+
+@api_router.get("/channels/status", response_model=List[ChannelProbeState])
+async def get_channel_probe_states(
+    response: Response,
+    ids: List[str] = Query(...),
+    current_user: User = Depends(get_current_user)
+):
+    """Last known probe outcome (status, time, response time) of stored channels.
+
+    Channel listings carry `probe_status` and `resolution`, which move the
+    data version when they change. The probe time and response time change
+    on every health check, so they are served here, uncached, instead of
+    invalidating every listing's ETag each run.
+    """
+    if len(ids) > PROBE_STATE_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {PROBE_STATE_MAX_IDS} ids per request")
+    query = {"id": {"$in": ids}}
+    if current_user.role != "super_admin":
+        query["tenant_id"] = current_user.tenant_id
+    docs = await db.channels.find(
+        query, {"_id": 0, "id": 1, "probe_status": 1, "resolution": 1, "last_probed_at": 1, "response_time": 1}
+    ).to_list(None)
+    response.headers["Cache-Control"] = "no-store"
+    return docs
+
+@api_router.get("/channels/{channel_id}/health", response_model=ChannelHealthHistory)
+async def get_channel_health(
+    channel_id: str,
+    hours: int = Query(24, ge=1),
+    current_user: User = Depends(get_current_user)
+):
+    """Last known status and probe history of a stored channel over the past `hours`."""
+    query = {"id": channel_id}
+    if current_user.role != "super_admin":
+        query["tenant_id"] = current_user.tenant_id
+    channel = await db.channels.find_one(
+        query, {"_id": 0, "id": 1, "tenant_id": 1, "url": 1, "probe_status": 1, "last_probed_at": 1}
+    )
+    if not channel:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    
+    since = datetime.now(timezone.utc) - timedelta(hours=min(hours, PROBE_HISTORY_RETENTION_DAYS * 24))
+    samples = await db.probe_samples.find(
+        {"meta.tenant_id": channel['tenant_id'], "meta.url": channel['url'], "ts": {"$gte": since}},
+        {"_id": 0, "ts": 1, "status": 1, "response_time": 1, "resolution": 1}
+    ).sort("ts", ASCENDING).to_list(None)
+    
+    up = sum(1 for sample in samples if sample['status'] == "online")
+    return ChannelHealthHistory(
+        channel_id=channel['id'],
+        url=channel['url'],
+        probe_status=channel.get('probe_status'),
+        last_probed_at=channel.get('last_probed_at'),
+        checks=len(samples),
+        up_ratio=up / len(samples) if samples else None,
+        samples=samples,
+    )
+
+@api_router.get("/channels/browse", response_model=ChannelBrowseResult)
+async def browse_channels(
+    playlist: Optional[List[str]] = Query(None),
+    category: Optional[List[str]] = Query(None),
+    probe_status: Optional[List[str]] = Query(None),
+    resolution: Optional[List[str]] = Query(None),
+    q: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user),
+):
+    """Faceted channel browse across playlists.
+
+    Every facet parameter may be repeated to accept several values. Returns
+    one page of matching channels, the total match count, and per-facet
+    value counts computed from the channel store.
+    """
+    if current_user.role == "super_admin":
+        base_match = {}
+    else:
+        if not current_user.tenant_id:
+            raise HTTPException(status_code=400, detail="User must belong to a tenant")
+        base_match = {"tenant_id": current_user.tenant_id}
+    if q:
+        base_match["name"] = {"$regex": re.escape(q), "$options": "i"}
+
+    filters = {
+        "playlist": playlist,
+        "category": category,
+        "probe_status": probe_status,
+        "resolution": resolution,
+    }
+    pipeline = build_channel_facet_pipeline(base_match, filters, skip, limit)
+    results = await db.channels.aggregate(pipeline).to_list(1)
+    result = results[0] if results else {}
+
+    facets = {}
+    for facet in CHANNEL_FACETS:
+        values = []
+        for bucket in result.get(facet, []):
+            value = bucket["_id"]
+            if facet == "resolution" and value is None:
+                value = "unknown"
+            values.append({"value": value, "label": bucket.get("label"), "count": bucket["count"]})
+        facets[facet] = values
+
+    total = result.get("total") or [{"count": 0}]
+    return ORJSONResponse({
+        "channels": [channel_record(c) for c in result.get("channels", [])],
+        "total": total[0]["count"],
+        "facets": facets,
+    })
+
+PLAYLIST_DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+
+def parse_byte_range(header: Optional[str], length: int) -> Optional[tuple]:
+    """Parse a single-range HTTP Range header against a body of `length` bytes.
+
+    Returns an inclusive (start, end) pair, or None when there is no usable
+    Range header (malformed or multi-range headers are ignored and the whole
+    body is sent). Raises ValueError when the range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, sep, end_text = header[len("bytes="):].strip().partition("-")
+    if not sep or (start_text and not start_text.isdigit()) or (end_text and not end_text.isdigit()):
+        return None
+    if not start_text:
+        # Suffix range: the last N bytes
+        if not end_text or int(end_text) == 0 or length == 0:
+            raise ValueError("Range not satisfiable")
+        return max(length - int(end_text), 0), length - 1
+    start = int(start_text)
+    end = int(end_text) if end_text else length - 1
+    if start >= length or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, length - 1)
+
+
+@api_router.get("/m3u/{playlist_id}/content")
+async def download_playlist_content(
+    playlist_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+):
+    """Download a playlist's raw M3U content.
 
-@api_router.get("/m3u", response_model=List[M3UPlaylist])
-async def get_m3u_playlists(current_user: User = Depends(get_current_user)):
-    # Super admins can see all playlists, regular users see their tenant's playlists
+    Streams the body from GridFS in chunks and honours single byte-range
+    requests, so large playlists are never loaded into memory whole.
+    """
+    playlist = await db.m3u_playlists.find_one(
+        {"id": playlist_id},
+        {"_id": 0, "tenant_id": 1, "content": 1, "content_digest": 1},
+    )
+    if not playlist:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    # Super admin may download any playlist; everyone else is tenant-scoped.
+    if current_user.role != "super_admin":
+        if not current_user.tenant_id:
+            raise HTTPException(status_code=400, detail="User must belong to a tenant")
+        if playlist.get('tenant_id') != current_user.tenant_id:
+            raise HTTPException(status_code=403, detail="Can only download playlists in your tenant")
+
+    headers = {
+        "Content-Disposition": f'attachment; filename="{playlist_id}.m3u"',
+        "Accept-Ranges": "bytes",
+    }
+    if playlist.get('content_digest'):
+        headers["ETag"] = f'"{playlist["content_digest"]}"'
+
+    grid_out = None
+    if playlist.get('content') is None and playlist.get('content_digest'):
+        try:
+            grid_out = await playlist_bodies.open_download_stream_by_name(playlist['content_digest'])
+        except NoFile:
+            raise HTTPException(status_code=404, detail="Playlist content not found")
+    if grid_out is None:
+        # Not migrated to GridFS yet; the inline body is already in memory
+        body = (playlist.get('content') or "").encode('utf-8')
+        return Response(content=body, media_type="audio/x-mpegurl", headers=headers)
+
+    length = grid_out.length
+    try:
+        byte_range = parse_byte_range(request.headers.get("range"), length)
+    except ValueError:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{length}"},
+        )
+    start, end = byte_range if byte_range else (0, length - 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    headers["Content-Length"] = str(max(end - start + 1, 0))
+
+    async def body_chunks():
+        grid_out.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await grid_out.read(min(PLAYLIST_DOWNLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    return StreamingResponse(
+        body_chunks(),
+        status_code=206 if byte_range else 200,
+        media_type="audio/x-mpegurl",
+        headers=headers,
+    )
+
+@api_router.post("/channels/export")
+async def export_channels(export_data: ChannelExportRequest, current_user: User = Depends(get_current_user)):
+    """Stream an M3U file of stored channels filtered by playlist, category,
+    monitored set and/or an explicit list of channel ids."""
     if current_user.role == "super_admin":
-        playlists = await db.m3u_playlists.find({}, {"_id": 0}).to_list(1000)
+        base_query = {}
     else:
         if not current_user.tenant_id:
             raise HTTPException(status_code=400, detail="User must belong to a tenant")
-        playlists = await db.m3u_playlists.find({"tenant_id": current_user.tenant_id}, {"_id": 0}).to_list(1000)
-    
-    for playlist in playlists:
-        if isinstance(playlist['created_at'], str):
-            playlist['created_at'] = datetime.fromisoformat(playlist['created_at'])
-        if isinstance(playlist['updated_at'], str):
-            playlist['updated_at'] = datetime.fromisoformat(playlist['updated_at'])
-        if playlist.get('last_refresh') and isinstance(playlist['last_refresh'], str):
-            playlist['last_refresh'] = datetime.fromisoformat(playlist['last_refresh'])
-        if playlist.get('api_last_checked') and isinstance(playlist['api_last_checked'], str):
-            playlist['api_last_checked'] = datetime.fromisoformat(playlist['api_last_checked'])
-    
-    return playlists
+        base_query = {"tenant_id": current_user.tenant_id}
+    
+    query = build_channel_export_query(
+        base_query,
+        playlist_ids=export_data.playlist_ids,
+        categories=export_data.categories,
+        monitored_only=export_data.monitored_only,
+        ids=export_data.ids,
+    )
+    filename = f"channels-export-{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.m3u"
+    return StreamingResponse(
+        stream_m3u_export(query),
+        media_type="audio/x-mpegurl",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
-@api_router.put("/m3u/{playlist_id}", response_model=M3UPlaylist)
-async def update_m3u(playlist_id: str, playlist_data: M3UPlaylistUpdate, current_user: User = Depends(get_current_user)):
-    if current_user.role == "user":
-        raise HTTPException(status_code=403, detail="Only admins and tenant owners can update playlists")
-    
-    playlist_doc = await db.m3u_playlists.find_one({"id": playlist_id}, {"_id": 0})
-    if not playlist_doc:
-        raise HTTPException(status_code=404, detail="Playlist not found")
-    
-    if playlist_doc['tenant_id'] != current_user.tenant_id:
-        raise HTTPException(status_code=403, detail="Can only update playlists in your tenant")
-    
-    update_data = {k: v for k, v in playlist_data.model_dump().items() if v is not None}
-    update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
-    
-    await db.m3u_playlists.update_one({"id": playlist_id}, {"$set": update_data})
-    
-    updated_doc = await db.m3u_playlists.find_one({"id": playlist_id}, {"_id": 0})
+# Rendered lineups by token. Entries are rebuilt only when the tenant's
+# channel version moves, so polling players are served from memory.
+LINEUP_CACHE_MAX_ENTRIES = int(os.environ.get('LINEUP_CACHE_MAX_ENTRIES', '256'))
+_lineup_cache: "OrderedDict[str, dict]" = OrderedDict()
+_lineup_locks: Dict[str, asyncio.Lock] = {}
+
+
+async def render_lineup(lineup: dict) -> dict:
+    """Render a lineup to identity and gzip bodies with strong ETags."""
+    query = build_channel_export_query(
+        {"tenant_id": lineup['tenant_id']},
+        playlist_ids=lineup.get('playlist_ids'),
+        categories=lineup.get('categories'),
+        monitored_only=lineup.get('monitored_only', False),
+        ids=lineup.get('ids'),
+    )
+    body = b"".join([chunk async for chunk in stream_m3u_export(query)])
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return {
+        "body": body,
+        "gzip_body": gzip.compress(body, compresslevel=6),
+        "etag": f'"{digest}"',
+        "gzip_etag": f'"{digest}-gz"',
+    }
+
+
+async def get_rendered_lineup(token: str) -> Optional[dict]:
+    """Return the cached rendering for a lineup token, rebuilding if stale."""
+    entry = _lineup_cache.get(token)
+    if entry is None:
+        lineup = await db.lineups.find_one({"token": token}, {"_id": 0})
+        if not lineup:
+            return None
+        entry = {"lineup": lineup, "version": None}
+    version = await get_channels_version(entry['lineup']['tenant_id'])
+    if entry['version'] != version:
+        lock = _lineup_locks.setdefault(token, asyncio.Lock())
+        async with lock:
+            # A request queued on the lock finds the rendering the holder
+            # just cached instead of rendering the same version again
+            cached = _lineup_cache.get(token)
+            if cached is not None and cached['version'] == version:
+                entry = cached
+            else:
+                tenant = await db.tenants.find_one({"id": entry['lineup']['tenant_id']}, {"_id": 0, "expiration_date": 1})
+                expiration = (tenant or {}).get('expiration_date')
+                if isinstance(expiration, str):
+                    expiration = datetime.fromisoformat(expiration)
+                if expiration and expiration.tzinfo is None:
+                    expiration = expiration.replace(tzinfo=timezone.utc)
+                entry = {**entry, **await render_lineup(entry['lineup']), "version": version, "expires_at": expiration}
+                _lineup_cache[token] = entry
+    _lineup_cache[token] = entry
+    _lineup_cache.move_to_end(token)
+    while len(_lineup_cache) > LINEUP_CACHE_MAX_ENTRIES:
+        evicted, _ = _lineup_cache.popitem(last=False)
+        _lineup_locks.pop(evicted, None)
+    return entry
+
+
+def invalidate_tenant_lineups(tenant_id: str):
+    """Drop cached lineup renderings for a tenant."""
+    for token in [t for t, e in _lineup_cache.items() if e['lineup']['tenant_id'] == tenant_id]:
+        _lineup_cache.pop(token, None)
+
+
+@api_router.post("/lineups", response_model=Lineup)
+async def create_lineup(lineup_data: LineupCreate, current_user: User = Depends(get_current_user)):
+    """Create a tokenized lineup URL over the tenant's channels"""
+    if not current_user.tenant_id:
+        raise HTTPException(status_code=400, detail="User must belong to a tenant")
     
-    if isinstance(updated_doc['created_at'], str):
-        updated_doc['created_at'] = datetime.fromisoformat(updated_doc['created_at'])
-    if isinstance(updated_doc['updated_at'], str):
-        updated_doc['updated_at'] = datetime.fromisoformat(updated_doc['updated_at'])
-    if updated_doc.get('last_refresh') and isinstance(updated_doc['last_refresh'], str):
-        updated_doc['last_refresh'] = datetime.fromisoformat(updated_doc['last_refresh'])
+    lineup = Lineup(
+        name=lineup_data.name,
+        tenant_id=current_user.tenant_id,
+        playlist_ids=lineup_data.playlist_ids,
+        categories=lineup_data.categories,
+        monitored_only=lineup_data.monitored_only,
+        ids=lineup_data.ids,
+        created_by=current_user.id,
+    )
+    lineup_doc = lineup.model_dump()
+    lineup_doc['created_at'] = lineup_doc['created_at'].isoformat()
+    await db.lineups.insert_one(lineup_doc)
     
-    return M3UPlaylist(**updated_doc)
+    return lineup
 
-@api_router.delete("/m3u/{playlist_id}")
-async def delete_m3u(playlist_id: str, current_user: User = Depends(get_current_user)):
-    if current_user.role == "user":
-        raise HTTPException(status_code=403, detail="Only admins and tenant owners can delete playlists")
-    
-    playlist_doc = await db.m3u_playlists.find_one({"id": playlist_id}, {"_id": 0})
-    if not playlist_doc:
-        raise HTTPException(status_code=404, detail="Playlist not found")
+@api_router.get("/lineups", response_model=List[Lineup])
+async def get_lineups(current_user: User = Depends(get_current_user)):
+    """List the tenant's lineups (regular users only see their own)"""
+    if not current_user.tenant_id:
+        return []
     
-    if playlist_doc['tenant_id'] != current_user.tenant_id:
-        raise HTTPException(status_code=403, detail="Can only delete playlists in your tenant")
+    query = {"tenant_id": current_user.tenant_id}
+    if current_user.role == "user":
+        query["created_by"] = current_user.id
+    lineups = await db.lineups.find(query, {"_id": 0}).to_list(None)
+    for lineup in lineups:
+        if isinstance(lineup['created_at'], str):
+            lineup['created_at'] = datetime.fromisoformat(lineup['created_at'])
     
-    await db.m3u_playlists.delete_one({"id": playlist_id})
-    return {"message": "Playlist deleted successfully"}
+    return lineups
 
-@api_router.post("/m3u/refresh")
-async def trigger_refresh(current_user: User = Depends(get_current_user)):
-    """Manually trigger M3U playlist refresh"""
-    if current_user.role not in ["super_admin", "tenant_owner"]:
-        raise HTTPException(status_code=403, detail="Only admins and tenant owners can refresh playlists")
+@api_router.delete("/lineups/{lineup_id}")
+async def delete_lineup(lineup_id: str, current_user: User = Depends(get_current_user)):
+    """Revoke a lineup URL"""
+    if not current_user.tenant_id:
+        raise HTTPException(status_code=400, detail="User must belong to a tenant")
     
-    asyncio.create_task(refresh_m3u_playlists())
-    return {"message": "Playlist refresh triggered"}
+    query = {"id": lineup_id, "tenant_id": current_user.tenant_id}
+    if current_user.role == "user":
+        query["created_by"] = current_user.id
+    removed = await db.lineups.find_one_and_delete(query)
+    if removed is None:
+        raise HTTPException(status_code=404, detail="Lineup not found")
+    
+    _lineup_cache.pop(removed['token'], None)
+    _lineup_locks.pop(removed['token'], None)
+    return {"message": "Lineup deleted successfully"}
 
-@api_router.get("/m3u/refresh/status")
-async def get_refresh_status(current_user: User = Depends(get_current_user)):
-    """Get the status of the refresh job"""
-    job = scheduler.get_job('refresh_m3u_playlists')
-    if job:
-        return {
-            "next_run": job.next_run_time.isoformat() if job.next_run_time else None,
-            "interval": "1 hour"
-        }
-    return {"message": "Refresh job not scheduled"}
+@api_router.get("/lineup/{token}.m3u")
+async def serve_lineup(token: str, request: Request):
+    """Serve a lineup to player apps. Authenticated by the token in the URL.
 
-@api_router.get("/channels/search", response_model=List[Channel])
-async def search_channels(q: str, current_user: User = Depends(get_current_user)):
-    """Search for channels across all playlists in user's tenant (or all tenants for super admin)"""
-    
-    # Build query filter
-    if current_user.role == "super_admin":
-        # Super admin can search across all tenants
-        query_filter = {}
-    else:
-        # Regular users search within their tenant
-        if not current_user.tenant_id:
-            raise HTTPException(status_code=400, detail="User must belong to a tenant")
-        query_filter = {"tenant_id": current_user.tenant_id}
+    Bodies are pre-rendered (identity and gzip) and cached until the
+    tenant's channels change; matching If-None-Match requests get a 304.
+    """
+    entry = await get_rendered_lineup(token)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Lineup not found")
+    if entry['expires_at'] and entry['expires_at'] < datetime.now(timezone.utc):
+        raise HTTPException(status_code=403, detail="Tenant subscription has expired. Please contact your administrator.")
     
-    # Get playlists
-    playlists = await db.m3u_playlists.find(query_filter, {"_id": 0}).to_list(1000)
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    etag = entry['gzip_etag'] if use_gzip else entry['etag']
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
     
-    all_channels = []
-    search_query = q.lower()
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
     
-    for playlist in playlists:
-        if playlist.get('content'):
-            channels = parse_m3u_content(playlist['content'])
-            
-            # Filter channels by search query
-            for channel in channels:
-                if search_query in channel.get('name', '').lower():
-                    all_channels.append(Channel(
-                        name=channel.get('name', 'Unknown'),
-                        url=channel.get('url', ''),
-                        group=channel.get('group'),
-                        logo=channel.get('logo'),
-                        playlist_name=playlist['name'],
-                        playlist_id=playlist['id']
-                    ))
-    
-    return all_channels[:100]  # Limit to 100 results
-
-@api_router.post("/channels/probe", response_model=StreamProbeResult)
-async def probe_channel(url: str, current_user: User = Depends(get_current_user)):
-    """Probe a stream URL to check if it's online"""
-    result = await probe_stream(url)
-    return StreamProbeResult(**result)
-
-@api_router.post("/channels/probe-ffmpeg", response_model=FFmpegProbeResult)
-async def probe_channel_ffmpeg(url: str, current_user: User = Depends(get_current_user)):
-    """Probe a stream URL using FFmpeg/ffprobe for detailed information"""
-    result = await probe_stream_ffmpeg(url)
-    return FFmpegProbeResult(**result)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=entry['gzip_body'], media_type="audio/x-mpegurl", headers=headers)
+    return Response(content=entry['body'], media_type="audio/x-mpegurl", headers=headers)
 
 @api_router.get("/m3u/{playlist_id}/categories")
-async def get_playlist_categories(playlist_id: str, current_user: User = Depends(get_current_user)):
+async def get_playlist_categories(
+    playlist_id: str,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+):
     """List the categories in one playlist with channel counts (drill-down browse)."""
-    playlist = await db.m3u_playlists.find_one({"id": playlist_id}, {"_id": 0})
+    if current_user.role != "super_admin" and not current_user.tenant_id:
+        raise HTTPException(status_code=400, detail="User must belong to a tenant")
+    playlist = await db.m3u_playlists.find_one(
+        {"id": playlist_id},
+        {"_id": 0, "id": 1, "tenant_id": 1, "category_stats": 1},
+    )
     if not playlist:
         raise HTTPException(status_code=404, detail="Playlist not found")
     # Super admin may browse any playlist; everyone else is tenant-scoped.
-    if current_user.role != "super_admin":
-        if not current_user.tenant_id:
-            raise HTTPException(status_code=400, detail="User must belong to a tenant")
-        if playlist.get('tenant_id') != current_user.tenant_id:
-            raise HTTPException(status_code=403, detail="Can only browse playlists in your tenant")
+    if current_user.role != "super_admin" and playlist.get('tenant_id') != current_user.tenant_id:
+        raise HTTPException(status_code=403, detail="Can only browse playlists in your tenant")
+    
+    # Only an authorized caller of an existing playlist gets a 304
+    scope = ALL_TENANTS_SCOPE if current_user.role == "super_admin" else current_user.tenant_id
+    not_modified = await catalog_not_modified(request, response, scope)
+    if not_modified:
+        return not_modified
 
-    channels = parse_m3u_content(playlist.get('content') or "")
-    return group_channels_by_category(channels)
+    return await get_playlist_category_stats(playlist)
 
 
 @api_router.get("/m3u/{playlist_id}/channels", response_model=List[Channel])
 async def get_playlist_channels(
     playlist_id: str,
     category: str,
+    list_format: str = Query("json", alias="format", pattern=CHANNEL_LIST_FORMAT_PATTERN),
     current_user: User = Depends(get_current_user),
 ):
-    """List the channels in one playlist that belong to one category (drill-down browse)."""
-    playlist = await db.m3u_playlists.find_one({"id": playlist_id}, {"_id": 0})
+    """List the channels in one playlist that belong to one category (drill-down browse).
+
+    `format=ndjson` or `format=json-stream` streams the rows instead of
+    returning one buffered array.
+    """
+    playlist = await db.m3u_playlists.find_one({"id": playlist_id}, {"_id": 0, "id": 1, "tenant_id": 1})
     if not playlist:
         raise HTTPException(status_code=404, detail="Playlist not found")
     # Super admin may browse any playlist; everyone else is tenant-scoped.
@@ -1432,56 +4201,56 @@ async def get_playlist_channels(
         if playlist.get('tenant_id') != current_user.tenant_id:
             raise HTTPException(status_code=403, detail="Can only browse playlists in your tenant")
 
-    channels = parse_m3u_content(playlist.get('content') or "")
-    matching = filter_channels_by_category(channels, category)
-    return [
-        Channel(
-            name=c.get('name', 'Unknown'),
-            url=c.get('url', ''),
-            group=c.get('group'),
-            logo=c.get('logo'),
-            playlist_name=playlist['name'],
-            playlist_id=playlist['id'],
-        )
-        for c in matching
-    ]
+    # The stored `category` already buckets groupless channels as "Uncategorized"
+    return await channel_query_response({"playlist_id": playlist_id, "category": category}, list_format)
 
 
 @api_router.get("/categories")
-async def get_categories(current_user: User = Depends(get_current_user)):
+async def get_categories(request: Request, response: Response, current_user: User = Depends(get_current_user)):
     """Get all unique categories from playlists in user's tenant (or all tenants for super admin) with source information"""
     
     # Build query filter
     if current_user.role == "super_admin":
         # Super admin can view categories across all tenants
         query_filter = {}
+        scope = ALL_TENANTS_SCOPE
     else:
         # Regular users view categories within their tenant
         if not current_user.tenant_id:
             raise HTTPException(status_code=400, detail="User must belong to a tenant")
         query_filter = {"tenant_id": current_user.tenant_id}
+        scope = current_user.tenant_id
     
-    # Get all playlists
-    playlists = await db.m3u_playlists.find(query_filter, {"_id": 0}).to_list(1000)
+    not_modified = await catalog_not_modified(request, response, scope)
+    if not_modified:
+        return not_modified
+    
+    # Get all playlists (only the precomputed stats, never the raw content)
+    playlists = await db.m3u_playlists.find(
+        query_filter,
+        {"_id": 0, "id": 1, "name": 1, "category_stats": 1},
+    ).to_list(None)
     
     # Use dict to track categories with their sources
     categories_map = {}
     
     for playlist in playlists:
         playlist_name = playlist.get('name', 'Unknown Source')
-        if playlist.get('content'):
-            channels = parse_m3u_content(playlist['content'])
-            
-            for channel in channels:
-                category = channel.get('group')
-                if category:
-                    # Create unique key for each category-source combination
-                    key = f"{category}|{playlist_name}"
-                    if key not in categories_map:
-                        categories_map[key] = {
-                            "name": category,
-                            "playlist_name": playlist_name
-                        }
+        for stat in await get_playlist_category_stats(playlist):
+            category = stat['name']
+            # Channels without a group have a null `group` in the stats;
+            # this listing has always left them out. Stats from before
+            # INGEST_VERSION 6 carry no `group` until the backfill reaches them.
+            group = stat['group'] if 'group' in stat else (None if category == "Uncategorized" else category)
+            if group is None:
+                continue
+            # Create unique key for each category-source combination
+            key = f"{category}|{playlist_name}"
+            if key not in categories_map:
+                categories_map[key] = {
+                    "name": category,
+                    "playlist_name": playlist_name
+                }
     
     # Convert to list and sort by category name
     result = list(categories_map.values())
@@ -1491,14 +4260,47 @@ async def get_categories(current_user: User = Depends(get_current_user)):
 
 @api_router.post("/categories/monitor", response_model=MonitoredCategory)
 async def add_monitored_category(category_data: MonitoredCategoryCreate, current_user: User = Depends(get_current_user)):
-    """Add a category to monitor"""
+    """Add a category (or a glob/regex category or channel-name pattern) to monitor"""
     if not current_user.tenant_id:
         raise HTTPException(status_code=400, detail="User must belong to a tenant")
     
-    # Check if already monitoring
+    if category_data.match_type not in MONITOR_MATCH_TYPES:
+        raise HTTPException(status_code=400, detail="Match type must be 'exact', 'glob' or 'regex'")
+    if category_data.target not in MONITOR_TARGETS:
+        raise HTTPException(status_code=400, detail="Target must be 'category' or 'channel_name'")
+    if category_data.match_type != "exact":
+        try:
+            pattern = monitor_rule_regex(category_data.match_type, category_data.category)
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid pattern: {str(e)}")
+        
+        # The rule must also compile merged with the tenant's other patterns
+        rules = await db.monitored_categories.find(
+            {
+                "tenant_id": current_user.tenant_id,
+                "match_type": {"$in": ["glob", "regex"]},
+                "target": {"$in": [category_data.target, None]} if category_data.target == "category" else category_data.target,
+            },
+            {"_id": 0, "category": 1, "match_type": 1}
+        ).to_list(None)
+        patterns = [pattern]
+        for rule in rules:
+            try:
+                patterns.append(monitor_rule_regex(rule['match_type'], rule['category']))
+            except re.error:
+                continue  # stored before validation; matched on its own
+        try:
+            ChannelMatcher.combined_regex(patterns)
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"Pattern conflicts with existing rules: {str(e)}")
+    
+    # Check if already monitoring. Rules stored before patterns existed have
+    # no match_type/target and are exact category rules.
     existing = await db.monitored_categories.find_one({
         "tenant_id": current_user.tenant_id,
-        "category": category_data.category
+        "category": category_data.category,
+        "match_type": {"$in": [category_data.match_type, None]} if category_data.match_type == "exact" else category_data.match_type,
+        "target": {"$in": [category_data.target, None]} if category_data.target == "category" else category_data.target,
     })
     
     if existing:
@@ -1507,6 +4309,8 @@ async def add_monitored_category(category_data: MonitoredCategoryCreate, current
     monitored = MonitoredCategory(
         tenant_id=current_user.tenant_id,
         category=category_data.category,
+        match_type=category_data.match_type,
+        target=category_data.target,
         created_by=current_user.id
     )
     
@@ -1514,20 +4318,40 @@ async def add_monitored_category(category_data: MonitoredCategoryCreate, current
     monitored_doc['created_at'] = monitored_doc['created_at'].isoformat()
     
     await db.monitored_categories.insert_one(monitored_doc)
+    await bump_data_version(current_user.tenant_id)
+    
+    # A new rule can only turn channels on
+    query = {"monitored": {"$ne": True}}
+    if monitored.match_type == "exact" and monitored.target == "category":
+        query["group"] = monitored.category
+    await resync_monitored_flags(current_user.tenant_id, query)
     
     return monitored
 
 @api_router.get("/categories/monitor", response_model=List[MonitoredCategory])
-async def get_monitored_categories(current_user: User = Depends(get_current_user)):
+async def get_monitored_categories(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+):
     """Get all monitored categories for user's tenant (empty for super admin without tenant)"""
+    projection = fields_projection(fields, MonitoredCategory)
     if not current_user.tenant_id:
         # Super admin without tenant cannot monitor categories (tenant-specific feature)
         return []
     
-    categories = await db.monitored_categories.find(
-        {"tenant_id": current_user.tenant_id},
-        {"_id": 0}
-    ).to_list(1000)
+    not_modified = await catalog_not_modified(request, response, current_user.tenant_id)
+    if not_modified:
+        return not_modified
+    
+    categories = await find_page(
+        db.monitored_categories, {"tenant_id": current_user.tenant_id}, projection or {"_id": 0}, limit, cursor, response
+    )
+    if projection:
+        return selected_fields_response(categories, response)
     
     for cat in categories:
         if isinstance(cat['created_at'], str):
@@ -1541,54 +4365,118 @@ async def remove_monitored_category(category_id: str, current_user: User = Depen
     if not current_user.tenant_id:
         raise HTTPException(status_code=400, detail="User must belong to a tenant")
     
-    result = await db.monitored_categories.delete_one({
+    removed = await db.monitored_categories.find_one_and_delete({
         "id": category_id,
         "tenant_id": current_user.tenant_id
     })
     
-    if result.deleted_count == 0:
+    if removed is None:
         raise HTTPException(status_code=404, detail="Category not found")
+    await bump_data_version(current_user.tenant_id)
+    
+    # Removing a rule can only turn channels off
+    query = {"monitored": True}
+    if (removed.get('match_type') or "exact") == "exact" and (removed.get('target') or "category") == "category":
+        query["group"] = removed['category']
+    await resync_monitored_flags(current_user.tenant_id, query)
     
     return {"message": "Category removed from monitoring"}
 
-@api_router.get("/events/channels")
-async def get_monitored_channels(current_user: User = Depends(get_current_user)):
-    """Get all channels from monitored categories"""
+@api_router.get("/events/channels", response_model=List[Channel])
+async def get_monitored_channels(
+    request: Request,
+    response: Response,
+    list_format: str = Query("json", alias="format", pattern=CHANNEL_LIST_FORMAT_PATTERN),
+    current_user: User = Depends(get_current_user),
+):
+    """Get all channels from monitored categories.
+
+    The `monitored` flag on stored channels is maintained at ingest and when
+    categories are added to or removed from monitoring, so this is a single
+    indexed read. `format=ndjson` or `format=json-stream` streams the rows.
+    """
     if not current_user.tenant_id:
         raise HTTPException(status_code=400, detail="User must belong to a tenant")
     
-    # Get monitored categories
-    monitored = await db.monitored_categories.find(
-        {"tenant_id": current_user.tenant_id},
-        {"_id": 0}
-    ).to_list(1000)
-    
-    monitored_categories = [m['category'] for m in monitored]
+    not_modified = await catalog_not_modified(request, response, current_user.tenant_id)
+    if not_modified:
+        return not_modified
     
-    if not monitored_categories:
-        return []
+    return await channel_query_response(
+        {"tenant_id": current_user.tenant_id, "monitored": True},
+        list_format,
+        response,
+    )
+
+@api_router.get("/events/feed", response_model=ChannelEventFeed)
+async def get_channel_event_feed(
+    since: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user),
+):
+    """Page through monitored-channel appearances and disappearances.
+
+    Events are returned in sequence order starting after `since`. Pass the
+    returned `next_since` back on the next poll to receive only new events.
+    """
+    if not current_user.tenant_id:
+        raise HTTPException(status_code=400, detail="User must belong to a tenant")
     
-    # Get all playlists for the tenant
-    playlists = await db.m3u_playlists.find({"tenant_id": current_user.tenant_id}, {"_id": 0}).to_list(1000)
+    events = await db.channel_events.find(
+        {"tenant_id": current_user.tenant_id, "seq": {"$gt": since}},
+        {"_id": 0}
+    ).sort("seq", ASCENDING).limit(limit + 1).to_list(limit + 1)
+    
+    has_more = len(events) > limit
+    events = events[:limit]
+    for event in events:
+        if isinstance(event['occurred_at'], str):
+            event['occurred_at'] = datetime.fromisoformat(event['occurred_at'])
+    
+    return ChannelEventFeed(
+        events=events,
+        next_since=events[-1]['seq'] if events else since,
+        has_more=has_more,
+    )
+
+@api_router.get("/channels/changes", response_model=ChannelChangeFeed)
+async def get_channel_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    current_user: User = Depends(get_current_user),
+):
+    """Page through channel inserts, updates and deletes after `since`.
+
+    Clients keeping a local copy of the tenant's channels apply the
+    returned changes and poll again with `next_since`. When the log has
+    been compacted past `since`, `resync_required` is set: reload the
+    catalog, then continue from the returned `next_since`.
+    """
+    if not current_user.tenant_id:
+        raise HTTPException(status_code=400, detail="User must belong to a tenant")
     
-    all_channels = []
+    counter = await db.counters.find_one({"_id": f"channel_changes:{current_user.tenant_id}"})
+    head = counter['value'] if counter else 0
+    oldest = await db.channel_changes.find_one(
+        {"tenant_id": current_user.tenant_id},
+        {"_id": 0, "seq": 1},
+        sort=[("seq", ASCENDING)],
+    )
+    if change_log_resync_required(since, head, oldest['seq'] if oldest else None):
+        return ChannelChangeFeed(changes=[], next_since=head, has_more=False, resync_required=True)
     
-    for playlist in playlists:
-        if playlist.get('content'):
-            channels = parse_m3u_content(playlist['content'])
-            
-            for channel in channels:
-                if channel.get('group') in monitored_categories:
-                    all_channels.append(Channel(
-                        name=channel.get('name', 'Unknown'),
-                        url=channel.get('url', ''),
-                        group=channel.get('group'),
-                        logo=channel.get('logo'),
-                        playlist_name=playlist['name'],
-                        playlist_id=playlist['id']
-                    ))
-    
-    return all_channels
+    changes = await db.channel_changes.find(
+        {"tenant_id": current_user.tenant_id, "seq": {"$gt": since}},
+        {"_id": 0}
+    ).sort("seq", ASCENDING).limit(limit + 1).to_list(limit + 1)
+    
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    return ChannelChangeFeed(
+        changes=changes,
+        next_since=changes[-1]['seq'] if changes else since,
+        has_more=has_more,
+    )
 
 @api_router.post("/m3u/{playlist_id}/refresh-api")
 async def refresh_player_api(playlist_id: str, current_user: User = Depends(get_current_user)):
@@ -1596,7 +4484,7 @@ async def refresh_player_api(playlist_id: str, current_user: User = Depends(get_
     if current_user.role == "user":
         raise HTTPException(status_code=403, detail="Only admins and tenant owners can refresh API data")
     
-    playlist_doc = await db.m3u_playlists.find_one({"id": playlist_id}, {"_id": 0})
+    playlist_doc = await db.m3u_playlists.find_one({"id": playlist_id}, PLAYLIST_SUMMARY_PROJECTION)
     if not playlist_doc:
         raise HTTPException(status_code=404, detail="Playlist not found")
     
@@ -1617,6 +4505,7 @@ async def refresh_player_api(playlist_id: str, current_user: User = Depends(get_
     }
     
     await db.m3u_playlists.update_one({"id": playlist_id}, {"$set": update_data})
+    await bump_data_version(playlist_doc['tenant_id'])
     
     return {
         "message": "Player API data refreshed",
@@ -1682,13 +4571,17 @@ async def backup_full_database(current_user: User = Depends(get_current_user)):
         
         for collection_name in collections:
             collection = db[collection_name]
-            docs = await collection.find({}, {"_id": 0}).to_list(10000)
-            
-            # Convert datetime objects to ISO strings
-            for doc in docs:
+            docs = []
+            async for doc in collection.find({}, {"_id": 0}):
+                # Playlist bodies live in GridFS; inline them so the backup is self-contained
+                if collection_name == "m3u_playlists":
+                    doc['content'] = await load_playlist_content(doc)
+                
+                # Convert datetime objects to ISO strings
                 for key, value in doc.items():
                     if isinstance(value, datetime):
                         doc[key] = value.isoformat()
+                docs.append(doc)
             
             backup_data["collections"][collection_name] = docs
         
@@ -1723,25 +4616,29 @@ async def backup_tenant(tenant_id: str, current_user: User = Depends(get_current
         backup_data["data"]["tenant"] = tenant
         
         # Backup users in this tenant
-        users = await db.users.find({"tenant_id": tenant_id}, {"_id": 0}).to_list(1000)
-        for user in users:
+        users = []
+        async for user in db.users.find({"tenant_id": tenant_id}, {"_id": 0}):
             if user.get('created_at') and isinstance(user['created_at'], datetime):
                 user['created_at'] = user['created_at'].isoformat()
+            users.append(user)
         backup_data["data"]["users"] = users
         
         # Backup M3U playlists for this tenant
-        playlists = await db.m3u_playlists.find({"tenant_id": tenant_id}, {"_id": 0}).to_list(1000)
-        for playlist in playlists:
+        playlists = []
+        async for playlist in db.m3u_playlists.find({"tenant_id": tenant_id}, {"_id": 0}):
+            playlist['content'] = await load_playlist_content(playlist)
             for date_field in ['created_at', 'updated_at', 'last_refresh', 'api_last_checked']:
                 if playlist.get(date_field) and isinstance(playlist[date_field], datetime):
                     playlist[date_field] = playlist[date_field].isoformat()
+            playlists.append(playlist)
         backup_data["data"]["m3u_playlists"] = playlists
         
         # Backup monitored categories for this tenant
-        categories = await db.monitored_categories.find({"tenant_id": tenant_id}, {"_id": 0}).to_list(1000)
-        for category in categories:
+        categories = []
+        async for category in db.monitored_categories.find({"tenant_id": tenant_id}, {"_id": 0}):
             if category.get('created_at') and isinstance(category['created_at'], datetime):
                 category['created_at'] = category['created_at'].isoformat()
+            categories.append(category)
         backup_data["data"]["monitored_categories"] = categories
         
         return backup_data
@@ -1765,6 +4662,9 @@ async def restore_full_database(backup_data: dict, current_user: User = Depends(
         if not collections_data:
             raise HTTPException(status_code=400, detail="No collection data found in backup")
         
+        # Bodies of the playlists being replaced; released once the restore is in
+        previous_digests = await db.m3u_playlists.distinct("content_digest")
+        
         # Restore each collection
         restored_counts = {}
         for collection_name, docs in collections_data.items():
@@ -1790,6 +4690,19 @@ async def restore_full_database(backup_data: dict, current_user: User = Depends(
                 await collection.insert_many(docs)
             restored_counts[collection_name] = len(docs)
         
+        # The channel store is derived from playlist content; rebuild it
+        _channel_matchers.clear()
+        await db.channels.delete_many({})
+        _lineup_cache.clear()
+        tenant_ids = set(await db.tenant_state.distinct("tenant_id")) | set(await db.tenants.distinct("id"))
+        for tenant_id in tenant_ids - {ALL_TENANTS_SCOPE}:
+            await bump_channels_version(tenant_id)
+            await reset_channel_changes(tenant_id)
+        for digest in previous_digests:
+            await release_playlist_body(digest)
+        await db.m3u_playlists.update_many({}, {"$unset": {"ingest_version": ""}})
+        asyncio.create_task(backfill_playlist_ingest())
+        
         return {
             "message": "Full database restored successfully",
             "restored_counts": restored_counts,
@@ -1819,6 +4732,9 @@ async def restore_tenant(backup_data: dict, current_user: User = Depends(get_cur
         if not tenant_data:
             raise HTTPException(status_code=400, detail="No tenant data found in backup")
         
+        # Bodies of the playlists being replaced; released once the restore is in
+        previous_digests = await db.m3u_playlists.distinct("content_digest", {"tenant_id": tenant_id})
+        
         # Delete existing tenant data
         await db.tenants.delete_many({"id": tenant_id})
         await db.users.delete_many({"tenant_id": tenant_id})
@@ -1866,6 +4782,16 @@ async def restore_tenant(backup_data: dict, current_user: User = Depends(get_cur
             await db.monitored_categories.insert_many(categories)
             restored_counts["monitored_categories"] = len(categories)
         
+        # The channel store is derived from playlist content; rebuild it
+        _channel_matchers.pop(tenant_id, None)
+        await db.channels.delete_many({"tenant_id": tenant_id})
+        await bump_channels_version(tenant_id)
+        await reset_channel_changes(tenant_id)
+        for digest in previous_digests:
+            await release_playlist_body(digest)
+        await db.m3u_playlists.update_many({"tenant_id": tenant_id}, {"$unset": {"ingest_version": ""}})
+        asyncio.create_task(backfill_playlist_ingest())
+        
         return {
             "message": "Tenant data restored successfully",
             "restored_counts": restored_counts,
@@ -1955,11 +4881,14 @@ async def perform_scheduled_backup(schedule_id: str):
             collections = ["users", "tenants", "m3u_playlists", "monitored_categories"]
             for collection_name in collections:
                 collection = db[collection_name]
-                docs = await collection.find({}, {"_id": 0}).to_list(10000)
-                for doc in docs:
+                docs = []
+                async for doc in collection.find({}, {"_id": 0}):
+                    if collection_name == "m3u_playlists":
+                        doc['content'] = await load_playlist_content(doc)
                     for key, value in doc.items():
                         if isinstance(value, datetime):
                             doc[key] = value.isoformat()
+                    docs.append(doc)
                 backup_data["collections"][collection_name] = docs
             
             filename = f"full_backup_{timestamp}.json"
@@ -1984,23 +4913,27 @@ async def perform_scheduled_backup(schedule_id: str):
                 tenant['created_at'] = tenant['created_at'].isoformat()
             backup_data["data"]["tenant"] = tenant
             
-            users = await db.users.find({"tenant_id": tenant_id}, {"_id": 0}).to_list(1000)
-            for user in users:
+            users = []
+            async for user in db.users.find({"tenant_id": tenant_id}, {"_id": 0}):
                 if user.get('created_at') and isinstance(user['created_at'], datetime):
                     user['created_at'] = user['created_at'].isoformat()
+                users.append(user)
             backup_data["data"]["users"] = users
             
-            playlists = await db.m3u_playlists.find({"tenant_id": tenant_id}, {"_id": 0}).to_list(1000)
-            for playlist in playlists:
+            playlists = []
+            async for playlist in db.m3u_playlists.find({"tenant_id": tenant_id}, {"_id": 0}):
+                playlist['content'] = await load_playlist_content(playlist)
                 for date_field in ['created_at', 'updated_at', 'last_refresh', 'api_last_checked']:
                     if playlist.get(date_field) and isinstance(playlist[date_field], datetime):
                         playlist[date_field] = playlist[date_field].isoformat()
+                playlists.append(playlist)
             backup_data["data"]["m3u_playlists"] = playlists
             
-            categories = await db.monitored_categories.find({"tenant_id": tenant_id}, {"_id": 0}).to_list(1000)
-            for category in categories:
+            categories = []
+            async for category in db.monitored_categories.find({"tenant_id": tenant_id}, {"_id": 0}):
                 if category.get('created_at') and isinstance(category['created_at'], datetime):
                     category['created_at'] = category['created_at'].isoformat()
+                categories.append(category)
             backup_data["data"]["monitored_categories"] = categories
             
             filename = f"tenant_{tenant.get('name', tenant_id)}_{timestamp}.json"
@@ -2261,6 +5194,22 @@ async def get_system_settings(current_user: User = Depends(get_current_user)):
     
     return settings
 
+@api_router.get("/system/http-pool")
+async def get_http_pool_stats(current_user: User = Depends(get_current_user)):
+    """Outbound HTTP connection pool statistics (Super Admin only)"""
+    if current_user.role != "super_admin":
+        raise HTTPException(status_code=403, detail="Only super admins can view system statistics")
+    
+    return http_pool_stats()
+
+@api_router.get("/system/probes")
+async def get_probe_stats(current_user: User = Depends(get_current_user)):
+    """ffprobe supervisor load, queue depth and timings (Super Admin only)"""
+    if current_user.role != "super_admin":
+        raise HTTPException(status_code=403, detail="Only super admins can view system statistics")
+    
+    return {**probe_supervisor.stats(), "cached_results": len(_probe_cache)}
+
 @api_router.put("/system/settings", response_model=SystemSettings)
 async def update_system_settings(settings_data: SystemSettingsUpdate, current_user: User = Depends(get_current_user)):
     """Update system settings (Super Admin only)"""
@@ -2440,6 +5389,190 @@ async def deploy_system_update(current_user: User = Depends(get_current_user)):
         logger.error(f"Error deploying updates: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to deploy updates: {str(e)}")
 
+# Response compression. Starlette's GZipMiddleware only speaks gzip, so this
+# negotiates zstd/br/gzip itself and compresses body chunks as they are
+# sent, flushing each one so streamed responses stay incremental.
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4'))
+COMPRESSION_ZSTD_LEVEL = int(os.environ.get('COMPRESSION_ZSTD_LEVEL', '3'))
+
+
+class _GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+# Server preference order, best ratio/speed first
+RESPONSE_ENCODERS = {"gzip": _GzipEncoder}
+if brotli is not None:
+    RESPONSE_ENCODERS = {"br": _BrotliEncoder, **RESPONSE_ENCODERS}
+if zstandard is not None:
+    RESPONSE_ENCODERS = {"zstd": _ZstdEncoder, **RESPONSE_ENCODERS}
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: List[str]) -> Optional[str]:
+    """Pick a content coding from an Accept-Encoding header.
+
+    The highest client q-value wins; ties go to the order of `available`.
+    Returns None when the client accepts none of them.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding.strip()] = quality
+    wildcard = weights.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = weights.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def response_is_compressible(message: dict) -> bool:
+    """Whether a response start message leaves its body free to be encoded.
+
+    Bodiless (204/304), partial or rangeable (206, Accept-Ranges) and
+    already-encoded responses are never touched.
+    """
+    headers = {key.lower(): value for key, value in message.get("headers", [])}
+    return not (
+        message["status"] in (204, 206, 304)
+        or b"content-encoding" in headers
+        or b"content-range" in headers
+        or headers.get(b"accept-ranges", b"none") != b"none"
+    )
+
+
+def vary_on_accept_encoding(headers: list) -> list:
+    """Response headers with Accept-Encoding merged into `Vary`."""
+    vary = [value.decode("latin-1") for key, value in headers if key.lower() == b"vary"]
+    if not any("accept-encoding" in value.lower() or value.strip() == "*" for value in vary):
+        vary.append("Accept-Encoding")
+    return [(key, value) for key, value in headers if key.lower() != b"vary"] + [
+        (b"vary", ", ".join(vary).encode("latin-1"))
+    ]
+
+
+class CompressionMiddleware:
+    """Compress HTTP responses with the best encoding the client accepts.
+
+    Bodies smaller than `minimum_size` that arrive in one message are sent
+    as-is. Already-encoded, partial (206/ranged) and bodiless responses pass
+    through untouched; strong ETags are weakened on compressed responses.
+    Every response that could have been compressed carries
+    `Vary: Accept-Encoding`, including ones sent uncompressed, so shared
+    caches never hand an encoded body to a client that cannot read it.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = None
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        encoding = negotiate_encoding(accept_encoding, list(RESPONSE_ENCODERS))
+        if encoding is None:
+            async def send_identity(message):
+                if message["type"] == "http.response.start" and response_is_compressible(message):
+                    message = {**message, "headers": vary_on_accept_encoding(message.get("headers", []))}
+                await send(message)
+
+            await self.app(scope, receive, send_identity)
+            return
+
+        start_message = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, encoder, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                if not response_is_compressible(message):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = {**message, "headers": vary_on_accept_encoding(message.get("headers", []))}
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                encoder = RESPONSE_ENCODERS[encoding]()
+                headers = [
+                    (key, value) for key, value in start_message.get("headers", [])
+                    if key.lower() != b"content-length"
+                ]
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                headers = [
+                    (key, b"W/" + value if key.lower() == b"etag" and value.startswith(b'"') else value)
+                    for key, value in headers
+                ]
+                await send({**start_message, "headers": headers})
+
+            chunk = encoder.compress(body) if body else b""
+            if not more_body:
+                chunk += encoder.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -2449,8 +5582,11 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+app.add_middleware(CompressionMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -2469,13 +5605,36 @@ async def startup_event():
         id='refresh_m3u_playlists',
         replace_existing=True
     )
+    if HEALTH_CHECK_INTERVAL_MINUTES > 0:
+        scheduler.add_job(
+            run_health_checks,
+            'interval',
+            minutes=HEALTH_CHECK_INTERVAL_MINUTES,
+            id='channel_health_checks',
+            replace_existing=True
+        )
+        scheduler.add_job(
+            run_probe_rollups,
+            'interval',
+            minutes=5,
+            id='probe_rollups',
+            replace_existing=True
+        )
     scheduler.start()
     logger.info("M3U refresh scheduler started - running every hour")
     
+    # Open the shared outbound HTTP pool
+    get_http_session()
+    
+    # Bring derived playlist data up to date before the first refresh
+    await ensure_indexes()
+    asyncio.create_task(backfill_playlist_ingest())
+    
     # Run once on startup
     asyncio.create_task(refresh_m3u_playlists())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     scheduler.shutdown()
+    await close_http_session()
     client.close()
\ No newline at end of file
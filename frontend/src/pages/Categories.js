@@ -13,6 +13,11 @@ import { Eye, ChevronDown, ChevronRight, Filter, Search } from "lucide-react";
 
 const API = "/api";
 
+// The toggles here manage plain category rules; glob/regex and channel-name
+// rules created through the API are left alone.
+const isExactCategoryRule = (rule) =>
+  (rule.match_type || "exact") === "exact" && (rule.target || "category") === "category";
+
 export default function Categories({ user, onLogout }) {
   const [categories, setCategories] = useState([]);
   const [monitoredCategories, setMonitoredCategories] = useState([]);
@@ -108,7 +113,7 @@ export default function Categories({ user, onLogout }) {
     
     if (isCurrentlyMonitored) {
       // Remove from monitoring
-      const monitored = monitoredCategories.find(m => m.category === categoryName);
+      const monitored = monitoredCategories.find(m => isExactCategoryRule(m) && m.category === categoryName);
       try {
         await axios.delete(`${API}/categories/monitor/${monitored.id}`, {
           headers: { Authorization: `Bearer ${token}` },
@@ -137,7 +142,7 @@ export default function Categories({ user, onLogout }) {
   };
 
   const isMonitored = (categoryName) => {
-    return monitoredCategories.some(m => m.category === categoryName);
+    return monitoredCategories.some(m => isExactCategoryRule(m) && m.category === categoryName);
   };
 
   return (
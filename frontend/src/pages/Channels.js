@@ -169,7 +169,7 @@ export default function Channels({ user, onLogout }) {
         null,
         {
           headers: { Authorization: `Bearer ${token}` },
-          params: { url: channel.url },
+          params: { url: channel.url, profile: "fast" },
         }
       );
       
@@ -506,23 +506,29 @@ export default function Channels({ user, onLogout }) {
       return;
     }
 
-    let m3uContent = "#EXTM3U\n";
-    selectedChannels.forEach(channel => {
-      m3uContent += `#EXTINF:-1 tvg-id="${channel.name}" tvg-name="${channel.name}" tvg-logo="${channel.logo || ""}" group-title="${channel.group || ""}",${channel.name}\n`;
-      m3uContent += `${channel.url}\n`;
-    });
-
-    const blob = new Blob([m3uContent], { type: "text/plain" });
-    const url = window.URL.createObjectURL(blob);
-    const link = document.createElement("a");
-    link.href = url;
-    link.download = `exported-channels-${Date.now()}.m3u`;
-    document.body.appendChild(link);
-    link.click();
-    document.body.removeChild(link);
-    window.URL.revokeObjectURL(url);
-
-    toast.success(`Exported ${selectedChannels.length} channels`);
+    // The backend renders and streams the file from the channel store
+    try {
+      const response = await axios.post(
+        `${API}/channels/export`,
+        { ids: selectedChannels.map((channel) => channel.id) },
+        {
+          headers: { Authorization: `Bearer ${token}` },
+          responseType: "blob",
+        }
+      );
+      const url = window.URL.createObjectURL(response.data);
+      const link = document.createElement("a");
+      link.href = url;
+      link.download = `exported-channels-${Date.now()}.m3u`;
+      document.body.appendChild(link);
+      link.click();
+      document.body.removeChild(link);
+      window.URL.revokeObjectURL(url);
+
+      toast.success(`Exported ${selectedChannels.length} channels`);
+    } catch (error) {
+      toast.error("Failed to export channels");
+    }
   };
 
   return (
@@ -293,6 +293,9 @@ function MetricCard({ label, value, hint, tone = "default", delayClass }) {
   );
 }
 
+// Only the columns the playlist cards and metrics render
+const PLAYLIST_CARD_FIELDS = "id,name,player_api,max_connections,active_connections,expiration_date,api_last_checked";
+
 function PlaylistCard({ playlist, delayClass }) {
   const active = isPlaylistActive(playlist.expiration_date);
   const days = daysUntil(playlist.expiration_date);
@@ -462,6 +465,7 @@ export default function Dashboard({ user, onLogout }) {
     try {
       const response = await axios.get(`${API}/m3u`, {
         headers: { Authorization: `Bearer ${token}` },
+        params: { fields: PLAYLIST_CARD_FIELDS },
       });
       setPlaylists(response.data || []);
     } catch (error) {
@@ -476,6 +480,7 @@ export default function Dashboard({ user, onLogout }) {
     try {
       const response = await axios.get(`${API}/m3u`, {
         headers: { Authorization: `Bearer ${token}` },
+        params: { fields: PLAYLIST_CARD_FIELDS },
       });
       setPlaylists(response.data || []);
     } catch (error) {
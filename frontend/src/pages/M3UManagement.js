@@ -107,7 +107,10 @@ export default function M3UManagement({ user, onLogout }) {
   const handleEdit = async (e) => {
     e.preventDefault();
     try {
-      await axios.put(`${API}/m3u/${selectedPlaylist.id}`, formData, {
+      // The playlist listing no longer includes content, so an empty field
+      // means "keep the current content" rather than "clear it".
+      const payload = { ...formData, content: formData.content || null };
+      await axios.put(`${API}/m3u/${selectedPlaylist.id}`, payload, {
         headers: { Authorization: `Bearer ${token}` },
       });
       toast.success("Playlist updated successfully!");
@@ -139,7 +142,7 @@ export default function M3UManagement({ user, onLogout }) {
     setFormData({ 
       name: playlist.name, 
       url: playlist.url, 
-      content: playlist.content || "",
+      content: "",
       player_api: playlist.player_api || ""
     });
     setIsEditDialogOpen(true);
@@ -387,10 +390,11 @@ export default function M3UManagement({ user, onLogout }) {
                 />
               </div>
               <div className="space-y-2">
-                <Label htmlFor="edit-content">Content (Optional)</Label>
+                <Label htmlFor="edit-content">Replace Content (Optional)</Label>
                 <Textarea
                   id="edit-content"
                   data-testid="edit-playlist-content-input"
+                  placeholder="Leave empty to keep the current content"
                   value={formData.content}
                   onChange={(e) => setFormData({ ...formData, content: e.target.value })}
                   rows={4}
@@ -1,6 +1,9 @@
+import asyncio
 import sys
 from pathlib import Path
 
+from fastapi import Response
+
 # Make backend/server.py importable. server.py calls load_dotenv on backend/.env
 # at import time and uses a lazy Motor client, so no DB connection is required.
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
@@ -53,3 +56,149 @@ def test_filter_channels_by_category_uncategorized_returns_groupless():
     ]
     result = server.filter_channels_by_category(channels, "Uncategorized")
     assert [c["name"] for c in result] == ["NoGroup", "Empty"]
+
+
+def test_summarize_playlist_channels_counts():
+    channels = [
+        {"name": "ESPN", "group": "Sports", "url": "http://x/1"},
+        {"name": "FOX", "group": "Sports", "url": "http://x/2"},
+        {"name": "NoGroup", "url": "http://x/3"},
+    ]
+    result = server.summarize_playlist_channels(channels)
+    assert result == {
+        "category_stats": [
+            {"name": "Sports", "group": "Sports", "channel_count": 2},
+            {"name": "Uncategorized", "group": None, "channel_count": 1},
+        ],
+        "channel_count": 3,
+        "category_count": 2,
+    }
+
+
+def test_summarize_playlist_channels_keeps_real_uncategorized_group():
+    channels = [
+        {"name": "NoGroup", "url": "http://x/1"},
+        {"name": "Empty", "group": "", "url": "http://x/2"},
+        {"name": "Misc", "group": "Uncategorized", "url": "http://x/3"},
+    ]
+    assert server.summarize_playlist_channels(channels)["category_stats"] == [
+        {"name": "Uncategorized", "group": None, "channel_count": 2},
+        {"name": "Uncategorized", "group": "Uncategorized", "channel_count": 1},
+    ]
+
+
+def test_summarize_playlist_channels_empty():
+    assert server.summarize_playlist_channels([]) == {
+        "category_stats": [],
+        "channel_count": 0,
+        "category_count": 0,
+    }
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return list(self.docs)
+
+
+class FakePlaylists:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return FakeCursor([d for d in self.docs if all(d.get(k) == v for k, v in query.items())])
+
+
+class FakeDB:
+    def __init__(self, playlists):
+        self.m3u_playlists = FakePlaylists(playlists)
+
+
+def test_get_categories_lists_real_uncategorized_group_but_not_groupless(monkeypatch):
+    async def modified(request, response, scope):
+        return None
+
+    stats = server.summarize_playlist_channels([
+        {"name": "NoGroup", "url": "http://x/1"},
+        {"name": "Misc", "group": "Uncategorized", "url": "http://x/2"},
+        {"name": "ESPN", "group": "Sports", "url": "http://x/3"},
+    ])["category_stats"]
+    playlist = {
+        "id": "p1",
+        "name": "Main",
+        "tenant_id": "t1",
+        "category_stats": stats,
+        "ingest_version": server.INGEST_VERSION,
+    }
+    monkeypatch.setattr(server, "catalog_not_modified", modified)
+    monkeypatch.setattr(server, "db", FakeDB([playlist]))
+    user = server.User(username="u", role="user", tenant_id="t1")
+
+    result = asyncio.run(server.get_categories(None, Response(), user))
+    assert result == [
+        {"name": "Sports", "playlist_name": "Main"},
+        {"name": "Uncategorized", "playlist_name": "Main"},
+    ]
+
+
+def test_get_categories_serves_stale_stats_without_reingesting(monkeypatch):
+    async def modified(request, response, scope):
+        return None
+
+    async def no_ingest(playlist, content):
+        raise AssertionError("stale stats must be left to the backfill")
+
+    # Stats written before INGEST_VERSION 6 have no `group` marker
+    playlist = {
+        "id": "p1",
+        "name": "Main",
+        "tenant_id": "t1",
+        "category_stats": [
+            {"name": "Sports", "channel_count": 2},
+            {"name": "Uncategorized", "channel_count": 1},
+        ],
+        "ingest_version": 5,
+    }
+    monkeypatch.setattr(server, "catalog_not_modified", modified)
+    monkeypatch.setattr(server, "ingest_playlist_content", no_ingest)
+    monkeypatch.setattr(server, "db", FakeDB([playlist]))
+    user = server.User(username="u", role="user", tenant_id="t1")
+
+    result = asyncio.run(server.get_categories(None, Response(), user))
+    assert result == [{"name": "Sports", "playlist_name": "Main"}]
+
+
+def test_ingests_of_one_playlist_run_one_at_a_time(monkeypatch):
+    active = {"now": 0, "peak": 0}
+
+    async def slow_sync(playlist, channels):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+
+    async def noop(*args, **kwargs):
+        return None
+
+    class FakeUpdates:
+        async def update_one(self, query, update):
+            return None
+
+    class FakeStore:
+        m3u_playlists = FakeUpdates()
+
+    monkeypatch.setattr(server, "db", FakeStore())
+    monkeypatch.setattr(server, "store_playlist_body", noop)
+    monkeypatch.setattr(server, "release_playlist_body", noop)
+    monkeypatch.setattr(server, "bump_data_version", noop)
+    monkeypatch.setattr(server, "sync_playlist_channels", slow_sync)
+    monkeypatch.setattr(server, "_ingest_locks", {})
+    playlist = {"id": "p1", "name": "Main", "tenant_id": "t1"}
+
+    async def scenario():
+        await asyncio.gather(*(server.ingest_playlist_content(playlist, "#EXTM3U\n") for _ in range(3)))
+
+    asyncio.run(scenario())
+    assert active["peak"] == 1
@@ -0,0 +1,94 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make backend/server.py importable. server.py calls load_dotenv on backend/.env
+# at import time and uses a lazy Motor client, so no DB connection is required.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server
+
+
+def test_matcher_exact_category_only_matches_whole_name():
+    matcher = server.ChannelMatcher([{"category": "NFL 1"}])
+    assert matcher.matches({"name": "Game", "group": "NFL 1"})
+    assert not matcher.matches({"name": "Game", "group": "NFL 10"})
+    assert not matcher.matches({"name": "Game"})
+
+
+def test_matcher_glob_is_anchored_and_case_insensitive():
+    matcher = server.ChannelMatcher([{"category": "NFL *", "match_type": "glob"}])
+    assert matcher.matches({"name": "Game", "group": "nfl 12"})
+    assert not matcher.matches({"name": "Game", "group": "US NFL 1"})
+
+
+def test_matcher_merges_regex_rules_per_target():
+    matcher = server.ChannelMatcher([
+        {"category": r"^NBA \d+$", "match_type": "regex"},
+        {"category": "PPV", "match_type": "regex"},
+        {"category": "^ESPN", "match_type": "regex", "target": "channel_name"},
+        {"category": "Sky Main Event", "target": "channel_name"},
+    ])
+    assert matcher.matches({"name": "x", "group": "NBA 7"})
+    assert matcher.matches({"name": "x", "group": "UFC PPV Events"})
+    assert matcher.matches({"name": "ESPN 2", "group": "Sports"})
+    assert matcher.matches({"name": "Sky Main Event", "group": "UK"})
+    assert not matcher.matches({"name": "Fox ESPN", "group": "NBA Replays"})
+
+
+def test_matcher_skips_invalid_stored_regex():
+    matcher = server.ChannelMatcher([
+        {"category": "(", "match_type": "regex"},
+        {"category": "News"},
+    ])
+    assert matcher.matches({"name": "CNN", "group": "News"})
+    assert not matcher.matches({"name": "(", "group": "("})
+
+
+def test_monitor_rule_regex_rejects_invalid_regex():
+    with pytest.raises(server.re.error):
+        server.monitor_rule_regex("regex", "(")
+
+
+@pytest.mark.parametrize("pattern", [r"(?P<n>NBA)", r"(a)\1"])
+def test_monitor_rule_regex_rejects_constructs_that_break_merging(pattern):
+    with pytest.raises(server.re.error):
+        server.monitor_rule_regex("regex", pattern)
+    # Still accepted when reading stored rules
+    assert server.monitor_rule_regex("regex", pattern, strict=False) == pattern
+
+
+def test_monitor_rule_regex_scopes_leading_flags_and_rejects_others():
+    assert server.monitor_rule_regex("regex", r"(?i)nfl|nba") == r"(?i:nfl|nba)"
+    with pytest.raises(server.re.error):
+        server.monitor_rule_regex("regex", r"nfl(?i)")
+
+
+def test_matcher_keeps_each_rules_case_sensitivity():
+    matcher = server.ChannelMatcher([
+        {"category": "^NBA", "match_type": "regex"},
+        {"category": "(?i)^nfl", "match_type": "regex"},
+    ])
+    assert matcher.matches({"name": "x", "group": "NBA 1"})
+    assert not matcher.matches({"name": "x", "group": "nba 1"})
+    assert matcher.matches({"name": "x", "group": "NFL 1"})
+    assert matcher.matches({"name": "x", "group": "nfl 1"})
+
+
+def test_monitor_rule_regex_allows_escaped_backslash_and_scoped_flags():
+    assert server.monitor_rule_regex("regex", r"a\\1") == r"a\\1"
+    assert server.monitor_rule_regex("regex", r"(?i:nfl)") == r"(?i:nfl)"
+
+
+def test_matcher_falls_back_to_per_rule_regexes_when_merge_fails():
+    matcher = server.ChannelMatcher([
+        {"category": "(?i)nfl", "match_type": "regex"},
+        {"category": "(?P<n>NBA)", "match_type": "regex"},
+        {"category": "(?P<n>NHL)", "match_type": "regex"},
+    ])
+    assert len(matcher.category_regexes) == 3
+    assert matcher.matches({"name": "x", "group": "NFL 1"})
+    assert matcher.matches({"name": "x", "group": "NHL 2"})
+    assert not matcher.matches({"name": "x", "group": "nhl 2"})
+    assert not matcher.matches({"name": "x", "group": "MLB"})
@@ -0,0 +1,275 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Make backend/server.py importable. server.py calls load_dotenv on backend/.env
+# at import time and uses a lazy Motor client, so no DB connection is required.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server
+
+
+PLAYLIST = {"id": "p1", "name": "Provider", "tenant_id": "t1"}
+
+
+def test_build_channel_documents_ids_are_stable_and_unique():
+    channels = [
+        {"name": "ESPN", "group": "Sports", "url": "http://x/1"},
+        {"name": "ESPN Backup", "group": "Sports", "url": "http://x/1"},
+        {"name": "NoGroup", "url": "http://x/2"},
+    ]
+    first = server.build_channel_documents(PLAYLIST, channels)
+    second = server.build_channel_documents(PLAYLIST, channels)
+    assert [d["id"] for d in first] == [d["id"] for d in second]
+    assert len({d["id"] for d in first}) == 3
+    assert first[2]["category"] == "Uncategorized"
+    assert first[0]["tenant_id"] == "t1"
+    assert first[0]["playlist_name"] == "Provider"
+
+
+def test_diff_channel_documents_detects_add_remove_update():
+    old = server.build_channel_documents(PLAYLIST, [
+        {"name": "ESPN", "group": "Sports", "url": "http://x/1"},
+        {"name": "CNN", "group": "News", "url": "http://x/2"},
+    ])
+    new = server.build_channel_documents(PLAYLIST, [
+        {"name": "ESPN HD", "group": "Sports", "url": "http://x/1"},
+        {"name": "FOX", "group": "Sports", "url": "http://x/3"},
+    ])
+    diff = server.diff_channel_documents(old, new)
+    assert [d["name"] for d in diff["added"]] == ["FOX"]
+    assert [d["name"] for d in diff["removed"]] == ["CNN"]
+    assert [(o["name"], n["name"]) for o, n in diff["updated"]] == [("ESPN", "ESPN HD")]
+
+
+def test_diff_channel_documents_unchanged_is_empty():
+    docs = server.build_channel_documents(PLAYLIST, [{"name": "ESPN", "url": "http://x/1"}])
+    assert server.diff_channel_documents(docs, docs) == {"added": [], "removed": [], "updated": []}
+
+
+def test_build_channel_facet_pipeline_excludes_own_filter_from_facet():
+    pipeline = server.build_channel_facet_pipeline(
+        {"tenant_id": "t1"},
+        {"category": ["Sports"], "resolution": ["unknown"], "playlist": None, "probe_status": None},
+        skip=0,
+        limit=10,
+    )
+    assert pipeline[0] == {"$match": {"tenant_id": "t1"}}
+    facets = pipeline[1]["$facet"]
+    assert facets["category"][0] == {"$match": {"$and": [{"resolution": {"$in": [None]}}]}}
+    assert facets["resolution"][0] == {"$match": {"$and": [{"category": {"$in": ["Sports"]}}]}}
+    assert facets["channels"][0] == {
+        "$match": {"$and": [{"category": {"$in": ["Sports"]}}, {"resolution": {"$in": [None]}}]}
+    }
+
+
+def test_monitored_channel_events_covers_enter_and_leave():
+    def doc(name, monitored):
+        return {"id": name, "name": name, "monitored": monitored}
+
+    diff = {
+        "added": [doc("new-monitored", True), doc("new-plain", False)],
+        "removed": [doc("gone-monitored", True), doc("gone-plain", False)],
+        "updated": [
+            (doc("moved-in", False), doc("moved-in", True)),
+            (doc("moved-out", True), doc("moved-out", False)),
+            (doc("renamed", True), doc("renamed", True)),
+        ],
+    }
+    events = [(kind, d["name"]) for kind, d in server.monitored_channel_events(diff)]
+    assert events == [
+        ("appeared", "new-monitored"),
+        ("appeared", "moved-in"),
+        ("disappeared", "moved-out"),
+        ("disappeared", "gone-monitored"),
+    ]
+
+
+def test_format_m3u_entry_round_trips_through_parser():
+    channel = {"name": 'Say "Hi"', "url": "http://x/1", "group": "Sports", "logo": "http://l/1.png"}
+    entry = server.format_m3u_entry(channel)
+    assert entry.startswith('#EXTINF:-1 tvg-id="Say \'Hi\'"')
+    parsed = server.parse_m3u_content("#EXTM3U\n" + entry)
+    assert parsed == [{"logo": "http://l/1.png", "group": "Sports", "name": 'Say "Hi"', "url": "http://x/1"}]
+
+
+def test_build_channel_export_query_combines_filters():
+    query = server.build_channel_export_query(
+        {"tenant_id": "t1"},
+        playlist_ids=["p1"],
+        categories=["Sports"],
+        monitored_only=True,
+        ids=None,
+    )
+    assert query == {
+        "tenant_id": "t1",
+        "playlist_id": {"$in": ["p1"]},
+        "category": {"$in": ["Sports"]},
+        "monitored": True,
+    }
+    assert server.build_channel_export_query({}, ids=[]) == {}
+
+
+def test_channel_record_matches_channel_model_serialization():
+    doc = {
+        "id": "abc", "tenant_id": "T1", "playlist_id": "P1", "playlist_name": "Main",
+        "name": "ESPN", "url": "http://h/1", "group": "Sports", "category": "Sports",
+        "logo": "", "monitored": True, "probe_status": "online",
+    }
+    record = server.channel_record(doc)
+    assert record == server.Channel(**doc).model_dump()
+    assert "tenant_id" not in record and record["resolution"] is None
+
+
+async def _rows(docs):
+    for doc in docs:
+        yield doc
+
+
+def _collect_stream(docs, list_format):
+    async def collect():
+        return [chunk async for chunk in server.encode_channel_stream(_rows(docs), list_format)]
+    return asyncio.run(collect())
+
+
+def test_encode_channel_stream_ndjson_and_json_array(monkeypatch):
+    monkeypatch.setattr(server, "EXPORT_BATCH_SIZE", 2)
+    docs = [{"name": f"ch{i}", "url": f"http://h/{i}", "playlist_name": "P", "playlist_id": "p1"} for i in range(3)]
+
+    ndjson = _collect_stream(docs, "ndjson")
+    assert len(ndjson) == 2
+    lines = b"".join(ndjson).splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["ch0", "ch1", "ch2"]
+
+    array = json.loads(b"".join(_collect_stream(docs, "json-stream")))
+    assert [row["name"] for row in array] == ["ch0", "ch1", "ch2"]
+    assert array[0] == server.channel_record(docs[0])
+
+    assert json.loads(b"".join(_collect_stream([], "json-stream"))) == []
+    assert _collect_stream([], "ndjson") == []
+
+
+def test_build_channel_change_entries_numbers_upserts_then_deletes():
+    now = server.datetime.now(server.timezone.utc)
+    doc = {"id": "c1", "tenant_id": "t1", "playlist_id": "p1", "playlist_name": "Provider",
+           "name": "ESPN", "url": "http://h/1", "monitored": True, "probe_status": "online"}
+    entries = server.build_channel_change_entries("t1", 7, [doc], ["c2"], now)
+    assert [(e["seq"], e["op"], e["channel_id"]) for e in entries] == [(7, "upsert", "c1"), (8, "delete", "c2")]
+    assert entries[0]["channel"] == server.channel_record(doc)
+    assert entries[0]["monitored"] is True
+    assert entries[1]["channel"] is None
+    assert all(e["occurred_at"] is now for e in entries)
+
+
+def test_change_log_resync_required():
+    # Nothing ever logged
+    assert not server.change_log_resync_required(0, 0, None)
+    # Caught up, and the log has since expired entirely
+    assert not server.change_log_resync_required(10, 10, None)
+    assert server.change_log_resync_required(9, 10, None)
+    # Log still covers everything after `since`
+    assert not server.change_log_resync_required(4, 10, 5)
+    assert server.change_log_resync_required(3, 10, 5)
+    # Position from a different history
+    assert server.change_log_resync_required(11, 10, 5)
+
+
+class FakeCounters:
+    def __init__(self):
+        self.values = {}
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        name = query["_id"]
+        self.values[name] = self.values.get(name, 0) + update["$inc"]["value"]
+        value = self.values[name]
+        await asyncio.sleep(0)
+        return {"_id": name, "value": value}
+
+
+class FakeFeed:
+    def __init__(self):
+        self.visible = []
+
+    async def insert_many(self, docs):
+        # Larger batches take longer to commit, so without serialization a
+        # small later batch would become visible before a large earlier one.
+        await asyncio.sleep(0.001 * len(docs))
+        self.visible.extend(doc["seq"] for doc in docs)
+
+
+class FakeDB:
+    def __init__(self):
+        self.counters = FakeCounters()
+        self.channel_changes = FakeFeed()
+        self.channel_events = FakeFeed()
+
+
+def test_interleaved_writers_commit_feed_entries_in_sequence_order(monkeypatch):
+    fake_db = FakeDB()
+    monkeypatch.setattr(server, "db", fake_db)
+    monkeypatch.setattr(server, "_sequence_locks", {})
+
+    def doc(i):
+        return {"id": f"c{i}", "name": f"Channel {i}", "url": f"http://h/{i}", "playlist_id": "p1",
+                "playlist_name": "P", "monitored": True}
+
+    async def scenario():
+        writers = []
+        for size in (20, 1, 5, 1, 10):
+            docs = [doc(i) for i in range(size)]
+            writers.append(server.record_channel_changes("t1", docs))
+            writers.append(server.record_channel_events("t1", [("appeared", d) for d in docs]))
+        await asyncio.gather(*writers)
+
+    asyncio.run(scenario())
+    for feed in (fake_db.channel_changes, fake_db.channel_events):
+        assert feed.visible == list(range(1, 38))
+
+
+def test_resync_monitored_flags_records_feed_events_for_flipped_channels(monkeypatch):
+    channels = [
+        {"id": "a", "tenant_id": "t1", "name": "NFL 1", "group": "NFL", "monitored": False},
+        {"id": "b", "tenant_id": "t1", "name": "CNN", "group": "News", "monitored": True},
+        {"id": "c", "tenant_id": "t1", "name": "NFL 2", "group": "NFL", "monitored": True},
+    ]
+    recorded = {}
+
+    class Cursor:
+        def __init__(self, docs):
+            self.docs = docs
+
+        def __aiter__(self):
+            return self._iterate()
+
+        async def _iterate(self):
+            for doc in self.docs:
+                yield dict(doc)
+
+    class Channels:
+        def find(self, query, projection=None):
+            return Cursor(channels)
+
+        async def bulk_write(self, ops, ordered=True):
+            recorded["writes"] = len(ops)
+
+    class DB:
+        channels = Channels()
+
+    async def matcher(tenant_id):
+        return server.ChannelMatcher([{"category": "NFL"}])
+
+    async def noop(*args, **kwargs):
+        return None
+
+    async def record_events(tenant_id, events):
+        recorded["events"] = [(kind, doc["id"]) for kind, doc in events]
+
+    monkeypatch.setattr(server, "db", DB())
+    monkeypatch.setattr(server, "get_channel_matcher", matcher)
+    monkeypatch.setattr(server, "bump_channels_version", noop)
+    monkeypatch.setattr(server, "record_channel_changes", noop)
+    monkeypatch.setattr(server, "record_channel_events", record_events)
+
+    asyncio.run(server.resync_monitored_flags("t1", {}))
+    assert recorded == {"writes": 2, "events": [("appeared", "a"), ("disappeared", "b")]}
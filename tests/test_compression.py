@@ -0,0 +1,70 @@
+import asyncio
+import gzip
+import sys
+from pathlib import Path
+
+# Make backend/server.py importable. server.py calls load_dotenv on backend/.env
+# at import time and uses a lazy Motor client, so no DB connection is required.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server
+
+
+def test_negotiate_encoding_prefers_client_quality_then_server_order():
+    available = ["zstd", "br", "gzip"]
+    assert server.negotiate_encoding(None, available) is None
+    assert server.negotiate_encoding("identity", available) is None
+    assert server.negotiate_encoding("gzip, br", available) == "br"
+    assert server.negotiate_encoding("br;q=0.5, gzip", available) == "gzip"
+    assert server.negotiate_encoding("*", available) == "zstd"
+    assert server.negotiate_encoding("gzip;q=0, *", ["gzip"]) is None
+
+
+def test_gzip_encoder_output_is_decodable_chunk_by_chunk():
+    encoder = server._GzipEncoder()
+    chunks = [encoder.compress(b"#EXTM3U\n" * 100), encoder.compress(b"http://h/1\n" * 100)]
+    assert all(chunks)
+    assert gzip.decompress(b"".join(chunks) + encoder.finish()) == b"#EXTM3U\n" * 100 + b"http://h/1\n" * 100
+
+
+def test_optional_encoders_round_trip():
+    body = b"#EXTM3U\n" * 200
+    br = server._BrotliEncoder()
+    assert server.brotli.decompress(br.compress(body) + br.finish()) == body
+    zstd = server._ZstdEncoder()
+    compressed = zstd.compress(body) + zstd.finish()
+    assert server.zstandard.ZstdDecompressor().decompressobj().decompress(compressed) == body
+
+
+def run_middleware(body, accept_encoding=None, status=200, headers=None):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": status, "headers": headers or []})
+        await send({"type": "http.response.body", "body": body})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    request_headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    middleware = server.CompressionMiddleware(app, minimum_size=100)
+    asyncio.run(middleware({"type": "http", "headers": request_headers}, None, send))
+    return dict(sent[0]["headers"]), b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def test_compression_middleware_varies_on_accept_encoding_even_uncompressed():
+    large = b"#EXTM3U\n" * 100
+    headers, body = run_middleware(large)
+    assert headers[b"vary"] == b"Accept-Encoding" and body == large
+    headers, body = run_middleware(b"small", "gzip")
+    assert headers[b"vary"] == b"Accept-Encoding" and body == b"small"
+    headers, body = run_middleware(large, "gzip", headers=[(b"vary", b"Origin")])
+    assert headers[b"vary"] == b"Origin, Accept-Encoding"
+    assert headers[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(body) == large
+
+
+def test_compression_middleware_leaves_partial_responses_alone():
+    headers, body = run_middleware(b"x" * 200, "gzip", status=206, headers=[(b"content-range", b"bytes 0-199/400")])
+    assert b"vary" not in headers and b"content-encoding" not in headers
+    assert body == b"x" * 200
@@ -0,0 +1,64 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException, Response
+
+# Make backend/server.py importable. server.py calls load_dotenv on backend/.env
+# at import time and uses a lazy Motor client, so no DB connection is required.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server
+
+
+def test_catalog_etag_is_strong_and_scoped():
+    etag = server.catalog_etag("tenant-a", 3)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == server.catalog_etag("tenant-a", 3)
+    assert etag != server.catalog_etag("tenant-a", 4)
+    assert etag != server.catalog_etag("tenant-b", 3)
+
+
+def test_etag_matches_handles_lists_weak_tags_and_wildcard():
+    etag = server.catalog_etag("tenant-a", 1)
+    assert not server.etag_matches(None, etag)
+    assert not server.etag_matches('"other"', etag)
+    assert server.etag_matches(etag, etag)
+    assert server.etag_matches(f'"other", {etag}', etag)
+    assert server.etag_matches(f"W/{etag}", etag)
+    assert server.etag_matches("*", etag)
+
+
+class FakePlaylists:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def find_one(self, query, projection=None):
+        return next((d for d in self.docs if d["id"] == query["id"]), None)
+
+
+class FakeDB:
+    def __init__(self, playlists):
+        self.m3u_playlists = FakePlaylists(playlists)
+
+
+def test_playlist_categories_checks_access_before_etag(monkeypatch):
+    async def always_not_modified(request, response, scope):
+        return Response(status_code=304)
+
+    monkeypatch.setattr(server, "catalog_not_modified", always_not_modified)
+    monkeypatch.setattr(server, "db", FakeDB([{"id": "p1", "tenant_id": "t2", "category_stats": []}]))
+    user = server.User(username="u", role="user", tenant_id="t1")
+
+    def call(playlist_id, current_user):
+        return asyncio.run(server.get_playlist_categories(playlist_id, None, Response(), current_user))
+
+    with pytest.raises(HTTPException) as missing:
+        call("nope", user)
+    assert missing.value.status_code == 404
+    with pytest.raises(HTTPException) as forbidden:
+        call("p1", user)
+    assert forbidden.value.status_code == 403
+    owner = server.User(username="o", role="user", tenant_id="t2")
+    assert call("p1", owner).status_code == 304
@@ -0,0 +1,72 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from aiohttp import web
+
+# Make backend/server.py importable. server.py calls load_dotenv on backend/.env
+# at import time and uses a lazy Motor client, so no DB connection is required.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server
+
+
+def test_http_pool_stats_tracks_pooled_connection_and_close(monkeypatch):
+    monkeypatch.setattr(server, "http_session", None)
+
+    async def ok(request):
+        response = web.Response(text="ok")
+        response.set_cookie("sid", "tenant-a")
+        return response
+
+    async def echo_cookie(request):
+        return web.Response(text=request.headers.get("Cookie", ""))
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/", ok)
+        app.router.add_get("/cookie", echo_cookie)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            session = server.get_http_session()
+            assert server.get_http_session() is session
+            async with session.get(f"http://localhost:{port}/") as response:
+                assert await response.text() == "ok"
+            # Provider cookies are not kept on the session shared by all tenants
+            async with session.get(f"http://localhost:{port}/cookie") as response:
+                assert await response.text() == ""
+            stats = server.http_pool_stats()
+            await server.close_http_session()
+            return session, port, stats
+        finally:
+            await runner.cleanup()
+
+    session, port, stats = asyncio.run(scenario())
+    assert stats["open"] is True
+    assert stats["limit"] == server.HTTP_POOL_LIMIT
+    assert stats["in_use"] == 0
+    assert stats["idle"] == 1
+    assert stats["hosts"] == {f"localhost:{port}": {"idle": 1, "in_use": 0}}
+
+    assert session.closed
+    assert server.http_session is None
+    assert server.http_pool_stats()["open"] is False
+
+
+def test_http_pool_stats_degrades_when_internals_change(monkeypatch):
+    connector = SimpleNamespace(limit=7, _conns=object(), _acquired=object())
+    monkeypatch.setattr(server, "http_session", SimpleNamespace(closed=False, connector=connector))
+    stats = server.http_pool_stats()
+    assert stats == {
+        "open": True,
+        "limit": 7,
+        "limit_per_host": server.HTTP_POOL_LIMIT_PER_HOST,
+        "in_use": 0,
+        "idle": 0,
+        "hosts": {},
+    }
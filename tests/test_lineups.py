@@ -0,0 +1,134 @@
+import asyncio
+import gzip
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+# Make backend/server.py importable. server.py calls load_dotenv on backend/.env
+# at import time and uses a lazy Motor client, so no DB connection is required.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.lookups = 0
+
+    async def find_one(self, query, projection=None):
+        self.lookups += 1
+        for doc in self.docs:
+            if all(doc.get(key) == value for key, value in query.items()):
+                return dict(doc)
+        return None
+
+
+class FakeDB:
+    def __init__(self):
+        self.lineups = FakeCollection([{"token": "tok", "tenant_id": "t1", "name": "Sports"}])
+        self.tenants = FakeCollection([{"id": "t1", "expiration_date": None}])
+
+
+@pytest.fixture
+def lineup_env(monkeypatch):
+    """A fake store where the tenant's channel version and export body are controllable."""
+    state = {"version": 1, "body": b"#EXTM3U\n#EXTINF:-1,ESPN\nhttp://h/1\n", "renders": 0}
+
+    async def fake_version(tenant_id):
+        return state["version"]
+
+    async def fake_export(query):
+        state["renders"] += 1
+        yield state["body"]
+
+    monkeypatch.setattr(server, "db", FakeDB())
+    monkeypatch.setattr(server, "get_channels_version", fake_version)
+    monkeypatch.setattr(server, "stream_m3u_export", fake_export)
+    monkeypatch.setattr(server, "_lineup_cache", server.OrderedDict())
+    monkeypatch.setattr(server, "_lineup_locks", {})
+    return state
+
+
+def make_request(headers=None):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/lineup/tok.m3u",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+    })
+
+
+def serve(token="tok", headers=None):
+    return asyncio.run(server.serve_lineup(token, make_request(headers)))
+
+
+def test_serve_lineup_returns_plain_and_gzip_bodies(lineup_env):
+    plain = serve()
+    assert plain.status_code == 200
+    assert plain.body == lineup_env["body"]
+    assert "content-encoding" not in plain.headers
+
+    zipped = serve(headers={"Accept-Encoding": "gzip, br"})
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(zipped.body) == lineup_env["body"]
+    assert zipped.headers["etag"] != plain.headers["etag"]
+    assert lineup_env["renders"] == 1
+
+
+def test_serve_lineup_answers_304_for_matching_etag(lineup_env):
+    etag = serve().headers["etag"]
+    not_modified = serve(headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.body == b""
+
+
+def test_lineup_rerenders_when_tenant_version_changes(lineup_env):
+    etag = serve().headers["etag"]
+    lineup_env["version"] = 2
+    lineup_env["body"] = b"#EXTM3U\n#EXTINF:-1,FOX\nhttp://h/2\n"
+    fresh = serve(headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.body == lineup_env["body"]
+    assert fresh.headers["etag"] != etag
+    assert lineup_env["renders"] == 2
+
+
+def test_invalidate_tenant_lineups_drops_cached_rendering(lineup_env):
+    serve()
+    assert "tok" in server._lineup_cache
+    server.invalidate_tenant_lineups("t2")
+    assert "tok" in server._lineup_cache
+    server.invalidate_tenant_lineups("t1")
+    assert "tok" not in server._lineup_cache
+    serve()
+    assert server.db.lineups.lookups == 2
+
+
+def test_serve_lineup_unknown_token_is_404(lineup_env):
+    with pytest.raises(HTTPException) as exc:
+        serve("missing")
+    assert exc.value.status_code == 404
+
+
+def test_concurrent_pollers_share_one_render_after_version_bump(lineup_env, monkeypatch):
+    serve()
+    lineup_env["version"] = 2
+
+    async def render_slowly(query):
+        lineup_env["renders"] += 1
+        await asyncio.sleep(0.01)
+        yield lineup_env["body"]
+
+    monkeypatch.setattr(server, "stream_m3u_export", render_slowly)
+
+    async def scenario():
+        return await asyncio.gather(*(server.serve_lineup("tok", make_request()) for _ in range(5)))
+
+    responses = asyncio.run(scenario())
+    assert {r.status_code for r in responses} == {200}
+    assert lineup_env["renders"] == 2
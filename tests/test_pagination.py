@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+# Make backend/server.py importable. server.py calls load_dotenv on backend/.env
+# at import time and uses a lazy Motor client, so no DB connection is required.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server
+
+
+def test_page_cursor_round_trips_and_is_url_safe():
+    object_id = ObjectId()
+    cursor = server.encode_page_cursor(object_id)
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+    assert server.decode_page_cursor(cursor) == object_id
+
+
+@pytest.mark.parametrize("cursor", ["", "zzz", "not a cursor", "AAAA"])
+def test_decode_page_cursor_rejects_garbage(cursor):
+    with pytest.raises(HTTPException) as exc:
+        server.decode_page_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_fields_projection_builds_inclusion_projection():
+    assert server.fields_projection(None, server.User) is None
+    assert server.fields_projection("", server.User) is None
+    assert server.fields_projection("id, name", server.M3UPlaylistSummary) == {"_id": 0, "id": 1, "name": 1}
+
+
+@pytest.mark.parametrize("fields", [",", " ", " , "])
+def test_fields_projection_rejects_empty_selection(fields):
+    with pytest.raises(HTTPException) as exc:
+        server.fields_projection(fields, server.User)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("fields", ["password", "id,content", "name,bogus"])
+def test_fields_projection_rejects_fields_outside_the_model(fields):
+    model = server.User if fields == "password" else server.M3UPlaylistSummary
+    with pytest.raises(HTTPException) as exc:
+        server.fields_projection(fields, model)
+    assert exc.value.status_code == 400
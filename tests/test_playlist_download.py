@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make backend/server.py importable. server.py calls load_dotenv on backend/.env
+# at import time and uses a lazy Motor client, so no DB connection is required.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server
+
+
+def test_parse_byte_range_absent_or_malformed_means_whole_body():
+    assert server.parse_byte_range(None, 100) is None
+    assert server.parse_byte_range("items=0-10", 100) is None
+    assert server.parse_byte_range("bytes=0-10,20-30", 100) is None
+    assert server.parse_byte_range("bytes=abc-", 100) is None
+
+
+def test_parse_byte_range_explicit_and_open_ended():
+    assert server.parse_byte_range("bytes=0-9", 100) == (0, 9)
+    assert server.parse_byte_range("bytes=90-", 100) == (90, 99)
+    assert server.parse_byte_range("bytes=50-500", 100) == (50, 99)
+
+
+def test_parse_byte_range_suffix():
+    assert server.parse_byte_range("bytes=-10", 100) == (90, 99)
+    assert server.parse_byte_range("bytes=-500", 100) == (0, 99)
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=20-10", "bytes=-0"])
+def test_parse_byte_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        server.parse_byte_range(header, 100)
+
+
+def test_parse_byte_range_suffix_of_empty_body_is_unsatisfiable():
+    with pytest.raises(ValueError):
+        server.parse_byte_range("bytes=-10", 0)
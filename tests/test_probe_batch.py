@@ -0,0 +1,470 @@
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Make backend/server.py importable. server.py calls load_dotenv on backend/.env
+# at import time and uses a lazy Motor client, so no DB connection is required.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server
+
+
+def test_summarize_probe_result_picks_resolution_per_method():
+    http = {"online": True, "resolution": "1920x1080", "bitrate": "5000 kbps", "error": None}
+    ffmpeg = {"online": True, "video_resolution": "1280x720", "error": None}
+    assert server.summarize_probe_result("http", http)["resolution"] == "1920x1080"
+    assert server.summarize_probe_result("ffmpeg", ffmpeg)["resolution"] == "1280x720"
+
+
+def test_run_probe_batch_bounds_concurrency_and_dedupes_urls(monkeypatch):
+    running = 0
+    peak = 0
+    probed = []
+
+    async def fake_probe(url):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        probed.append(url)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"online": url.endswith("0"), "resolution": None}
+
+    recorded = []
+
+    async def fake_record(current_user, url, online, resolution):
+        recorded.append((url, online))
+
+    monkeypatch.setitem(server.PROBE_METHODS, "http", fake_probe)
+    monkeypatch.setattr(server, "record_probe_result", fake_record)
+    monkeypatch.setattr(server, "_probe_cache", server.OrderedDict())
+    monkeypatch.setattr(server, "_probe_inflight", {})
+
+    channels = [{"id": f"c{i}", "name": f"ch{i}", "url": f"http://h/{i % 6}"} for i in range(12)]
+    user = server.User(username="u", role="user", tenant_id="t1")
+
+    async def collect():
+        return [json.loads(line) async for line in server.run_probe_batch(user, channels, "http", 2)]
+
+    lines = asyncio.run(collect())
+    assert peak == 2
+    assert sorted(probed) == sorted({c["url"] for c in channels})
+    assert len(recorded) == 6
+    results, summary = lines[:-1], lines[-1]
+    assert all(line["type"] == "result" and len(line["channels"]) == 2 for line in results)
+    assert summary == {**summary, "type": "summary", "channels": 12, "urls": 6, "online": 1, "offline": 5}
+
+
+def test_normalize_probe_url():
+    assert server.normalize_probe_url(" HTTP://Example.COM:80/live/A.ts?Token=X#frag ") == "http://example.com/live/A.ts?Token=X"
+    assert server.normalize_probe_url("https://example.com:8443") == "https://example.com:8443/"
+    assert server.normalize_probe_url("http://User:Pw@Host/x") == "http://User:Pw@host/x"
+    assert server.normalize_probe_url(" http://h:abc/x ") == "http://h:abc/x"
+    assert server.normalize_probe_url("http://h:99999/x") == "http://h:99999/x"
+
+
+def test_cached_probe_coalesces_concurrent_probes_and_honours_force(monkeypatch):
+    calls = []
+
+    async def fake_probe(url):
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return {"online": True, "resolution": "1280x720"}
+
+    monkeypatch.setitem(server.PROBE_METHODS, "ffmpeg", fake_probe)
+    monkeypatch.setattr(server, "_probe_cache", server.OrderedDict())
+    monkeypatch.setattr(server, "_probe_inflight", {})
+
+    async def scenario():
+        first = await asyncio.gather(*[
+            server.cached_probe("ffmpeg", url) for url in ["http://h/live.ts", "HTTP://H/live.ts"] * 3
+        ])
+        assert len(calls) == 1 and all(r == first[0] for r in first)
+        await server.cached_probe("ffmpeg", "http://h/live.ts")
+        assert len(calls) == 1
+        await server.cached_probe("ffmpeg", "http://h/live.ts", force=True)
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_detect_container_from_first_bytes():
+    packet = b"\x47" + b"\x00" * 187
+    assert server.detect_container(packet * 3) == "mpegts"
+    assert server.detect_container(packet[:100]) == "mpegts"
+    assert server.detect_container(b"\x47" + b"\x00" * 200) is None
+    assert server.detect_container(b"\xef\xbb\xbf#EXTM3U\n#EXT-X-VERSION:3\n") == "hls"
+    assert server.detect_container(b"\n#EXTM3U\n") == "hls"
+    assert server.detect_container(b"\x00\x00\x00\x20ftypisom") == "mp4"
+    assert server.detect_container(b"FLV\x01\x05") == "flv"
+    assert server.detect_container(b"\x1a\x45\xdf\xa3\x01") == "matroska"
+    assert server.detect_container(b"<html>") is None
+    assert server.detect_container(b"") is None
+
+
+def test_probe_supervisor_caps_tenants_and_serves_queues_round_robin():
+    supervisor = server.ProbeSupervisor(max_concurrency=2, max_per_tenant=1)
+    order = []
+
+    async def probe(tenant, label):
+        cmd = [sys.executable, "-c", "import time; time.sleep(0.05)"]
+        await supervisor.run(cmd, timeout=5, tenant=tenant)
+        order.append(label)
+
+    async def scenario():
+        tasks = [asyncio.create_task(probe("a", f"a{i}")) for i in range(3)]
+        tasks.append(asyncio.create_task(probe("b", "b0")))
+        await asyncio.sleep(0.01)
+        stats = supervisor.stats()
+        assert stats["running_per_tenant"] == {"a": 1, "b": 1}
+        assert stats["queued_per_tenant"] == {"a": 2}
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order[:2] in (["a0", "b0"], ["b0", "a0"])
+    stats = supervisor.stats()
+    assert stats["running"] == 0 and stats["queued"] == 0
+    assert stats["completed"] == 4
+
+
+def test_probe_supervisor_kills_process_on_timeout():
+    supervisor = server.ProbeSupervisor(max_concurrency=1, max_per_tenant=1)
+
+    async def scenario():
+        cmd = [sys.executable, "-c", "import time; time.sleep(30)"]
+        try:
+            await supervisor.run(cmd, timeout=0.2, tenant="a")
+        except asyncio.TimeoutError:
+            pass
+        else:
+            raise AssertionError("expected a timeout")
+        # The slot is free again straight away
+        returncode, _, _ = await supervisor.run([sys.executable, "-c", "pass"], timeout=5, tenant="a")
+        return returncode
+
+    assert asyncio.run(scenario()) == 0
+    stats = supervisor.stats()
+    assert stats["timed_out"] == 1 and stats["running"] == 0
+
+
+def test_build_ffprobe_command_profiles():
+    fast = server.build_ffprobe_command("http://h/live.ts", "fast")
+    deep = server.build_ffprobe_command("http://h/live.ts", "deep")
+    assert fast[0] == "ffprobe" and fast[-1] == deep[-1] == "http://h/live.ts"
+    assert fast[fast.index("-probesize") + 1] == "500000"
+    assert "-show_streams" not in fast and "-show_entries" in fast
+    assert "-show_streams" in deep and "-read_intervals" in deep
+
+
+def test_measure_packet_rates_from_sampled_packets():
+    data = {
+        "streams": [{"index": 0, "codec_type": "video"}, {"index": 1, "codec_type": "audio"}],
+        "packets": [
+            {"stream_index": 0, "size": "1000", "pts_time": f"{i / 25:.2f}"} for i in range(51)
+        ] + [{"stream_index": 1, "size": "250", "pts_time": "1.00"}],
+    }
+    fps, bitrate = server.measure_packet_rates(data)
+    assert round(fps) == 25
+    assert bitrate == (51 * 1000 + 250) * 8 / 2.0
+    assert server.measure_packet_rates({"packets": []}) == (None, None)
+
+
+def test_provider_key_groups_urls_by_host():
+    assert server.provider_key("http://Prov.example:80/live/1.ts") == "prov.example"
+    assert server.provider_key("https://prov.example:8443/a") == "prov.example:8443"
+    assert server.provider_key("http://prov.example:abc/x") == "prov.example"
+    assert server.provider_key("http://prov.example:99999/x") == "prov.example"
+
+
+def test_check_provider_channels_rate_limits_and_stores_per_tenant(monkeypatch):
+    running = 0
+    peak = 0
+    stored = []
+
+    async def fake_cached_probe(method, url, force=False, profile=None):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"online": url.endswith("1"), "resolution": "1920x1080", "response_time": 0.2}
+
+    async def fake_store(tenant_id, url, online, resolution, response_time=None):
+        stored.append((tenant_id, url, online))
+
+    monkeypatch.setattr(server, "cached_probe", fake_cached_probe)
+    monkeypatch.setattr(server, "store_probe_result", fake_store)
+    monkeypatch.setattr(server, "HEALTH_CHECK_PROVIDER_CONCURRENCY", 2)
+    monkeypatch.setattr(server, "HEALTH_CHECK_PROVIDER_DELAY_SECONDS", 0)
+
+    urls = {f"http://h/{i}": {"t1"} for i in range(6)}
+    urls["http://h/1"] = {"t1", "t2"}
+    samples = asyncio.run(server.check_provider_channels(urls))
+
+    assert peak == 2
+    assert len(samples) == len(stored) == 7
+    assert {s["meta"]["tenant_id"] for s in samples if s["meta"]["url"] == "http://h/1"} == {"t1", "t2"}
+    assert all(s["status"] == ("online" if s["meta"]["url"] == "http://h/1" else "offline") for s in samples)
+
+
+def test_summarize_rollup_group():
+    bucket = datetime(2026, 1, 1, 12, 0)
+    group = {
+        "_id": {"tenant_id": "t1", "url": "http://h/1", "bucket": bucket},
+        "count": 5,
+        "up": 4,
+        "times": [3.0, 1.0, None, 4.0, 2.0],
+    }
+    rollup = server.summarize_rollup_group(group)
+    assert (rollup["tenant_id"], rollup["url"], rollup["bucket"]) == ("t1", "http://h/1", bucket)
+    assert (rollup["count"], rollup["up"], rollup["up_ratio"]) == (5, 4, 0.8)
+    assert (rollup["min"], rollup["avg"], rollup["max"], rollup["p95"]) == (1.0, 2.5, 4.0, 4.0)
+    empty = server.summarize_rollup_group({**group, "up": 0, "times": [None] * 5})
+    assert (empty["up_ratio"], empty["min"], empty["p95"]) == (0.0, None, None)
+
+
+def test_rollup_pipeline_groups_the_window_by_bucket():
+    start = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    end = start + timedelta(hours=1)
+    match, group = server.rollup_pipeline(start, end, 300)
+    assert match == {"$match": {"ts": {"$gte": start, "$lt": end}}}
+    assert group["$group"]["_id"]["bucket"] == {
+        "$toDate": {"$subtract": [{"$toLong": "$ts"}, {"$mod": [{"$toLong": "$ts"}, 300000]}]}
+    }
+
+
+def test_select_metrics_tier_uses_finest_tier_within_point_budget(monkeypatch):
+    monkeypatch.setattr(server, "HEALTH_CHECK_INTERVAL_MINUTES", 5)
+    monkeypatch.setattr(server, "PROBE_HISTORY_RETENTION_DAYS", 14)
+    monkeypatch.setattr(server, "PROBE_METRICS_MAX_POINTS", 300)
+    now = datetime(2026, 1, 31, tzinfo=timezone.utc)
+
+    def tier(hours):
+        return server.select_metrics_tier(now - timedelta(hours=hours), now, now)["name"]
+
+    assert tier(6) == "raw"
+    assert tier(24 * 7) == "1h"
+    # Outside raw retention but few enough 5 minute buckets
+    monkeypatch.setattr(server, "PROBE_HISTORY_RETENTION_DAYS", 0)
+    assert tier(12) == "5m"
+
+
+def test_parse_media_playlist_resolves_segments():
+    content = (
+        "#EXTM3U\n"
+        "#EXT-X-TARGETDURATION:6\n"
+        "#EXT-X-MEDIA-SEQUENCE:1041\n"
+        "#EXTINF:6.006,\n"
+        "seg1041.ts\n"
+        "#EXTINF:5.5,title\n"
+        "https://cdn.example/abs/seg1042.ts?token=x\n"
+    )
+    playlist = server.parse_media_playlist(content, "http://h/live/hi/index.m3u8")
+    assert playlist["target_duration"] == 6.0
+    assert playlist["media_sequence"] == 1041
+    assert playlist["endlist"] is False
+    assert playlist["segments"] == [
+        {"url": "http://h/live/hi/seg1041.ts", "duration": 6.006},
+        {"url": "https://cdn.example/abs/seg1042.ts?token=x", "duration": 5.5},
+    ]
+    assert server.parse_media_playlist(content + "#EXT-X-ENDLIST\n", "http://h/")["endlist"] is True
+
+
+def test_parse_master_variants_reads_quoted_attributes():
+    content = (
+        "#EXTM3U\n"
+        '#EXT-X-STREAM-INF:BANDWIDTH=800000,CODECS="avc1.4d401e,mp4a.40.2",RESOLUTION=640x360\n'
+        "low/index.m3u8\n"
+        "#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080\n"
+        "/hi/index.m3u8\n"
+    )
+    variants = server.parse_master_variants(content, "http://h/live/master.m3u8")
+    assert variants == [
+        {"bandwidth": 800000, "resolution": "640x360", "url": "http://h/live/low/index.m3u8"},
+        {"bandwidth": 5000000, "resolution": "1920x1080", "url": "http://h/hi/index.m3u8"},
+    ]
+
+
+class FakeStreamContent:
+    def __init__(self, body):
+        self.body = body
+
+    async def read(self, n):
+        chunk, self.body = self.body[:n], self.body[n:]
+        return chunk
+
+
+class FakeStreamResponse:
+    def __init__(self, body, content_type, status=200):
+        self.status = status
+        self.headers = {"Content-Type": content_type}
+        self.content = FakeStreamContent(body)
+
+    def close(self):
+        pass
+
+
+class FakeStreamSession:
+    def __init__(self, response):
+        self.response = response
+
+    async def get(self, url, **kwargs):
+        return self.response
+
+
+def test_probe_stream_fast_rejects_html_pages(monkeypatch):
+    page = FakeStreamResponse(b"<!DOCTYPE html><html><body>Login</body></html>", "text/html; charset=utf-8")
+    monkeypatch.setattr(server, "get_http_session", lambda: FakeStreamSession(page))
+    result = asyncio.run(server.probe_stream_fast("http://h/live.ts"))
+    assert result["online"] is False
+    assert result["container"] is None
+    assert "text/html" in result["error"]
+
+
+def test_probe_stream_fast_accepts_sniffed_container(monkeypatch):
+    ts = FakeStreamResponse(b"\x47" + b"\x00" * 187 + b"\x47" + b"\x00" * 187, "application/octet-stream")
+    monkeypatch.setattr(server, "get_http_session", lambda: FakeStreamSession(ts))
+    result = asyncio.run(server.probe_stream_fast("http://h/live.ts"))
+    assert result["online"] is True
+    assert result["container"] == "mpegts"
+
+
+def hls_result(segments, declared=5000000):
+    return {"segments": segments, "declared_bandwidth": declared, "ttfb": None, "throughput_kbps": None,
+            "throughput_reliable": None, "bandwidth_ratio": None, "buffering_risk": None}
+
+
+def test_summarize_hls_segments_prefers_reliable_samples():
+    burst = {"duration": 6.0, "bytes": 50000, "complete": True, "ttfb": 0.001,
+             "download_seconds": 0.001, "throughput_kbps": 8000, "reliable": False}
+    slow = {"duration": 6.0, "bytes": 2000000, "complete": True, "ttfb": 0.2,
+            "download_seconds": 4.0, "throughput_kbps": 4000, "reliable": True}
+    result = server.summarize_hls_segments(hls_result([burst, slow]))
+    assert result["throughput_reliable"] is True
+    assert result["throughput_kbps"] == 4000
+    assert result["bandwidth_ratio"] == 0.8
+    assert result["buffering_risk"] is True
+
+    only_bursts = server.summarize_hls_segments(hls_result([burst]))
+    assert only_bursts["throughput_reliable"] is False
+    assert only_bursts["buffering_risk"] is False
+
+
+def test_probe_stream_hls_stops_at_deadline_and_keeps_partial_measurements(monkeypatch):
+    media = "#EXTM3U\n#EXT-X-TARGETDURATION:6\n#EXTINF:6,\na.ts\n#EXTINF:6,\nb.ts\n"
+
+    async def fake_fetch(session, url):
+        return url, media
+
+    async def fake_measure(session, segment):
+        if segment["url"].endswith("b.ts"):
+            await asyncio.sleep(5)
+        return {"duration": 6.0, "bytes": 1000000, "complete": True, "ttfb": 0.1,
+                "download_seconds": 1.0, "throughput_kbps": 8000, "reliable": True}
+
+    monkeypatch.setattr(server, "get_http_session", lambda: None)
+    monkeypatch.setattr(server, "fetch_hls_playlist", fake_fetch)
+    monkeypatch.setattr(server, "measure_segment", fake_measure)
+    monkeypatch.setattr(server, "HLS_PROBE_TIMEOUT_SECONDS", 0.2)
+    result = asyncio.run(server.probe_stream_hls("http://h/live.m3u8"))
+    assert result["error"].startswith("Timeout")
+    assert len(result["segments"]) == 1
+    assert result["throughput_kbps"] == 8000
+
+
+def test_rollup_start_reaches_back_to_late_samples():
+    through = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    assert server.rollup_start({"through": through}, 300) == through
+    # Samples from a long health check run were inserted for 11:41
+    late = datetime(2026, 1, 1, 11, 41, 30)
+    assert server.rollup_start({"through": through, "dirty_from": late}, 300) == datetime(
+        2026, 1, 1, 11, 40, tzinfo=timezone.utc
+    )
+    assert server.rollup_start({"through": through, "dirty_from": late}, 3600) == datetime(
+        2026, 1, 1, 11, 0, tzinfo=timezone.utc
+    )
+
+
+class FakeRollupState:
+    def __init__(self, docs):
+        self.docs = {doc["tier"]: dict(doc) for doc in docs}
+
+    async def find_one_and_update(self, query, update):
+        doc = self.docs.get(query["tier"])
+        if doc is None:
+            return None
+        before = dict(doc)
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+        return before
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["tier"], {"tier": query["tier"]})
+        doc.update(update.get("$set", {}))
+        for field, value in update.get("$min", {}).items():
+            doc[field] = min(doc[field], value) if doc.get(field) is not None else value
+
+
+class FakeSamples:
+    def __init__(self, fail=False):
+        self.windows = []
+        self.fail = fail
+
+    def aggregate(self, pipeline):
+        window = pipeline[0]["$match"]["ts"]
+        self.windows.append((window["$gte"], window["$lt"]))
+        if self.fail:
+            raise RuntimeError("aggregate failed")
+        return self._groups()
+
+    async def _groups(self):
+        for _ in ():
+            yield
+
+
+class FakeRollupDB:
+    def __init__(self, state, samples):
+        self.probe_rollup_state = state
+        self.probe_samples = samples
+
+    def __getitem__(self, name):
+        return None
+
+
+def rollup_env(monkeypatch, state_docs, fail=False):
+    now = datetime(2026, 1, 1, 12, 7, tzinfo=timezone.utc)
+
+    class FixedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+
+    fake_db = FakeRollupDB(FakeRollupState(state_docs), FakeSamples(fail))
+    monkeypatch.setattr(server, "db", fake_db)
+    monkeypatch.setattr(server, "datetime", FixedDatetime)
+    monkeypatch.setattr(server, "PROBE_ROLLUP_TIERS", [{"name": "5m", "seconds": 300, "retention_days": 30}])
+    return fake_db
+
+
+def test_run_probe_rollups_starts_at_through_unless_marked_dirty(monkeypatch):
+    through = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    fake_db = rollup_env(monkeypatch, [{"tier": "5m", "through": through}])
+    asyncio.run(server.run_probe_rollups())
+    assert fake_db.probe_samples.windows == [(through, through + timedelta(minutes=5))]
+    assert fake_db.probe_rollup_state.docs["5m"]["through"] == through + timedelta(minutes=5)
+
+    late = datetime(2026, 1, 1, 11, 41, tzinfo=timezone.utc)
+    fake_db = rollup_env(monkeypatch, [{"tier": "5m", "through": through, "dirty_from": late}])
+    asyncio.run(server.run_probe_rollups())
+    assert fake_db.probe_samples.windows == [(datetime(2026, 1, 1, 11, 40, tzinfo=timezone.utc), through + timedelta(minutes=5))]
+    assert "dirty_from" not in fake_db.probe_rollup_state.docs["5m"]
+
+
+def test_run_probe_rollups_keeps_the_dirty_mark_when_a_pass_fails(monkeypatch):
+    through = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    late = datetime(2026, 1, 1, 11, 41, tzinfo=timezone.utc)
+    fake_db = rollup_env(monkeypatch, [{"tier": "5m", "through": through, "dirty_from": late}], fail=True)
+    asyncio.run(server.run_probe_rollups())
+    assert fake_db.probe_rollup_state.docs["5m"] == {"tier": "5m", "through": through, "dirty_from": late}
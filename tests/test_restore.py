@@ -0,0 +1,172 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Make backend/server.py importable. server.py calls load_dotenv on backend/.env
+# at import time and uses a lazy Motor client, so no DB connection is required.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server
+
+
+def matches(doc, query):
+    return all(doc.get(key) == value for key, value in (query or {}).items())
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, docs=None):
+        self.docs = list(docs or [])
+
+    async def find_one(self, query, projection=None):
+        await asyncio.sleep(0)
+        return next((dict(d) for d in self.docs if matches(d, query)), None)
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(d) for d in self.docs if matches(d, query)])
+
+    async def distinct(self, field, query=None):
+        return list(dict.fromkeys(d[field] for d in self.docs if matches(d, query) and field in d))
+
+    async def delete_many(self, query):
+        self.docs = [d for d in self.docs if not matches(d, query)]
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    async def insert_many(self, docs):
+        self.docs.extend(dict(d) for d in docs)
+
+    async def update_one(self, query, update):
+        for doc in self.docs:
+            if matches(doc, query):
+                doc.update(update.get("$set", {}))
+                break
+
+    async def update_many(self, query, update):
+        pass
+
+
+class FakeDB:
+    def __init__(self, **collections):
+        self.collections = {name: FakeCollection(docs) for name, docs in collections.items()}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+class FakeBucket:
+    def __init__(self, files):
+        self.files = files
+
+    async def upload_from_stream(self, filename, body, metadata=None):
+        self.files.docs.append({"_id": filename, "filename": filename})
+
+    async def delete(self, file_id):
+        self.files.docs = [f for f in self.files.docs if f["_id"] != file_id]
+
+
+def restore_env(monkeypatch, playlists, bodies):
+    async def noop(*args, **kwargs):
+        return None
+
+    fake_db = FakeDB(**{"m3u_playlists": playlists, "playlist_bodies.files": bodies})
+    monkeypatch.setattr(server, "db", fake_db)
+    monkeypatch.setattr(server, "playlist_bodies", FakeBucket(fake_db["playlist_bodies.files"]))
+    monkeypatch.setattr(server, "bump_channels_version", noop)
+    monkeypatch.setattr(server, "reset_channel_changes", noop)
+    monkeypatch.setattr(server, "backfill_playlist_ingest", noop)
+    monkeypatch.setattr(server, "bump_data_version", noop)
+    monkeypatch.setattr(server, "sync_playlist_channels", noop)
+    monkeypatch.setattr(server, "_lineup_cache", server.OrderedDict())
+    return fake_db
+
+
+def stored_bodies(fake_db):
+    return sorted(f["filename"] for f in fake_db["playlist_bodies.files"].docs)
+
+
+ADMIN = server.User(username="root", role="super_admin")
+
+
+def test_restore_tenant_releases_bodies_no_longer_referenced(monkeypatch):
+    fake_db = restore_env(
+        monkeypatch,
+        playlists=[
+            {"id": "p1", "tenant_id": "t1", "content_digest": "old"},
+            {"id": "p2", "tenant_id": "t1", "content_digest": "kept"},
+            {"id": "p3", "tenant_id": "t2", "content_digest": "other"},
+        ],
+        bodies=[{"_id": 1, "filename": "old"}, {"_id": 2, "filename": "kept"}, {"_id": 3, "filename": "other"}],
+    )
+    backup = {
+        "backup_type": "tenant",
+        "tenant_id": "t1",
+        "data": {
+            "tenant": {"id": "t1", "name": "One"},
+            "m3u_playlists": [{"id": "p2", "tenant_id": "t1", "content_digest": "kept", "content": "#EXTM3U\n"}],
+        },
+    }
+
+    asyncio.run(server.restore_tenant(backup, ADMIN))
+    assert stored_bodies(fake_db) == ["kept", "other"]
+
+
+def test_restore_full_releases_bodies_no_longer_referenced(monkeypatch):
+    fake_db = restore_env(
+        monkeypatch,
+        playlists=[
+            {"id": "p1", "tenant_id": "t1", "content_digest": "old"},
+            {"id": "p2", "tenant_id": "t2", "content_digest": "kept"},
+        ],
+        bodies=[{"_id": 1, "filename": "old"}, {"_id": 2, "filename": "kept"}],
+    )
+    backup = {
+        "backup_type": "full",
+        "collections": {
+            "m3u_playlists": [{"id": "p2", "tenant_id": "t2", "content_digest": "kept", "content": "#EXTM3U\n"}],
+        },
+    }
+
+    asyncio.run(server.restore_full_database(backup, ADMIN))
+    assert stored_bodies(fake_db) == ["kept"]
+
+
+def test_release_waits_for_an_ingest_about_to_reference_the_body(monkeypatch):
+    body = "#EXTM3U\n"
+    digest = server.hashlib.sha256(body.encode("utf-8")).hexdigest()
+    fake_db = restore_env(
+        monkeypatch,
+        playlists=[{"id": "p1", "tenant_id": "t1"}],
+        bodies=[{"_id": 1, "filename": digest}],
+    )
+
+    async def slow_sync(playlist, channels):
+        await asyncio.sleep(0.01)
+
+    monkeypatch.setattr(server, "sync_playlist_channels", slow_sync)
+
+    async def scenario():
+        # The ingest sees the body already stored; a release of the same
+        # digest must not slip in before the ingest records its reference
+        await asyncio.gather(
+            server.ingest_playlist_content({"id": "p1", "name": "Main", "tenant_id": "t1"}, body),
+            server.release_playlist_body(digest),
+        )
+
+    asyncio.run(scenario())
+    assert stored_bodies(fake_db) == [digest]